@@ -1,17 +1,24 @@
 import eventlet
 eventlet.monkey_patch()
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context, send_file, abort
 from flask_cors import CORS
-import requests
+import click
 import db
+import migraciones
+import tmdb_client
+import catalogo
+import warmer
+import http_cache
+import compresion
+import imagenes
+import pool_db
 import audit_log
 import os
+import json
 from flask_socketio import SocketIO, emit
 from flask_bcrypt import Bcrypt
 from dotenv import load_dotenv
-from crypto_utils import encrypt_token, decrypt_token
-import os
 
 app = Flask(__name__)
 
@@ -30,6 +37,14 @@ socketio = SocketIO(
 # Conjunto para llevar la cuenta de clientes conectados
 connected_clients = set()
 
+# Comprimir respuestas JSON y estáticos según Accept-Encoding
+app.after_request(compresion.comprimir_respuesta)
+
+# El calentador arranca al servir (primer request), no al importar: así
+# `flask migrar`, `flask calentar-cache`, etc. no lo lanzan.
+if warmer.HABILITADO:
+    app.before_request(warmer.iniciar)
+
 # Helper para obtener IP del cliente
 def get_client_ip():
     """Obtiene la dirección IP del cliente."""
@@ -40,10 +55,7 @@ def get_client_ip():
 load_dotenv()
 
 # --- Configuración TMDB ---
-# Hashing simétrico de la clave de la API
-ENCRYPTED_API_KEY = os.getenv('TMDB_API_KEY')
-API_KEY = decrypt_token(ENCRYPTED_API_KEY) if ENCRYPTED_API_KEY.startswith('gAAAA') else ENCRYPTED_API_KEY
-TMDB_URL = "https://api.themoviedb.org/3"
+# La clave (cifrada), la URL base y el pool de conexiones viven en tmdb_client
 
 # --- Clave de acceso de administrador ---
 ADMIN_ACCESS_KEY = os.getenv('ADMIN_ACCESS_KEY', 'changeme')
@@ -76,42 +88,121 @@ def pagina_perfil():
     return render_template("perfil.html")
 
 
+@app.route("/img/<tamano>/<nombre>")
+def imagen(tamano, nombre):
+    """Proxy de pósters de TMDB con caché en disco; si falla, placeholder local."""
+    if not imagenes.nombre_valido(tamano, nombre):
+        abort(404)
+    try:
+        ruta = imagenes.obtener(tamano, nombre)
+    except (imagenes.ImagenNoDisponible, TimeoutError, OSError) as e:
+        print(f"Error al obtener imagen {tamano}/{nombre}:", e)
+        # Un 404 de TMDB no se va a arreglar solo; un error de red sí
+        no_existe = isinstance(e, imagenes.ImagenNoDisponible) and e.status_code == 404
+        resp = send_file(os.path.join(app.static_folder, "img", "placeholder.svg"), mimetype="image/svg+xml",
+                         max_age=86400 if no_existe else imagenes.MAX_AGE_PLACEHOLDER)
+        resp.cache_control.public = True
+        return resp
+    resp = send_file(ruta, max_age=imagenes.MAX_AGE_IMAGEN)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
+
+
 # -------- API REST --------
+def _error_tmdb(e):
+    """Respuesta para un TMDBError: 503 con Retry-After si TMDB no está disponible."""
+    if isinstance(e, tmdb_client.TMDBNoDisponible):
+        resp = jsonify({"status": "error", "message": "Servicio de películas no disponible, reintente en unos segundos"})
+        resp.headers["Retry-After"] = str(int(e.reintentar_en or 1) + 1)
+        return resp, 503
+    if e.status_code == 404:
+        return jsonify({"status": "error", "message": "Película no encontrada"}), 404
+    return jsonify({"status": "error", "message": str(e)}), 502
+
+
+def _pagina_param():
+    """Lee ?page= (1..500); devuelve None si es inválido."""
+    pagina = request.args.get("page", 1, type=int)
+    if pagina is None or not (1 <= pagina <= catalogo.TMDB_MAX_PAGINA):
+        return None
+    return pagina
+
+
+# Cuerpos JSON ya serializados, reutilizados mientras no cambie el dato cacheado
+respuestas_cache = http_cache.PayloadCache("respuestas")
+fragmentos_cache = http_cache.PayloadCache("fragmentos")
+
+
+def _respuesta_paginada(clave, resultado):
+    """Respuesta cacheable (ETag/304) para una página de listado o búsqueda."""
+    def armar(_):
+        pagina = resultado["page"]
+        return {
+            "status": "success",
+            "total": len(resultado["data"]),
+            "data": resultado["data"],
+            "page": pagina,
+            "total_pages": resultado["total_pages"],
+            "next_page": pagina + 1 if pagina < resultado["total_pages"] else None,
+            **({"query": resultado["consulta"]} if "consulta" in resultado else {}),
+        }
+
+    payload = respuestas_cache.obtener(clave, resultado["data"], armar)
+    return http_cache.responder(payload, http_cache.MAX_AGE_LISTADOS)
+
+
+def _respuesta_ndjson(cargar_pagina, pagina):
+    """Emite ?pages= páginas desde `pagina` como JSON por línea, a medida que llegan."""
+    cantidad = request.args.get("pages", 1, type=int) or 1
+    paginas = catalogo.iterar_paginas(cargar_pagina, pagina, cantidad)
+    lineas = (json.dumps(p, ensure_ascii=False) + "\n" for p in paginas)
+    return Response(stream_with_context(lineas), mimetype="application/x-ndjson")
+
+
+def _respuesta_cursor(listar, *args):
+    """
+    Respuesta de una lista paginada por cursor (?limit=N&cursor=...).
+    El tamaño de página lo acota db.PAGINA_MAX.
+    """
+    limite = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor") or None
+    try:
+        items, siguiente = listar(*args, limite=limite, cursor=cursor)
+    except db.CursorInvalido as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({
+        "status": "success",
+        "total": len(items),
+        "data": items,
+        "next_cursor": siguiente,
+    }), 200
+
+
 @app.route("/api/peliculas/<categoria>", methods=["GET"])
 def api_peliculas_categoria(categoria):
-    try:
-        match categoria:
-            case "popular":
-                endpoint = "movie/popular"
-            case "top_rated":
-                endpoint = "movie/top_rated"
-            case "now_playing":
-                endpoint = "movie/now_playing"
-            case _:
-                return jsonify({"status": "error", "message": "Categoría no válida"}), 400
-
-        resp = requests.get(f"{TMDB_URL}/{endpoint}", params={
-            "api_key": API_KEY,
-            "language": "es-ES"
-        })
-        resp.raise_for_status()
-        data = resp.json().get("results", [])
-
-        peliculas = [{
-            "id": p.get("id"),
-            "title": p.get("title", "Sin título"),
-            "text": p.get("overview", "Sin descripción."),
-            "imageUrl": f"https://image.tmdb.org/t/p/w500{p['poster_path']}" if p.get("poster_path") else "https://via.placeholder.com/500x750?text=Sin+imagen",
-            "updated": p.get("release_date", "Desconocido"),
-            "vote_average": p.get("vote_average")
-        } for p in data]
+    if categoria not in catalogo.CATEGORIAS:
+        return jsonify({"status": "error", "message": "Categoría no válida"}), 400
 
-        return jsonify({
-            "status": "success",
-            "total": len(peliculas),
-            "data": peliculas
-        }), 200
+    pagina = _pagina_param()
+    if pagina is None:
+        return jsonify({"status": "error", "message": "Página no válida"}), 400
+
+    if request.args.get("stream") == "ndjson":
+        return _respuesta_ndjson(
+            lambda n, deadline: catalogo.listar_categoria(categoria, pagina=n, deadline=deadline, prefetch=False),
+            pagina
+        )
+
+    try:
+        resultado = catalogo.listar_categoria(categoria, pagina=pagina)
+        return _respuesta_paginada(("categoria", categoria, pagina), resultado)
 
+    except tmdb_client.TMDBError as e:
+        print("Error de TMDB:", e)
+        return _error_tmdb(e)
     except Exception as e:
         print("Error al obtener películas:", e)
         return jsonify({
@@ -120,31 +211,41 @@ def api_peliculas_categoria(categoria):
         }), 500
 
 
+@app.route("/api/internal/stats", methods=["GET"])
+def internal_stats():
+    """Métricas internas (TMDB, cachés, calentador, pool de la base) para monitoreo."""
+    return jsonify({
+        "status": "success",
+        "data": {
+            "tmdb": tmdb_client.stats(),
+            "cache": {
+                **catalogo.stats(),
+                "respuestas": respuestas_cache.stats(),
+                "fragmentos": fragmentos_cache.stats(),
+                "estaticos_comprimidos": compresion.estaticos_cache.stats(),
+                "usuarios": db.usuarios_cache.stats(),
+                "peliculas_conocidas": db.peliculas_conocidas.stats(),
+            },
+            "warmer": warmer.stats(),
+            "imagenes": imagenes.stats(),
+            "pool_db": pool_db.stats(db.engine),
+            "replica": {
+                **db.lecturas.stats(),
+                "pool": pool_db.stats(db.engine_replica) if db.engine_replica is not None else None,
+            },
+        }
+    }), 200
+
+
 
 # -------- REVIEWS --------
 @app.route("/api/reviews/<int:movie_id>", methods=["GET"])
 def listar_reviews(movie_id):
-    try:
-        items = db.listar_reviews_por_pelicula(movie_id)
-        return jsonify({
-            "status": "success",
-            "total": len(items),
-            "data": items,
-        }), 200
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return _respuesta_cursor(db.listar_reviews_por_pelicula, movie_id)
 
 @app.route("/api/users/<int:user_id>/reviews", methods=["GET"])
 def listar_reviews_usuario(user_id):
-    try:
-        items = db.listar_reviews_por_usuario(user_id)
-        return jsonify({
-            "status": "success",
-            "total": len(items),
-            "data": items,
-        }), 200
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return _respuesta_cursor(db.listar_reviews_por_usuario, user_id)
 
 
 @app.route("/api/reviews/<int:movie_id>", methods=["POST"])
@@ -171,22 +272,13 @@ def crear_review(movie_id):
             )
             return jsonify({"status": "error", "message": "Rating inválido"}), 400
 
-        try:
-            resp = requests.get(f"{TMDB_URL}/movie/{movie_id}", params={
-                "api_key": API_KEY,
-                "language": "es-ES"
-            })
-            resp.raise_for_status()
-            m = resp.json()
-            titulo_min = m.get("title") or m.get("original_title") or f"TMDB {movie_id}"
-            anio_min = None
-            if m.get("release_date"):
-                anio_min = int(m["release_date"].split("-")[0])
-            db.upsert_pelicula_minima(movie_id, titulo_min, anio_min)
-        except Exception:
-            db.upsert_pelicula_minima(movie_id, f"TMDB {movie_id}")
+        if db.asegurar_pelicula(movie_id):
+            # Placeholder nuevo (o uno cuyo relleno anterior falló): los datos
+            # se completan desde TMDB fuera del camino de la respuesta
+            catalogo.refrescar_catalogo_en_fondo(movie_id)
 
         review_id = db.crear_review(id_usuario, movie_id, rating, titulo, comentario)
+        catalogo.invalidar_estadisticas(movie_id)
         
         # Emitir evento en tiempo real a los clientes conectados
         try:
@@ -232,70 +324,85 @@ def crear_review(movie_id):
         )
         return jsonify({"status": "error", "message": str(e)}), 500
 
-@app.route("/api/peliculas/<int:movie_id>", methods=["GET"])
-def api_pelicula(movie_id):
+@app.route("/api/peliculas/batch", methods=["GET"])
+def api_peliculas_batch():
+    """Devuelve el detalle de varias películas: /api/peliculas/batch?ids=1,2,3"""
+    crudos = [x.strip() for x in request.args.get("ids", "").split(",") if x.strip()]
+    if not crudos:
+        return jsonify({"status": "error", "message": "Debe indicar ids"}), 400
+    if len(crudos) > catalogo.BATCH_MAX_IDS:
+        return jsonify({
+            "status": "error",
+            "message": f"Máximo {catalogo.BATCH_MAX_IDS} ids por request"
+        }), 400
+
+    ids = []
+    errores = {}
+    for crudo in crudos:
+        if crudo.isdigit():
+            ids.append(int(crudo))
+        else:
+            errores[crudo] = "ID inválido"
+
     try:
-        # Obtener detalles de la película
-        resp = requests.get(f"{TMDB_URL}/movie/{movie_id}", params={
-            "api_key": API_KEY,
-            "language": "es-ES"
-        })
-        resp.raise_for_status()
-        data = resp.json()
-
-        # Obtener elenco
-        cast_names = []
-        try:
-            credits = requests.get(
-                f"{TMDB_URL}/movie/{movie_id}/credits",
-                params={"api_key": API_KEY, "language": "es-ES"}
-            )
-            credits.raise_for_status()
-            cjson = credits.json() or {}
-            cast = cjson.get("cast", [])
-            cast_names = [c.get("name") for c in cast if c.get("name")][:3] # con esto agarra solo a 3 actores
-        except Exception as e:
-            print("Error al obtener elenco:", e)
-            cast_names = []
-
-        # Obtener plataformas/proveedores
-        providers = {"flatrate": []}
-        try:
-            prov_resp = requests.get(
-                f"{TMDB_URL}/movie/{movie_id}/watch/providers",
-                params={"api_key": API_KEY}
-            )
-            if prov_resp.status_code == 200:
-                providers_data = prov_resp.json().get('results', {})
-                # Priorizar Argentina
-                country_data = providers_data.get('AR') or next(iter(providers_data.values()), {})
-                if country_data and country_data.get('flatrate'):
-                    providers['flatrate'] = [{
-                        'name': p.get('provider_name'),
-                        'logo': f"https://image.tmdb.org/t/p/original{p.get('logo_path')}" if p.get('logo_path') else None
-                    } for p in country_data.get('flatrate', [])][:5]  # Limitar a 5 proveedores
-        except Exception as e:
-            print("Error al obtener proveedores:", e)
-
-        pelicula = {
-            "id": data.get("id"),
-            "title": data.get("title", "Sin título"),
-            "overview": data.get("overview", "Sin descripción disponible."),
-            "imageUrl": f"https://image.tmdb.org/t/p/w500{data['poster_path']}" if data.get("poster_path") else "https://via.placeholder.com/500x750?text=Sin+imagen",
-            "backdropUrl": f"https://image.tmdb.org/t/p/w1280{data['backdrop_path']}" if data.get("backdrop_path") else None,
-            "release_date": data.get("release_date", "Desconocido"),
-            "runtime": data.get("runtime", "N/D"),
-            "genres": [g["name"] for g in data.get("genres", [])],
-            "vote_average": data.get("vote_average", "N/D"),
-            "cast": cast_names,
-            "providers": providers
-        }
+        detalles, errores_tmdb = catalogo.obtener_detalles(ids)
+        errores.update({str(movie_id): msg for movie_id, msg in errores_tmdb.items()})
+        comunidad = catalogo.obtener_estadisticas(detalles.keys())
+        # Se concatenan los detalles ya serializados en lugar de re-codificarlos
+        cuerpos = [
+            fragmentos_cache.obtener(
+                ("pelicula", movie_id), (detalles[movie_id], comunidad[movie_id]),
+                lambda o: {**o[0], "community": o[1]}
+            ).body
+            for movie_id in dict.fromkeys(ids) if movie_id in detalles
+        ]
+        body = b"".join([
+            b'{"status":"success","total":', str(len(cuerpos)).encode(),
+            b',"data":[', b",".join(cuerpos),
+            b'],"errors":', http_cache.serializar(errores), b"}"
+        ])
+        # Como el detalle, trae las estadísticas de la comunidad: no-cache + ETag
+        return http_cache.responder_bytes(body, max_age=None)
+
+    except Exception as e:
+        print("Error al obtener películas en lote:", e)
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
 
+@app.route("/api/peliculas/comunidad", methods=["GET"])
+def api_peliculas_comunidad():
+    """Películas mejor puntuadas por los usuarios (?limit, ?min_reviews)."""
+    limite = request.args.get("limit", default=20, type=int)
+    minimo = request.args.get("min_reviews", default=3, type=int)
+    try:
+        peliculas = catalogo.top_comunidad(limite, minimo)
         return jsonify({
             "status": "success",
-            "data": pelicula
+            "total": len(peliculas),
+            "data": peliculas
         }), 200
+    except Exception as e:
+        print("Error al obtener ranking de la comunidad:", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route("/api/peliculas/<int:movie_id>", methods=["GET"])
+def api_pelicula(movie_id):
+    try:
+        pelicula = catalogo.obtener_detalle(movie_id)
+        comunidad = catalogo.obtener_estadisticas([movie_id])[movie_id]
+        payload = respuestas_cache.obtener(
+            ("pelicula", movie_id), (pelicula, comunidad),
+            lambda o: {"status": "success", "data": {**o[0], "community": o[1]}}
+        )
+        # Incluye las estadísticas de la comunidad, que cambian con cada
+        # review: se revalida siempre con el ETag (304 si no cambió)
+        return http_cache.responder(payload, max_age=None)
+
+    except tmdb_client.TMDBError as e:
+        print("Error al obtener película:", e)
+        return _error_tmdb(e)
     except Exception as e:
         print("Error al obtener película:", e)
         return jsonify({
@@ -401,16 +508,143 @@ def eliminar_pelicula_lista(pelicula_id):
         return jsonify({"status": "error", "message": "Error al eliminar película"}), 500
 
 
-@app.route("/api/mi-lista/<int:user_id>/", methods=["GET"])
-def obtener_lista(user_id):
-    lista = db.obtener_lista_usuario(user_id)
+LISTA_LOTE_MAX = int(os.getenv("LISTA_LOTE_MAX", "1000"))
+TITULO_MAX = 150
+# Rango de la columna INTEGER de Postgres: un id fuera de rango haría fallar todo el lote
+ID_PELICULA_MAX = 2**31 - 1
+
+
+def _id_pelicula(valor):
+    """El id si es un entero JSON en 1..ID_PELICULA_MAX (no bool ni float), si no None."""
+    if isinstance(valor, bool) or not isinstance(valor, int):
+        return None
+    return valor if 1 <= valor <= ID_PELICULA_MAX else None
+
+
+def _validar_item_lista(item):
+    """Devuelve (dict normalizado, None) o (None, mensaje de error)."""
+    if not isinstance(item, dict):
+        return None, "Formato inválido"
+    id_pelicula = _id_pelicula(item.get("id"))
+    if id_pelicula is None:
+        return None, "ID inválido"
+    titulo = (item.get("titulo") or "").strip()
+    if not titulo:
+        return None, "Falta el título"
+    if len(titulo) > TITULO_MAX:
+        return None, "Título demasiado largo"
+    return {"id_pelicula": id_pelicula, "titulo": titulo, "poster_url": item.get("poster_url")}, None
+
+
+@app.route("/api/mi-lista/lote/", methods=["POST"])
+def actualizar_lista_lote():
+    """
+    Agrega y elimina varias películas de la lista en un solo request:
+    {"user_id": 1, "agregar": [{"id", "titulo", "poster_url"}], "eliminar": [id, ...]}
+    Responde el resultado de cada película.
+    """
+    ip_address = get_client_ip()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "No se recibió JSON"}), 400
+
+    id_usuario = data.get("user_id", 1)
+    agregar_crudo = data.get("agregar") or []
+    eliminar_crudo = data.get("eliminar") or []
+    if not isinstance(agregar_crudo, list) or not isinstance(eliminar_crudo, list):
+        return jsonify({"status": "error", "message": "agregar y eliminar deben ser listas"}), 400
+    if len(agregar_crudo) + len(eliminar_crudo) > LISTA_LOTE_MAX:
+        return jsonify({"status": "error", "message": f"Máximo {LISTA_LOTE_MAX} películas por request"}), 400
+
+    resultados_agregar, resultados_eliminar = [], []
+    agregar, eliminar = {}, {}
+    for item in agregar_crudo:
+        valido, error = _validar_item_lista(item)
+        if error:
+            resultados_agregar.append({"id": item.get("id") if isinstance(item, dict) else None,
+                                       "resultado": "invalida", "error": error})
+        else:
+            agregar.setdefault(valido["id_pelicula"], valido)
+    for crudo in eliminar_crudo:
+        id_pelicula = _id_pelicula(crudo)
+        if id_pelicula is None:
+            resultados_eliminar.append({"id": crudo, "resultado": "invalida", "error": "ID inválido"})
+        else:
+            eliminar.setdefault(id_pelicula, None)
+
+    try:
+        agregados, eliminados = db.actualizar_lista_lote(id_usuario, list(agregar.values()), list(eliminar))
+    except Exception as e:
+        audit_log.log_audit_event(
+            event_type='LIST_BULK_UPDATE',
+            action_description=f"Error al actualizar en lote la lista del usuario {id_usuario}",
+            severity='ERROR',
+            user_id=id_usuario,
+            ip_address=ip_address,
+            entity_type='lista_usuario',
+            result='FAILED',
+            error_message=str(e),
+            metadata={'agregar': len(agregar), 'eliminar': len(eliminar)}
+        )
+        return jsonify({"status": "error", "message": "Error al actualizar la lista"}), 500
+
+    resultados_agregar += [{"id": movie_id, "resultado": "agregada" if movie_id in agregados else "ya_estaba"}
+                           for movie_id in agregar]
+    resultados_eliminar += [{"id": movie_id, "resultado": "eliminada" if movie_id in eliminados else "no_estaba"}
+                            for movie_id in eliminar]
+    invalidas = sum(1 for r in resultados_agregar + resultados_eliminar if r["resultado"] == "invalida")
+
+    audit_log.log_audit_event(
+        event_type='LIST_BULK_UPDATE',
+        action_description=(f"Lista del usuario {id_usuario}: {len(agregados)} agregadas, "
+                            f"{len(eliminados)} eliminadas, {invalidas} inválidas"),
+        severity='WARNING' if invalidas else 'INFO',
+        user_id=id_usuario,
+        ip_address=ip_address,
+        entity_type='lista_usuario',
+        old_value={'eliminadas': sorted(eliminados)} if eliminados else None,
+        new_value={'agregadas': sorted(agregados)} if agregados else None,
+        result='PARTIAL' if invalidas else 'SUCCESS',
+        metadata={'pedidas_agregar': len(agregar_crudo), 'pedidas_eliminar': len(eliminar_crudo),
+                  'invalidas': invalidas}
+    )
+
     return jsonify({
         "status": "success",
-        "total": len(lista),
-        "data": lista
+        "agregadas": len(agregados),
+        "eliminadas": len(eliminados),
+        "data": {"agregar": resultados_agregar, "eliminar": resultados_eliminar}
     }), 200
 
 
+@app.route("/api/mi-lista/<int:user_id>/", methods=["GET"])
+def obtener_lista(user_id):
+    return _respuesta_cursor(db.obtener_lista_usuario, user_id)
+
+
+@app.route("/api/mi-lista/<int:user_id>/contiene", methods=["GET"])
+def lista_contiene(user_id):
+    """Cuáles de ?ids=1,2,3 (hasta db.PAGINA_MAX) están en la lista del usuario."""
+    crudos = [i for i in request.args.get("ids", "").split(",") if i.strip()]
+    if len(crudos) > db.PAGINA_MAX:
+        return jsonify({"status": "error", "message": f"Máximo {db.PAGINA_MAX} ids por request"}), 400
+    if not all(i.strip().isdigit() for i in crudos):
+        return jsonify({"status": "error", "message": "ids inválidos"}), 400
+    try:
+        presentes = db.lista_contiene(user_id, {int(i) for i in crudos})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({"status": "success", "total": len(presentes), "data": sorted(presentes)}), 200
+
+
+@app.route("/api/mi-lista/<int:user_id>/cantidad", methods=["GET"])
+def lista_cantidad(user_id):
+    try:
+        return jsonify({"status": "success", "data": {"total": db.contar_lista(user_id)}}), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 @app.route("/api/auth/register", methods=["POST"])
 def register():
     data = request.json or {}
@@ -558,7 +792,7 @@ def login():
 
 @app.route("/api/admin/usuarios", methods=["GET"])
 def admin_listar_usuarios():
-    """Lista todos los usuarios. Requiere un admin_id válido y administrador."""
+    """Lista los usuarios por páginas (?limit, ?cursor). Requiere un admin_id válido y administrador."""
     admin_id = request.args.get("admin_id", type=int)
     if not admin_id:
         return jsonify({"status": "error", "message": "admin_id requerido"}), 400
@@ -567,12 +801,7 @@ def admin_listar_usuarios():
     if not admin or not admin.get("es_admin", False):
         return jsonify({"status": "error", "message": "No autorizado"}), 403
 
-    usuarios = db.listar_usuarios()
-    return jsonify({
-        "status": "success",
-        "total": len(usuarios),
-        "data": usuarios
-    }), 200
+    return _respuesta_cursor(db.listar_usuarios)
 
 
 @app.route("/api/admin/validate", methods=["POST"])
@@ -630,32 +859,29 @@ def buscar_peliculas():
             "message": "Debe ingresar un texto de búsqueda."
         }), 400
 
-    try:
-        resp = requests.get(f"{TMDB_URL}/search/movie", params={
-            "api_key": API_KEY,
-            "language": "es-ES",
-            "query": query
-        })
-        resp.raise_for_status()
-        data = resp.json().get("results", [])
-
-        peliculas = []
-        for p in data:
-            peliculas.append({
-                "id": p.get("id"),
-                "title": p.get("title", "Sin título"),
-                "text": p.get("overview", "Sin descripción."),
-                "imageUrl": f"https://image.tmdb.org/t/p/w500{p['poster_path']}" if p.get("poster_path") else "https://via.placeholder.com/500x750?text=Sin+imagen",
-                "updated": p.get("release_date", "Desconocido"),
-                "vote_average": p.get("vote_average")
-            })
+    pagina = _pagina_param()
+    if pagina is None:
+        return jsonify({"status": "error", "message": "Página no válida"}), 400
 
-        return jsonify({
-            "status": "success",
-            "total": len(peliculas),
-            "data": peliculas
-        }), 200
+    if request.args.get("stream") == "ndjson":
+        return _respuesta_ndjson(
+            lambda n, deadline: catalogo.buscar(query, pagina=n, deadline=deadline, prefetch=False),
+            pagina
+        )
 
+    try:
+        if pagina == 1:
+            # Ráfagas de tipeo del mismo cliente: ver catalogo.buscar_con_debounce
+            resultado = catalogo.buscar_con_debounce(query, get_client_ip())
+        else:
+            resultado = {**catalogo.buscar(query, pagina=pagina), "consulta": query}
+        return _respuesta_paginada(
+            ("buscar", catalogo.normalizar_busqueda(resultado["consulta"]), pagina), resultado
+        )
+
+    except tmdb_client.TMDBError as e:
+        print("Error de TMDB:", e)
+        return _error_tmdb(e)
     except Exception as e:
         print("Error al buscar películas:", e)
         return jsonify({
@@ -666,7 +892,7 @@ def buscar_peliculas():
 # -------- AUDIT LOG API --------
 @app.route("/api/audit/logs", methods=["GET"])
 def get_audit_logs_api():
-    """Obtiene registros de auditoría con filtros opcionales."""
+    """Obtiene registros de auditoría con filtros opcionales (?stream=ndjson para exportar)."""
     try:
         limit = int(request.args.get("limit", 100))
         offset = int(request.args.get("offset", 0))
@@ -674,6 +900,19 @@ def get_audit_logs_api():
         event_type = request.args.get("event_type")
         severity = request.args.get("severity")
         
+        if request.args.get("stream") == "ndjson":
+            # Exportaciones grandes: fila por fila con cursor del lado del servidor
+            filas = audit_log.get_audit_logs(
+                limit=limit,
+                offset=offset,
+                user_id=user_id,
+                event_type=event_type,
+                severity=severity,
+                stream=True
+            )
+            lineas = (app.json.dumps(fila) + "\n" for fila in filas)
+            return Response(stream_with_context(lineas), mimetype="application/x-ndjson")
+        
         logs = audit_log.get_audit_logs(
             limit=limit,
             offset=offset,
@@ -816,10 +1055,44 @@ def broadcast_test():
 
 
 
+# -- BASE DE DATOS --
+
+@app.cli.command("migrar")
+@click.option("--revision", default="head", help="Revisión destino (por defecto la última)")
+def migrar_cmd(revision):
+    """Aplica las migraciones de esquema pendientes."""
+    migraciones.aplicar(revision)
+    db.asegurar_admin_por_defecto()
+    click.echo(f"Esquema en la revisión {revision}")
+
+
+@app.cli.command("reconstruir-stats")
+def reconstruir_stats_cmd():
+    """Recalcula movie_stats (cantidad, promedio, histograma) desde reviews."""
+    filas = db.reconstruir_movie_stats()
+    catalogo.estadisticas_cache.limpiar()
+    click.echo(f"movie_stats reconstruida: {filas} películas")
+
+
+# -- CACHÉ --
+
+@app.cli.command("calentar-cache")
+@click.option("--top-n", type=int, default=None, help="Películas por listado a pre-resolver")
+@click.option("--presupuesto", type=int, default=None, help="Máximo de requests a TMDB")
+def calentar_cache_cmd(top_n, presupuesto):
+    """
+    Actualiza en el catálogo de Postgres el detalle de las primeras películas
+    de la home. Las cachés en memoria son del servidor, no de este proceso.
+    """
+    resumen = warmer.calentar(top_n=top_n, presupuesto=presupuesto, en_memoria=False)
+    click.echo(f"Catálogo actualizado: {resumen}")
+
+
 if __name__ == "__main__":
     print("="*50)
     print("Servidor Flask + Socket.IO iniciado")
     print("Los clientes pueden conectarse vía WebSocket")
     print("URL: http://localhost:5000")
     print("="*50)
+    warmer.iniciar()
     socketio.run(app, debug=True, host='0.0.0.0', port=5000, allow_unsafe_werkzeug=True)
@@ -8,9 +8,10 @@ import json
 from typing import Optional, Dict, Any
 from collections import defaultdict
 import threading
+from functools import lru_cache
 
 # Importar la configuración de base de datos desde db.py
-from db import engine
+from db import engine, lecturas, como_dicts, como_dict, iterar
 
 # Contador de intentos fallidos por usuario/IP
 failed_login_attempts = defaultdict(list)
@@ -26,6 +27,7 @@ EVENT_TYPES = {
     'REVIEW_DELETE': 'Eliminación de review',
     'LIST_ADD': 'Agregar película a lista',
     'LIST_REMOVE': 'Eliminar película de lista',
+    'LIST_BULK_UPDATE': 'Agregar/eliminar películas de lista en lote',
     'MOVIE_ADD': 'Agregar película',
     'MOVIE_UPDATE': 'Actualizar película',
     'MOVIE_DELETE': 'Eliminar película',
@@ -44,68 +46,7 @@ SEVERITY_LEVELS = {
     'CRITICAL': 'Crítico'
 }
 
-# Esquema de la tabla de auditoría
-audit_schema_sql = """
--- Tabla principal de auditoría
-CREATE TABLE IF NOT EXISTS audit_log (
-    id SERIAL PRIMARY KEY,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    event_type VARCHAR(50) NOT NULL,
-    severity VARCHAR(20) NOT NULL,
-    user_id INT REFERENCES usuarios(id) ON DELETE SET NULL,
-    user_email VARCHAR(150),
-    ip_address VARCHAR(45),
-    action_description TEXT NOT NULL,
-    entity_type VARCHAR(50),
-    entity_id INT,
-    old_value JSONB,
-    new_value JSONB,
-    result VARCHAR(20) NOT NULL,
-    error_message TEXT,
-    metadata JSONB
-);
-
--- Índices para mejorar el rendimiento de consultas
-CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_log(timestamp DESC);
-CREATE INDEX IF NOT EXISTS idx_audit_user_id ON audit_log(user_id);
-CREATE INDEX IF NOT EXISTS idx_audit_event_type ON audit_log(event_type);
-CREATE INDEX IF NOT EXISTS idx_audit_severity ON audit_log(severity);
-CREATE INDEX IF NOT EXISTS idx_audit_result ON audit_log(result);
-
--- Tabla de alertas críticas
-CREATE TABLE IF NOT EXISTS critical_alerts (
-    id SERIAL PRIMARY KEY,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    alert_type VARCHAR(50) NOT NULL,
-    severity VARCHAR(20) NOT NULL,
-    description TEXT NOT NULL,
-    affected_user_id INT REFERENCES usuarios(id) ON DELETE SET NULL,
-    ip_address VARCHAR(45),
-    details JSONB,
-    notified BOOLEAN DEFAULT FALSE,
-    notification_channel VARCHAR(50),
-    resolved BOOLEAN DEFAULT FALSE,
-    resolved_at TIMESTAMP,
-    resolved_by INT REFERENCES usuarios(id) ON DELETE SET NULL
-);
-
-CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON critical_alerts(timestamp DESC);
-CREATE INDEX IF NOT EXISTS idx_alerts_notified ON critical_alerts(notified);
-CREATE INDEX IF NOT EXISTS idx_alerts_resolved ON critical_alerts(resolved);
-
--- Tabla de configuraciones críticas (para auditar cambios)
-CREATE TABLE IF NOT EXISTS critical_config (
-    id SERIAL PRIMARY KEY,
-    config_key VARCHAR(100) UNIQUE NOT NULL,
-    config_value TEXT,
-    last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    modified_by INT REFERENCES usuarios(id) ON DELETE SET NULL
-);
-"""
-
-# Inicializar esquema
-with engine.begin() as conn:
-    conn.execute(text(audit_schema_sql))
+# Las tablas de auditoría se crean con las migraciones (migrations/versions/0001)
 
 
 def log_audit_event(
@@ -233,8 +174,9 @@ def create_critical_alert(
         
         # Escribir en archivo de log crítico
         _write_critical_log(alert_type, description, details)
-        
-        return alert_id
+    
+    lecturas.registrar_escritura("alertas")
+    return alert_id
 
 
 def _write_critical_log(alert_type: str, description: str, details: Optional[Dict] = None):
@@ -336,6 +278,45 @@ def _check_failed_login_attempts(
             failed_login_attempts[key] = []
 
 
+# Condición de cada filtro opcional de get_audit_logs
+_FILTROS_LOGS = {
+    "user_id": "user_id = :user_id",
+    "event_type": "event_type = :event_type",
+    "severity": "severity = :severity",
+    "start_date": "timestamp >= :start_date",
+    "end_date": "timestamp <= :end_date",
+}
+
+
+@lru_cache(maxsize=None)
+def _consulta_logs(filtros: tuple):
+    """Consulta precompilada para una combinación de filtros (a lo sumo 32)."""
+    conditions = [_FILTROS_LOGS[f] for f in filtros]
+    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return text(f"""
+        SELECT * FROM audit_log
+        {where_clause}
+        ORDER BY timestamp DESC
+        LIMIT :limit OFFSET :offset
+    """)
+
+
+@lru_cache(maxsize=None)
+def _consulta_alertas(unresolved_only: bool, unnotified_only: bool):
+    conditions = []
+    if unresolved_only:
+        conditions.append("resolved = FALSE")
+    if unnotified_only:
+        conditions.append("notified = FALSE")
+    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return text(f"""
+        SELECT * FROM critical_alerts
+        {where_clause}
+        ORDER BY timestamp DESC
+        LIMIT :limit
+    """)
+
+
 def get_audit_logs(
     limit: int = 100,
     offset: int = 0,
@@ -343,8 +324,9 @@ def get_audit_logs(
     event_type: Optional[str] = None,
     severity: Optional[str] = None,
     start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None
-) -> list:
+    end_date: Optional[datetime] = None,
+    stream: bool = False
+):
     """
     Obtiene registros de auditoría con filtros opcionales.
     
@@ -356,45 +338,26 @@ def get_audit_logs(
         severity: Filtrar por severidad
         start_date: Fecha de inicio
         end_date: Fecha de fin
+        stream: Devolver un generador que lee con cursor del lado del servidor
     
     Returns:
-        Lista de registros de auditoría
+        Lista de registros de auditoría (o generador si stream=True)
     """
-    conditions = []
+    filtros = {
+        "user_id": user_id,
+        "event_type": event_type,
+        "severity": severity,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
     params = {"limit": limit, "offset": offset}
+    params.update((f, v) for f, v in filtros.items() if v)
+    query = _consulta_logs(tuple(f for f, v in filtros.items() if v))
     
-    if user_id:
-        conditions.append("user_id = :user_id")
-        params["user_id"] = user_id
-    
-    if event_type:
-        conditions.append("event_type = :event_type")
-        params["event_type"] = event_type
-    
-    if severity:
-        conditions.append("severity = :severity")
-        params["severity"] = severity
-    
-    if start_date:
-        conditions.append("timestamp >= :start_date")
-        params["start_date"] = start_date
-    
-    if end_date:
-        conditions.append("timestamp <= :end_date")
-        params["end_date"] = end_date
-    
-    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
-    
-    query = text(f"""
-        SELECT * FROM audit_log
-        {where_clause}
-        ORDER BY timestamp DESC
-        LIMIT :limit OFFSET :offset
-    """)
-    
-    with engine.connect() as conn:
-        rows = conn.execute(query, params).mappings().fetchall()
-        return [dict(row) for row in rows]
+    if stream:
+        return iterar(query, params)
+    with lecturas.conectar() as conn:
+        return como_dicts(conn.execute(query, params))
 
 
 def get_critical_alerts(
@@ -413,27 +376,10 @@ def get_critical_alerts(
     Returns:
         Lista de alertas críticas
     """
-    conditions = []
-    params = {"limit": limit}
-    
-    if unresolved_only:
-        conditions.append("resolved = FALSE")
-    
-    if unnotified_only:
-        conditions.append("notified = FALSE")
-    
-    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
-    
-    query = text(f"""
-        SELECT * FROM critical_alerts
-        {where_clause}
-        ORDER BY timestamp DESC
-        LIMIT :limit
-    """)
+    query = _consulta_alertas(bool(unresolved_only), bool(unnotified_only))
     
-    with engine.connect() as conn:
-        rows = conn.execute(query, params).mappings().fetchall()
-        return [dict(row) for row in rows]
+    with lecturas.conectar("alertas") as conn:
+        return como_dicts(conn.execute(query, {"limit": limit}))
 
 
 def mark_alert_notified(alert_id: int):
@@ -446,6 +392,7 @@ def mark_alert_notified(alert_id: int):
     
     with engine.begin() as conn:
         conn.execute(query, {"alert_id": alert_id})
+    lecturas.registrar_escritura("alertas")
 
 
 def resolve_alert(alert_id: int, resolved_by: Optional[int] = None):
@@ -458,6 +405,7 @@ def resolve_alert(alert_id: int, resolved_by: Optional[int] = None):
     
     with engine.begin() as conn:
         conn.execute(query, {"alert_id": alert_id, "resolved_by": resolved_by})
+    lecturas.registrar_escritura("alertas")
 
 
 def get_audit_statistics(days: int = 7) -> Dict[str, Any]:
@@ -483,6 +431,5 @@ def get_audit_statistics(days: int = 7) -> Dict[str, Any]:
         WHERE timestamp >= NOW() - INTERVAL ':days days'
     """)
     
-    with engine.connect() as conn:
-        result = conn.execute(query, {"days": days}).mappings().fetchone()
-        return dict(result) if result else {}
+    with lecturas.conectar() as conn:
+        return como_dict(conn.execute(query, {"days": days})) or {}
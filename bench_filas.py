@@ -0,0 +1,79 @@
+"""
+Micro-benchmark de cómo db.py arma las filas y prepara las consultas.
+Corre sobre SQLite en memoria (no necesita Postgres), así que mide sólo el
+costo en Python; contra Postgres el viaje de red pesa mucho más.
+
+    python bench_filas.py --filas 50000
+
+Compara:
+- text() construido en cada llamada vs. la constante *_SQL del módulo
+- mappings() + dict(row) vs. keys + zip (db.como_dicts) vs. tuplas sin armar
+"""
+import argparse
+import timeit
+import tracemalloc
+
+from sqlalchemy import create_engine, text
+
+CONSULTA = "SELECT id, titulo, rating, comentario, fecha FROM r WHERE id > :desde ORDER BY id LIMIT 20"
+TODAS = text("SELECT id, titulo, rating, comentario, fecha FROM r")
+
+
+def preparar(filas):
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE r (id INTEGER PRIMARY KEY, titulo TEXT, rating REAL, comentario TEXT, fecha TEXT)"))
+        conn.execute(text("INSERT INTO r (titulo, rating, comentario, fecha) VALUES (:t, :r, :c, :f)"), [
+            {"t": f"review {i}", "r": (i % 10) + 0.5, "c": "comentario", "f": "2026-01-01"} for i in range(filas)
+        ])
+    return engine.connect()
+
+
+def medir(funcion, numero, repeticiones=5):
+    return min(timeit.repeat(funcion, number=numero, repeat=repeticiones)) / numero
+
+
+def pico_memoria(funcion):
+    tracemalloc.start()
+    funcion()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=50_000)
+    parser.add_argument("--llamadas", type=int, default=2_000)
+    args = parser.parse_args()
+    conn = preparar(args.filas)
+
+    constante = text(CONSULTA)
+    consultas = {
+        "text() por llamada": lambda: conn.execute(text(CONSULTA), {"desde": 5}).fetchall(),
+        "constante *_SQL": lambda: conn.execute(constante, {"desde": 5}).fetchall(),
+    }
+    print(f"Página de 20 filas ({args.llamadas} llamadas):")
+    for nombre, funcion in consultas.items():
+        print(f"  {nombre:<24} {medir(funcion, args.llamadas) * 1e6:8.1f} µs")
+
+    def con_mappings():
+        return [dict(fila) for fila in conn.execute(TODAS).mappings().fetchall()]
+
+    def con_zip():
+        result = conn.execute(TODAS)
+        claves = tuple(result.keys())
+        return [dict(zip(claves, fila)) for fila in result]
+
+    def tuplas():
+        return conn.execute(TODAS).fetchall()
+
+    print(f"Armado de {args.filas} filas:")
+    for nombre, funcion in (("mappings() + dict(row)", con_mappings), ("keys + zip", con_zip), ("tuplas", tuplas)):
+        ms = medir(funcion, 1, 3) * 1e3
+        mb = pico_memoria(funcion) / 1e6
+        print(f"  {nombre:<24} {ms:8.1f} ms  pico {mb:5.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Caché en memoria del proceso con TTL, desalojo LRU y stale-while-revalidate.
+Pensada para respuestas de TMDB que cambian pocas veces al día.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import eventlet
+
+
+class _Entrada:
+    __slots__ = ("valor", "guardado")
+
+    def __init__(self, valor: Any):
+        self.valor = valor
+        self.guardado = time.monotonic()
+
+    def edad(self) -> float:
+        return time.monotonic() - self.guardado
+
+
+class TTLCache:
+    """
+    Caché acotada con TTL.
+
+    - Dentro del TTL la entrada se sirve directamente (hit).
+    - Vencido el TTL pero dentro de la ventana stale, se sirve la entrada
+      vieja y se refresca en segundo plano.
+    - Si cargar falla y existe una entrada (aunque sea muy vieja), se sirve
+      esa entrada en lugar de propagar el error.
+    """
+
+    def __init__(self, nombre: str, max_items: int = 256, ttl: float = 900, stale_ttl: float = 86400):
+        self.nombre = nombre
+        self.max_items = max_items
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._datos: "OrderedDict[Hashable, _Entrada]" = OrderedDict()
+        self._refrescando = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.errores_servidos = 0
+        self.errores_refresco = 0
+        self.desalojos = 0
+
+    def _buscar(self, clave: Hashable) -> Optional[_Entrada]:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                self._datos.move_to_end(clave)
+            return entrada
+
+    def get(self, clave: Hashable, default: Any = None) -> Any:
+        """Devuelve el valor si está dentro del TTL, sin cargar nada."""
+        entrada = self._buscar(clave)
+        if entrada is None or entrada.edad() >= self.ttl:
+            return default
+        return entrada.valor
+
+    def set(self, clave: Hashable, valor: Any):
+        with self._lock:
+            self._datos[clave] = _Entrada(valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+                self.desalojos += 1
+
+    def contar_consulta(self, hit: bool, cantidad: int = 1):
+        """
+        Registra consultas resueltas fuera de get_or_load (p. ej. un get()
+        seguido de una carga por lotes) para que cuenten en stats().
+        """
+        with self._lock:
+            if hit:
+                self.hits += cantidad
+            else:
+                self.misses += cantidad
+
+    def invalidar(self, clave: Hashable):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def get_or_load(self, clave: Hashable, cargar: Callable[[], Any]) -> Any:
+        """Devuelve el valor cacheado o lo carga con `cargar()`."""
+        entrada = self._buscar(clave)
+        if entrada is not None:
+            edad = entrada.edad()
+            if edad < self.ttl:
+                self.hits += 1
+                return entrada.valor
+            if edad < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._refrescar_en_fondo(clave, cargar)
+                return entrada.valor
+
+        self.misses += 1
+        try:
+            valor = cargar()
+        except Exception:
+            if entrada is not None:
+                self.errores_servidos += 1
+                return entrada.valor
+            raise
+        self.set(clave, valor)
+        return valor
+
+    def _refrescar_en_fondo(self, clave: Hashable, cargar: Callable[[], Any]):
+        with self._lock:
+            if clave in self._refrescando:
+                return
+            self._refrescando.add(clave)
+        eventlet.spawn_n(self._refrescar, clave, cargar)
+
+    def _refrescar(self, clave: Hashable, cargar: Callable[[], Any]):
+        try:
+            self.set(clave, cargar())
+        except Exception as e:
+            # Se sigue sirviendo la entrada vieja hasta el próximo intento
+            self.errores_refresco += 1
+            print(f"Error refrescando caché {self.nombre} {clave}:", e)
+        finally:
+            with self._lock:
+                self._refrescando.discard(clave)
+
+    def stats(self) -> Dict[str, Any]:
+        consultas = self.hits + self.stale_hits + self.misses
+        return {
+            "items": len(self._datos),
+            "max_items": self.max_items,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / consultas, 4) if consultas else None,
+            "errores_servidos": self.errores_servidos,
+            "errores_refresco": self.errores_refresco,
+            "desalojos": self.desalojos,
+        }
@@ -0,0 +1,628 @@
+"""
+Catálogo de películas sobre TMDB: listados por categoría, detalle de
+película y formateo de resultados para el frontend.
+El detalle se lee primero del catálogo local en Postgres (db.py) y sólo se
+pide a TMDB cuando la película no está cargada; las filas viejas se
+refrescan en segundo plano.
+"""
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import eventlet
+from eventlet.event import Event
+
+import db
+import imagenes
+import tmdb_client
+from cache import TTLCache
+from ratelimit import INTERACTIVA, FONDO
+from singleflight import SingleFlight
+
+IDIOMA = "es-ES"
+
+CATEGORIAS = {
+    "popular": "movie/popular",
+    "top_rated": "movie/top_rated",
+    "now_playing": "movie/now_playing",
+}
+
+POSTER_PLACEHOLDER = imagenes.PLACEHOLDER
+
+# Sub-recursos del detalle que TMDB puede anexar con append_to_response
+PARTES_DETALLE = ("credits", "watch/providers")
+
+# Listados por categoría: clave (endpoint, idioma, página)
+categorias_cache = TTLCache(
+    "categorias",
+    max_items=int(os.getenv("TMDB_CACHE_MAX", "256")),
+    ttl=float(os.getenv("TMDB_CACHE_TTL", "900")),
+    stale_ttl=float(os.getenv("TMDB_CACHE_STALE", "86400")),
+)
+
+# Detalle de película ya formateado: clave (movie_id, idioma)
+detalles_cache = TTLCache(
+    "detalles",
+    max_items=int(os.getenv("TMDB_DETAIL_CACHE_MAX", "2000")),
+    ttl=float(os.getenv("TMDB_DETAIL_CACHE_TTL", "3600")),
+    stale_ttl=float(os.getenv("TMDB_CACHE_STALE", "86400")),
+)
+
+# Búsquedas: clave (consulta normalizada, idioma, página)
+busquedas_cache = TTLCache(
+    "busquedas",
+    max_items=int(os.getenv("TMDB_SEARCH_CACHE_MAX", "1000")),
+    ttl=float(os.getenv("TMDB_SEARCH_CACHE_TTL", "600")),
+    stale_ttl=float(os.getenv("TMDB_CACHE_STALE", "86400")),
+)
+BUSQUEDA_PREFIJO_MINIMO = 3
+busquedas_reutilizadas = 0
+# Ventana en la que una consulta del mismo cliente puede ser reemplazada por
+# otra que la extiende o la acorta (tipeo: "mat", "matr", "matri")
+BUSQUEDA_DEBOUNCE = float(os.getenv("TMDB_SEARCH_DEBOUNCE", "0.2"))
+_BUSQUEDA_MAX_CLIENTES = 10000
+_ultimas_busquedas = OrderedDict()  # cliente -> _Rafaga más reciente
+_busquedas_lock = threading.Lock()
+busquedas_agrupadas = 0
+# Búsquedas idénticas concurrentes comparten una sola llamada a TMDB
+busquedas_vuelos = SingleFlight("busquedas")
+
+# Cargas de detalle concurrentes para la misma película se agrupan
+detalles_vuelos = SingleFlight("detalles")
+
+# Agregados de ratings de la comunidad (movie_stats): clave movie_id. Se
+# invalidan al crear una review; el TTL acota el desfase entre workers.
+estadisticas_cache = TTLCache(
+    "estadisticas",
+    max_items=int(os.getenv("STATS_CACHE_MAX", "5000")),
+    ttl=float(os.getenv("STATS_CACHE_TTL", "60")),
+    stale_ttl=0,
+)
+
+# Segundos tras los cuales una película del catálogo local se refresca en fondo
+CATALOGO_TTL = float(os.getenv("CATALOGO_TTL", "86400"))
+_catalogo_refrescando = set()
+_catalogo_lock = threading.Lock()
+
+# TMDB no sirve más allá de la página 500 en listados y búsquedas
+TMDB_MAX_PAGINA = 500
+# Máximo de páginas por respuesta NDJSON
+STREAM_MAX_PAGINAS = int(os.getenv("TMDB_STREAM_MAX_PAGINAS", "5"))
+
+# Límites del endpoint batch
+BATCH_MAX_IDS = int(os.getenv("TMDB_BATCH_MAX_IDS", "50"))
+BATCH_CONCURRENCIA = int(os.getenv("TMDB_BATCH_CONCURRENCIA", "8"))
+
+
+def poster_url(poster_path):
+    return imagenes.url(poster_path, imagenes.TAMANO_POSTER) or POSTER_PLACEHOLDER
+
+
+def formatear_resumen(p):
+    """Convierte un resultado de listado/búsqueda de TMDB al formato de las cards."""
+    return {
+        "id": p.get("id"),
+        "title": p.get("title", "Sin título"),
+        "text": p.get("overview", "Sin descripción."),
+        "imageUrl": poster_url(p.get("poster_path")),
+        "updated": p.get("release_date", "Desconocido"),
+        "vote_average": p.get("vote_average")
+    }
+
+
+def _cargar_categoria(endpoint, idioma, pagina, deadline=None, prioridad=INTERACTIVA):
+    data = tmdb_client.get(endpoint, {"language": idioma, "page": pagina}, deadline=deadline, prioridad=prioridad)
+    return {
+        "data": [formatear_resumen(p) for p in data.get("results", [])],
+        "page": pagina,
+        "total_pages": min(data.get("total_pages") or 1, TMDB_MAX_PAGINA),
+    }
+
+
+def _precargar(cache, clave, cargar):
+    try:
+        cache.get_or_load(clave, cargar)
+    except Exception as e:
+        print(f"Error precargando {cache.nombre} {clave}:", e)
+
+
+def _precargar_en_fondo(cache, clave, cargar):
+    """Carga una entrada en segundo plano si todavía no está en caché."""
+    if cache.get(clave) is None:
+        eventlet.spawn_n(_precargar, cache, clave, cargar)
+
+
+def listar_categoria(categoria, idioma=IDIOMA, pagina=1, deadline=None, prefetch=True):
+    """
+    Devuelve una página de una categoría (ver CATEGORIAS), cacheada, como
+    {"data", "page", "total_pages"}. Precarga la página siguiente en fondo.
+    """
+    endpoint = CATEGORIAS[categoria]
+    resultado = categorias_cache.get_or_load(
+        (endpoint, idioma, pagina),
+        lambda: _cargar_categoria(endpoint, idioma, pagina, deadline)
+    )
+    if prefetch and pagina < resultado["total_pages"]:
+        siguiente = pagina + 1
+        _precargar_en_fondo(
+            categorias_cache,
+            (endpoint, idioma, siguiente),
+            lambda: _cargar_categoria(endpoint, idioma, siguiente, prioridad=FONDO)
+        )
+    return resultado
+
+
+def refrescar_categoria(categoria, idioma=IDIOMA, pagina=1, en_memoria=True):
+    """
+    Vuelve a descargar una página de una categoría y reemplaza la entrada en caché
+    (con en_memoria=False sólo la devuelve).
+    """
+    endpoint = CATEGORIAS[categoria]
+    resultado = _cargar_categoria(endpoint, idioma, pagina, tmdb_client.nuevo_deadline(), FONDO)
+    if en_memoria:
+        categorias_cache.set((endpoint, idioma, pagina), resultado)
+    return resultado
+
+
+def iterar_paginas(cargar_pagina, desde=1, cantidad=1, deadline=None):
+    """
+    Genera varias páginas consecutivas en orden. La primera se pide sola
+    (para conocer total_pages) y el resto en paralelo. Una página que falla
+    se emite como {"page": n, "error": mensaje} sin cortar el resto.
+
+    Args:
+        cargar_pagina: función (pagina, deadline) -> {"data", "page", "total_pages"}
+    """
+    if deadline is None:
+        deadline = tmdb_client.deadline_actual()
+    cantidad = max(1, min(cantidad, STREAM_MAX_PAGINAS))
+
+    def cargar(pagina):
+        try:
+            return cargar_pagina(pagina, deadline)
+        except Exception as e:
+            return {"page": pagina, "error": str(e)}
+
+    primera = cargar(desde)
+    yield primera
+    if "error" in primera:
+        return
+
+    hasta = min(desde + cantidad - 1, primera["total_pages"])
+    if hasta > desde:
+        pool = eventlet.GreenPool(hasta - desde)
+        yield from pool.imap(cargar, range(desde + 1, hasta + 1))
+
+
+def normalizar_busqueda(texto):
+    """Pasa a minúsculas, quita acentos y colapsa espacios."""
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.casefold().split())
+
+
+def _buscar_tmdb(consulta, idioma, pagina, deadline=None, prioridad=INTERACTIVA):
+    data = tmdb_client.get("search/movie", {
+        "language": idioma,
+        "query": consulta,
+        "page": pagina
+    }, deadline=deadline, prioridad=prioridad)
+    resultados = data.get("results", [])
+    textos = [normalizar_busqueda(f"{p.get('title') or ''} {p.get('original_title') or ''}") for p in resultados]
+    palabras = normalizar_busqueda(consulta).split()
+    return {
+        "data": [formatear_resumen(p) for p in resultados],
+        "page": pagina,
+        "total_pages": min(data.get("total_pages") or 1, TMDB_MAX_PAGINA),
+        # Texto normalizado de cada resultado para poder filtrar localmente
+        "textos": textos,
+        # Si TMDB devolvió todo en una página, el conjunto está completo
+        "completo": data.get("total_pages", 1) <= 1,
+        # Todos los resultados coinciden por título; si alguno vino por un
+        # título alternativo el filtro local no es fiable
+        "exacto": all(all(palabra in texto for palabra in palabras) for texto in textos),
+    }
+
+
+def _desde_prefijo(normalizada, idioma):
+    """
+    Intenta responder con el resultado cacheado de un prefijo de la consulta.
+    Sólo es válido si ese resultado estaba completo: cualquier película que
+    coincida con "matrix" también coincide con "matri", así que filtrar el
+    conjunto completo de "matri" da la respuesta de "matrix". Además todos
+    sus resultados tienen que haber coincidido por título/título original:
+    TMDB también busca en títulos alternativos, que no tenemos para filtrar.
+    """
+    palabras = normalizada.split()
+    for largo in range(len(normalizada) - 1, BUSQUEDA_PREFIJO_MINIMO - 1, -1):
+        previa = busquedas_cache.get((normalizada[:largo].rstrip(), idioma, 1))
+        if previa is None or not previa["completo"] or not previa.get("exacto"):
+            continue
+        return {
+            "data": [p for p, texto in zip(previa["data"], previa["textos"])
+                     if all(palabra in texto for palabra in palabras)],
+            "page": 1,
+            "total_pages": 1,
+        }
+    return None
+
+
+def buscar(consulta, idioma=IDIOMA, pagina=1, deadline=None, prefetch=True):
+    """
+    Busca películas en TMDB con caché bajo la consulta normalizada.
+    Las búsquedas idénticas en curso se agrupan en una sola llamada.
+    Precarga la página siguiente en fondo.
+
+    Returns:
+        {"data", "page", "total_pages"}
+    """
+    global busquedas_reutilizadas
+    normalizada = normalizar_busqueda(consulta)
+    clave = (normalizada, idioma, pagina)
+
+    if busquedas_cache.get(clave) is None:
+        if pagina == 1:
+            reutilizada = _desde_prefijo(normalizada, idioma)
+            if reutilizada is not None:
+                busquedas_reutilizadas += 1
+                return reutilizada
+
+    consulta = consulta.strip()
+    resultado = busquedas_cache.get_or_load(
+        clave, lambda: busquedas_vuelos.do(clave, lambda: _buscar_tmdb(consulta, idioma, pagina, deadline))
+    )
+    if prefetch and pagina < resultado["total_pages"]:
+        siguiente = pagina + 1
+        _precargar_en_fondo(
+            busquedas_cache,
+            (normalizada, idioma, siguiente),
+            lambda: _buscar_tmdb(consulta, idioma, siguiente, prioridad=FONDO)
+        )
+    return {"data": resultado["data"], "page": resultado["page"], "total_pages": resultado["total_pages"]}
+
+
+class _Rafaga:
+    """Una consulta de un cliente y, si llegó otra relacionada, la que la reemplaza."""
+    __slots__ = ("normalizada", "siguiente", "evento")
+
+    def __init__(self, normalizada):
+        self.normalizada = normalizada
+        self.siguiente = None
+        self.evento = Event()
+
+
+def _relacionadas(a, b):
+    return a.startswith(b) or b.startswith(a)
+
+
+def buscar_con_debounce(consulta, cliente, idioma=IDIOMA, deadline=None):
+    """
+    Primera página de una búsqueda agrupando las ráfagas de un mismo cliente.
+
+    Si la consulta no está en caché espera BUSQUEDA_DEBOUNCE. Si en ese
+    lapso el mismo cliente manda otra consulta que la extiende o la acorta,
+    ésta no va a TMDB: espera y devuelve el resultado real de la última de
+    la ráfaga. "consulta" en la respuesta dice a qué consulta corresponden
+    los datos. Si la espera falla o vence, se busca la propia consulta.
+
+    Returns:
+        {"data", "page", "total_pages", "consulta"}
+    """
+    global busquedas_agrupadas
+    normalizada = normalizar_busqueda(consulta)
+    if (not cliente or BUSQUEDA_DEBOUNCE <= 0
+            or busquedas_cache.get((normalizada, idioma, 1)) is not None):
+        return {**buscar(consulta, idioma, 1, deadline), "consulta": consulta.strip()}
+
+    rafaga = _Rafaga(normalizada)
+    with _busquedas_lock:
+        previa = _ultimas_busquedas.get(cliente)
+        if previa is not None and not previa.evento.ready() and previa.siguiente is None \
+                and _relacionadas(previa.normalizada, normalizada):
+            previa.siguiente = rafaga
+        _ultimas_busquedas[cliente] = rafaga
+        _ultimas_busquedas.move_to_end(cliente)
+        while len(_ultimas_busquedas) > _BUSQUEDA_MAX_CLIENTES:
+            _ultimas_busquedas.popitem(last=False)
+
+    if deadline is None:
+        deadline = tmdb_client.deadline_actual()
+    resultado = None
+    try:
+        eventlet.sleep(BUSQUEDA_DEBOUNCE)
+        siguiente = rafaga.siguiente
+        if siguiente is not None:
+            try:
+                with eventlet.Timeout(max(deadline - time.monotonic(), 0)):
+                    resultado = siguiente.evento.wait()
+                busquedas_agrupadas += 1
+            except (Exception, eventlet.Timeout) as e:
+                print(f"Búsqueda agrupada '{siguiente.normalizada}' no disponible, se busca la propia:", e)
+        if resultado is None:
+            resultado = {**buscar(consulta, idioma, 1, deadline), "consulta": consulta.strip()}
+    except Exception as e:
+        rafaga.evento.send_exception(e)
+        raise
+    else:
+        rafaga.evento.send(resultado)
+    return resultado
+
+
+def _formatear_cast(credits):
+    cast = (credits or {}).get("cast", [])
+    return [c.get("name") for c in cast if c.get("name")][:3]  # con esto agarra solo a 3 actores
+
+
+def _formatear_providers(watch_providers):
+    providers = {"flatrate": []}
+    providers_data = (watch_providers or {}).get("results", {})
+    # Priorizar Argentina
+    country_data = providers_data.get("AR") or next(iter(providers_data.values()), {})
+    if country_data and country_data.get("flatrate"):
+        providers["flatrate"] = [{
+            "name": p.get("provider_name"),
+            "logo": imagenes.url(p.get("logo_path"), imagenes.TAMANO_LOGO)
+        } for p in country_data.get("flatrate", [])][:5]  # Limitar a 5 proveedores
+    return providers
+
+
+def formatear_detalle(data, providers=None):
+    """Arma el detalle de película para el frontend a partir de la respuesta de TMDB."""
+    try:
+        cast_names = _formatear_cast(data.get("credits"))
+    except Exception as e:
+        print("Error al obtener elenco:", e)
+        cast_names = []
+
+    if providers is None:
+        try:
+            providers = _formatear_providers(data.get("watch/providers"))
+        except Exception as e:
+            print("Error al obtener proveedores:", e)
+            providers = {"flatrate": []}
+
+    return {
+        "id": data.get("id"),
+        "title": data.get("title", "Sin título"),
+        "overview": data.get("overview", "Sin descripción disponible."),
+        "imageUrl": poster_url(data.get("poster_path")),
+        "backdropUrl": imagenes.url(data.get("backdrop_path"), imagenes.TAMANO_BACKDROP),
+        "release_date": data.get("release_date", "Desconocido"),
+        "runtime": data.get("runtime", "N/D"),
+        "genres": [g["name"] for g in data.get("genres", [])],
+        "vote_average": data.get("vote_average", "N/D"),
+        "cast": cast_names,
+        "providers": providers
+    }
+
+
+def _cargar_partes(movie_id, partes, idioma, deadline, prioridad):
+    """
+    Descarga en paralelo los sub-recursos que no vinieron anexados.
+    Cada parte falla por separado: si una no llega se devuelve sin ella.
+    """
+    def cargar(parte):
+        try:
+            return parte, tmdb_client.get(f"movie/{movie_id}/{parte}", {"language": idioma},
+                                          deadline=deadline, prioridad=prioridad)
+        except Exception as e:
+            print(f"Error al obtener {parte} de {movie_id}:", e)
+            return parte, None
+
+    pool = eventlet.GreenPool(len(partes))
+    return {parte: valor for parte, valor in pool.imap(cargar, partes) if valor is not None}
+
+
+def obtener_detalle_tmdb(movie_id, idioma=IDIOMA, deadline=None, prioridad=INTERACTIVA):
+    """
+    Descarga el detalle completo (datos, elenco y proveedores) en un solo
+    round trip usando append_to_response. Si TMDB no anexa alguna parte,
+    esas partes se piden en paralelo compartiendo el mismo deadline.
+    """
+    if deadline is None:
+        deadline = tmdb_client.deadline_actual()
+
+    # Copia: el dict de TMDB puede estar compartido con llamadas agrupadas
+    data = dict(tmdb_client.get(f"movie/{movie_id}", {
+        "language": idioma,
+        "append_to_response": ",".join(PARTES_DETALLE)
+    }, deadline=deadline, prioridad=prioridad))
+
+    faltantes = [parte for parte in PARTES_DETALLE if parte not in data]
+    if faltantes:
+        data.update(_cargar_partes(movie_id, faltantes, idioma, deadline, prioridad))
+    return data
+
+
+def formatear_desde_catalogo(fila):
+    """Arma el detalle de película para el frontend desde una fila del catálogo local."""
+    return {
+        "id": fila["id"],
+        "title": fila["titulo"],
+        "overview": fila["sinopsis"] or "Sin descripción disponible.",
+        "imageUrl": poster_url(fila["poster_path"]),
+        "backdropUrl": imagenes.url(fila["backdrop_path"], imagenes.TAMANO_BACKDROP),
+        "release_date": fila["fecha_estreno"].isoformat() if fila["fecha_estreno"] else "Desconocido",
+        "runtime": fila["duracion"] if fila["duracion"] is not None else "N/D",
+        "genres": list(fila["generos"] or []),
+        "vote_average": fila["vote_average"] if fila["vote_average"] is not None else "N/D",
+        "cast": list(fila["reparto"] or [])[:3],
+        "providers": fila["proveedores"] or {"flatrate": []}
+    }
+
+
+def sincronizar_catalogo(movie_id, idioma=IDIOMA, deadline=None, prioridad=INTERACTIVA, en_memoria=True):
+    """
+    Descarga el detalle de TMDB, lo persiste en el catálogo local y
+    (salvo en_memoria=False) actualiza la caché en memoria. Devuelve el
+    detalle formateado.
+    """
+    data = obtener_detalle_tmdb(movie_id, idioma, deadline, prioridad)
+    providers = _formatear_providers(data.get("watch/providers"))
+    detalle = formatear_detalle(data, providers)
+    try:
+        db.guardar_pelicula_tmdb(data, providers)
+    except Exception as e:
+        print(f"Error guardando película {movie_id} en catálogo:", e)
+    if en_memoria:
+        detalles_cache.set((movie_id, idioma), detalle)
+    return detalle
+
+
+def _refrescar_catalogo(movie_id, idioma):
+    try:
+        sincronizar_catalogo(movie_id, idioma, tmdb_client.nuevo_deadline(), FONDO)
+    except Exception as e:
+        print(f"Error refrescando película {movie_id} del catálogo:", e)
+    finally:
+        with _catalogo_lock:
+            _catalogo_refrescando.discard(movie_id)
+
+
+def refrescar_catalogo_en_fondo(movie_id, idioma=IDIOMA):
+    """Actualiza la película del catálogo desde TMDB en segundo plano (prioridad de fondo)."""
+    with _catalogo_lock:
+        if movie_id in _catalogo_refrescando:
+            return
+        _catalogo_refrescando.add(movie_id)
+    eventlet.spawn_n(_refrescar_catalogo, movie_id, idioma)
+
+
+def _leer_catalogo(movie_id):
+    try:
+        return db.obtener_pelicula_catalogo(movie_id)
+    except Exception as e:
+        print(f"Error leyendo película {movie_id} del catálogo:", e)
+        return None
+
+
+def precalentar_detalle(movie_id, idioma=IDIOMA, en_memoria=True):
+    """
+    Deja el detalle fresco en el catálogo local y, con en_memoria, en la
+    caché en memoria. Si el catálogo lo tiene fresco no se consulta TMDB.
+
+    Returns:
+        True si hizo falta pedirlo a TMDB
+    """
+    fila = _leer_catalogo(movie_id)
+    if fila is not None and fila["edad_segundos"] is not None and fila["edad_segundos"] <= CATALOGO_TTL:
+        if en_memoria:
+            detalles_cache.set((movie_id, idioma), formatear_desde_catalogo(fila))
+        return False
+    sincronizar_catalogo(movie_id, idioma, tmdb_client.nuevo_deadline(), FONDO, en_memoria)
+    return True
+
+
+def obtener_detalle(movie_id, idioma=IDIOMA, deadline=None):
+    """
+    Detalle de película listo para el frontend.
+    Orden de lectura: caché en memoria, catálogo local en Postgres y, sólo
+    si la película no está cargada, TMDB (persistiendo el resultado).
+    """
+    def cargar():
+        if idioma == IDIOMA:
+            fila = _leer_catalogo(movie_id)
+            if fila is not None:
+                if fila["edad_segundos"] is None or fila["edad_segundos"] > CATALOGO_TTL:
+                    refrescar_catalogo_en_fondo(movie_id, idioma)
+                return formatear_desde_catalogo(fila)
+            return sincronizar_catalogo(movie_id, idioma, deadline)
+        return formatear_detalle(obtener_detalle_tmdb(movie_id, idioma, deadline))
+
+    clave = (movie_id, idioma)
+    return detalles_cache.get_or_load(clave, lambda: detalles_vuelos.do(clave, cargar))
+
+
+def obtener_detalles(ids, idioma=IDIOMA, deadline=None):
+    """
+    Resuelve varios detalles a la vez. Los IDs se deduplican, los que están
+    en caché se sirven directo y el resto se pide en paralelo con un límite
+    de concurrencia.
+
+    Returns:
+        (detalles, errores): dict id -> detalle y dict id -> mensaje de error
+    """
+    if deadline is None:
+        deadline = tmdb_client.deadline_actual()
+
+    detalles = {}
+    faltantes = []
+    for movie_id in dict.fromkeys(ids):
+        cacheado = detalles_cache.get((movie_id, idioma))
+        if cacheado is not None:
+            detalles[movie_id] = cacheado
+        else:
+            faltantes.append(movie_id)
+    # Los faltantes se cuentan en get_or_load (obtener_detalle); los hits de get() no
+    if detalles:
+        detalles_cache.contar_consulta(hit=True, cantidad=len(detalles))
+
+    def cargar(movie_id):
+        try:
+            return movie_id, obtener_detalle(movie_id, idioma, deadline), None
+        except Exception as e:
+            return movie_id, None, str(e)
+
+    errores = {}
+    if faltantes:
+        pool = eventlet.GreenPool(min(BATCH_CONCURRENCIA, len(faltantes)))
+        for movie_id, detalle, error in pool.imap(cargar, faltantes):
+            if error is None:
+                detalles[movie_id] = detalle
+            else:
+                errores[movie_id] = error
+    return detalles, errores
+
+
+def obtener_estadisticas(ids):
+    """
+    Agregados de la comunidad (cantidad, promedio, histograma) por película.
+    Los que no están en caché se leen de movie_stats en una sola consulta.
+    """
+    resultado = {}
+    faltantes = []
+    for movie_id in dict.fromkeys(ids):
+        cacheado = estadisticas_cache.get(movie_id)
+        if cacheado is not None:
+            estadisticas_cache.contar_consulta(hit=True)
+            resultado[movie_id] = cacheado
+        else:
+            faltantes.append(movie_id)
+    if faltantes:
+        estadisticas_cache.contar_consulta(hit=False, cantidad=len(faltantes))
+        for movie_id, agregados in db.obtener_stats_peliculas(faltantes).items():
+            estadisticas_cache.set(movie_id, agregados)
+            resultado[movie_id] = agregados
+    return resultado
+
+
+def invalidar_estadisticas(movie_id):
+    estadisticas_cache.invalidar(movie_id)
+
+
+def top_comunidad(limite=20, minimo_reviews=3):
+    """Películas mejor puntuadas por los usuarios, en el formato de las cards."""
+    return [{
+        "id": fila["id"],
+        "title": fila["titulo"],
+        "imageUrl": poster_url(fila["poster_path"]),
+        "vote_average": float(fila["promedio"]),
+        "review_count": fila["cantidad"],
+    } for fila in db.top_comunidad(limite, minimo_reviews)]
+
+
+def stats():
+    return {
+        "singleflight_detalles": detalles_vuelos.stats(),
+        "categorias": categorias_cache.stats(),
+        "detalles": detalles_cache.stats(),
+        "estadisticas": estadisticas_cache.stats(),
+        "busquedas": {
+            **busquedas_cache.stats(),
+            "reutilizadas_por_prefijo": busquedas_reutilizadas,
+            "agrupadas_por_debounce": busquedas_agrupadas,
+        },
+        "singleflight_busquedas": busquedas_vuelos.stats(),
+    }
@@ -0,0 +1,87 @@
+"""
+Circuit breaker para dependencias externas.
+Tras varios fallos seguidos el circuito se abre y las llamadas fallan al
+instante (para servir caché o datos viejos) durante un período de
+enfriamiento; después se deja pasar una llamada de prueba y, si sale bien,
+el circuito se cierra.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class CircuitBreaker:
+
+    def __init__(self, nombre: str, umbral_fallos: int = 5, enfriamiento: float = 30):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self.estado = CERRADO
+        self._fallos_seguidos = 0
+        self._abierto_desde: Optional[float] = None
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+        self.aperturas = 0
+        self.rechazadas = 0
+
+    def permitir(self) -> bool:
+        """True si la llamada puede salir; False si hay que fallar rápido."""
+        with self._lock:
+            if self.estado == CERRADO:
+                return True
+            if self.estado == ABIERTO:
+                if time.monotonic() - self._abierto_desde < self.enfriamiento:
+                    self.rechazadas += 1
+                    return False
+                self.estado = SEMIABIERTO
+                self._prueba_en_curso = False
+            # Semiabierto: una sola llamada de prueba a la vez
+            if self._prueba_en_curso:
+                self.rechazadas += 1
+                return False
+            self._prueba_en_curso = True
+            return True
+
+    def liberar(self):
+        """Devuelve un permiso que no llegó a usarse (la llamada no salió)."""
+        with self._lock:
+            self._prueba_en_curso = False
+
+    def exito(self):
+        with self._lock:
+            self.estado = CERRADO
+            self._fallos_seguidos = 0
+            self._prueba_en_curso = False
+
+    def fallo(self):
+        with self._lock:
+            self._fallos_seguidos += 1
+            if self.estado == SEMIABIERTO or self._fallos_seguidos >= self.umbral_fallos:
+                if self.estado != ABIERTO:
+                    self.aperturas += 1
+                    print(f"Circuito {self.nombre} abierto tras {self._fallos_seguidos} fallos seguidos")
+                self.estado = ABIERTO
+                self._abierto_desde = time.monotonic()
+            self._prueba_en_curso = False
+
+    def reintentar_en(self) -> Optional[float]:
+        """Segundos hasta que el circuito deje pasar una prueba (None si no está abierto)."""
+        with self._lock:
+            if self.estado != ABIERTO:
+                return None
+            return max(0.0, self.enfriamiento - (time.monotonic() - self._abierto_desde))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "estado": self.estado,
+            "fallos_seguidos": self._fallos_seguidos,
+            "umbral_fallos": self.umbral_fallos,
+            "enfriamiento": self.enfriamiento,
+            "reintentar_en": self.reintentar_en(),
+            "aperturas": self.aperturas,
+            "rechazadas": self.rechazadas,
+        }
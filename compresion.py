@@ -0,0 +1,93 @@
+"""
+Compresión de respuestas negociada con Accept-Encoding (brotli o gzip).
+Los payloads cacheados guardan su variante comprimida la primera vez que se
+pide, así las visitas siguientes no gastan CPU. El resto de las respuestas
+JSON y los archivos de static/ se comprimen en un after_request; los
+estáticos también quedan cacheados ya comprimidos.
+brotli es opcional: si no está instalado sólo se ofrece gzip.
+"""
+import gzip
+import os
+from typing import Optional
+
+from flask import request, Response
+
+from cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+MIN_BYTES = int(os.getenv("COMPRESION_MIN_BYTES", "1024"))
+
+TIPOS_COMPRIMIBLES = {
+    "application/json",
+    "application/javascript",
+    "text/javascript",
+    "text/css",
+    "text/html",
+    "text/plain",
+    "image/svg+xml",
+}
+
+CODIFICACIONES = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Estáticos ya comprimidos: clave (ruta, etag, codificación)
+estaticos_cache = TTLCache("estaticos", max_items=int(os.getenv("COMPRESION_ESTATICOS_MAX", "256")),
+                           ttl=float("inf"), stale_ttl=0)
+
+
+def elegir_codificacion() -> Optional[str]:
+    """Mejor codificación aceptada por el cliente para el request actual."""
+    return request.accept_encodings.best_match(CODIFICACIONES)
+
+
+def comprimir(body: bytes, codificacion: str, maxima: bool = False) -> bytes:
+    """
+    Comprime `body`. Con `maxima` se usa el nivel más alto (para contenido
+    que se comprime una vez y se sirve muchas).
+    """
+    if codificacion == "br":
+        return brotli.compress(body, quality=11 if maxima else 5)
+    return gzip.compress(body, compresslevel=9 if maxima else 6, mtime=0)
+
+
+def comprimir_respuesta(resp: Response) -> Response:
+    """after_request: comprime respuestas JSON/estáticas que todavía no lo están."""
+    if (resp.status_code != 200
+            or "Content-Encoding" in resp.headers
+            or resp.mimetype not in TIPOS_COMPRIMIBLES
+            or (resp.is_streamed and not resp.direct_passthrough)):
+        return resp
+
+    resp.vary.add("Accept-Encoding")
+    codificacion = elegir_codificacion()
+    if codificacion is None:
+        return resp
+
+    # send_file (static/ y el proxy de imágenes) entrega el archivo en
+    # passthrough; se lee para comprimirlo y la variante queda cacheada
+    archivo = resp.direct_passthrough
+    if archivo:
+        resp.direct_passthrough = False
+    body = resp.get_data()
+    if len(body) < MIN_BYTES:
+        return resp
+
+    if archivo:
+        etag, _ = resp.get_etag()
+        clave = (request.path, etag, codificacion)
+        comprimido = estaticos_cache.get(clave)
+        if comprimido is None:
+            comprimido = comprimir(body, codificacion, maxima=True)
+            estaticos_cache.set(clave, comprimido)
+        if etag:
+            # Débil: misma entidad en otra codificación; los 304 siguen funcionando
+            resp.set_etag(etag, weak=True)
+    else:
+        comprimido = comprimir(body, codificacion)
+
+    resp.set_data(comprimido)
+    resp.headers["Content-Encoding"] = codificacion
+    return resp
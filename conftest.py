@@ -0,0 +1,47 @@
+"""
+Configuración común de los tests.
+
+Los tests que necesitan Postgres usan una base dedicada (TEST_DATABASE_URL,
+nunca la de DATABASE_URL) y la piden con `base_de_prueba()`, que saltea el
+módulo si no está disponible. db.py toma la URL al importarse, así que se
+la apunta a la base de prueba acá, antes de que se importe cualquier test.
+"""
+import os
+import sys
+
+import pytest
+from dotenv import load_dotenv
+
+import migraciones
+
+load_dotenv()
+TEST_DATABASE_URL = migraciones.database_url("TEST_DATABASE_URL")
+
+if not TEST_DATABASE_URL:
+    _sin_base = "TEST_DATABASE_URL no configurada"
+elif TEST_DATABASE_URL in (migraciones.database_url(), migraciones.database_url("DATABASE_REPLICA_URL")):
+    _sin_base = "TEST_DATABASE_URL debe ser una base distinta de DATABASE_URL"
+elif "db" in sys.modules:
+    _sin_base = "db ya se importó con otra DATABASE_URL"
+else:
+    _sin_base = None
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+
+_migrada = False
+
+
+def base_de_prueba():
+    """Módulo db conectado a la base de prueba (migrada); saltea el módulo si no hay."""
+    global _migrada, _sin_base
+    if _sin_base:
+        pytest.skip(_sin_base, allow_module_level=True)
+    try:
+        if not _migrada:
+            migraciones.aplicar()
+            _migrada = True
+        import db
+    except Exception as e:  # base de prueba inexistente o sin conexión
+        _sin_base = f"Base de prueba no disponible: {e}"
+        pytest.skip(_sin_base, allow_module_level=True)
+    return db
@@ -1,106 +1,76 @@
 from sqlalchemy import create_engine
-from sqlalchemy.pool import QueuePool
 import os
+import json
 from dotenv import load_dotenv
 from sqlalchemy import text
+from flask import g, has_request_context
 from flask_bcrypt import Bcrypt
 
+import migraciones
+from cache import TTLCache
+import pool_db
+import replica
+from paginacion import (PAGINA_DEFAULT, PAGINA_MAX, CursorInvalido, codificar_cursor,
+                        decodificar_cursor, limitar_pagina, keyset as _keyset,
+                        params_cursor as _params_cursor)
+
 bcrypt = Bcrypt()
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+psycopg2://", 1)
-
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_pre_ping=True,
-    pool_recycle=300
-)
-
-schema_sql = """
-CREATE TABLE IF NOT EXISTS usuarios (
-  id SERIAL PRIMARY KEY,
-  nombre VARCHAR(100) NOT NULL,
-  email VARCHAR(150) UNIQUE NOT NULL,
-  contrasena_hash TEXT NOT NULL,
-  fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-  es_admin BOOLEAN NOT NULL DEFAULT FALSE,
-  activo BOOLEAN NOT NULL DEFAULT TRUE
-);
-
-CREATE TABLE IF NOT EXISTS directores (
-  id SERIAL PRIMARY KEY,
-  nombre VARCHAR(100) NOT NULL,
-  nacionalidad VARCHAR(100)
-);
-
-CREATE TABLE IF NOT EXISTS peliculas (
-  id SERIAL PRIMARY KEY,
-  titulo VARCHAR(150) NOT NULL,
-  anio INT,
-  duracion INT,
-  sinopsis TEXT,
-  id_director INT REFERENCES directores(id) ON DELETE SET NULL
-);
-
-CREATE TABLE IF NOT EXISTS actores (
-  id SERIAL PRIMARY KEY,
-  nombre VARCHAR(100) NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS reparto (
-  id_pelicula INT REFERENCES peliculas(id) ON DELETE CASCADE,
-  id_actor INT REFERENCES actores(id) ON DELETE CASCADE,
-  rol VARCHAR(100),
-  PRIMARY KEY (id_pelicula, id_actor)
-);
-
-CREATE TABLE IF NOT EXISTS generos (
-  id SERIAL PRIMARY KEY,
-  nombre VARCHAR(50) UNIQUE NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS peliculas_generos (
-  id_pelicula INT REFERENCES peliculas(id) ON DELETE CASCADE,
-  id_genero INT REFERENCES generos(id) ON DELETE CASCADE,
-  PRIMARY KEY (id_pelicula, id_genero)
-);
-
-CREATE TABLE IF NOT EXISTS reviews (
-  id SERIAL PRIMARY KEY,
-  id_usuario INT REFERENCES usuarios(id) ON DELETE CASCADE,
-  id_pelicula INT REFERENCES peliculas(id) ON DELETE CASCADE,
-  rating NUMERIC(3,1),
-  titulo VARCHAR(150),
-  comentario TEXT,
-  fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
-
--- ensure titulo exists if table already created without it
-ALTER TABLE reviews ADD COLUMN IF NOT EXISTS titulo VARCHAR(150);
-
-CREATE TABLE IF NOT EXISTS lista_usuario (
-    id_usuario INT REFERENCES usuarios(id) ON DELETE CASCADE,
-    id_pelicula INT NOT NULL,
-    titulo VARCHAR(150) NOT NULL,
-    poster_url TEXT,
-    fecha_agregado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    PRIMARY KEY (id_usuario, id_pelicula)
-);
- 
--- asegurar columnas para esquemas antiguos
-ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS es_admin BOOLEAN NOT NULL DEFAULT FALSE;
-ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS activo BOOLEAN NOT NULL DEFAULT TRUE;
-"""
-
-with engine.begin() as conn:
-    conn.execute(text(schema_sql))
+DATABASE_URL = migraciones.database_url()
+
+# Tamaño, timeout y reciclado del pool: DB_POOL_* (ver pool_db.py)
+engine = create_engine(DATABASE_URL, **pool_db.opciones_pool(DATABASE_URL))
+
+# Réplica opcional para las lecturas (ver replica.py); las escrituras y las
+# lecturas que no toleran atraso usan siempre `engine`.
+REPLICA_URL = migraciones.database_url("DATABASE_REPLICA_URL")
+engine_replica = create_engine(
+    REPLICA_URL,
+    connect_args={"connect_timeout": replica.REPLICA_CONNECT_TIMEOUT},
+    **pool_db.opciones_pool(REPLICA_URL),
+) if REPLICA_URL else None
+lecturas = replica.Enrutador(engine, engine_replica)
+
+# --- Resultados ---
+# Las consultas de los caminos de requests se construyen una sola vez al
+# importar (constantes *_SQL) en lugar de armar un text() por llamada. Las
+# filas se arman desde las tuplas del driver con las columnas del resultado
+# (keys + zip). Se sigue creando un dict por fila a propósito: es lo que
+# serializan jsonify/http_cache y lo que usan los llamadores (fila["id"]);
+# sólo se evita el RowMapping intermedio de mappings() + dict(row). Ver
+# bench_filas.py para las mediciones.
+STREAM_LOTE = int(os.getenv("DB_STREAM_LOTE", "1000"))
+
+
+def como_dicts(result, filas=None):
+    """Filas de `result` (o las `filas` ya leídas de él) como dicts listos para jsonify."""
+    claves = tuple(result.keys())
+    return [dict(zip(claves, fila)) for fila in (result if filas is None else filas)]
+
+
+def como_dict(result):
+    """Primera fila de `result` como dict, o None si no hay filas."""
+    fila = result.fetchone()
+    return dict(zip(result.keys(), fila)) if fila is not None else None
+
+
+def iterar(query, params=None, claves_lectura=(), lote=None):
+    """
+    Recorre una consulta grande con un cursor del lado del servidor
+    (stream_results), trayendo `lote` filas por vez en lugar de cargar todo
+    el resultado en memoria. La conexión queda tomada hasta que el generador
+    se agota o se cierra.
+    """
+    with lecturas.conectar(*claves_lectura) as conn:
+        result = conn.execution_options(stream_results=True, yield_per=lote or STREAM_LOTE).execute(query, params or {})
+        claves = tuple(result.keys())
+        for fila in result:
+            yield dict(zip(claves, fila))
+
+# El esquema se maneja con migraciones (migrations/); al importar sólo se
+# verifica que la base esté en la última revisión.
+esquema_al_dia = migraciones.verificar(engine)
 
 
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@example.com")
@@ -136,217 +106,644 @@ def asegurar_admin_por_defecto():
         )
 
 
-asegurar_admin_por_defecto()
+if esquema_al_dia:
+    asegurar_admin_por_defecto()
+
+AGREGAR_PELICULA_SQL = text("""
+    INSERT INTO peliculas (titulo, anio, duracion, sinopsis, id_director)
+    VALUES (:titulo, :anio, :duracion, :sinopsis, :id_director)
+    RETURNING id;
+""")
+
 
 def agregar_pelicula(titulo, anio, duracion, sinopsis, id_director):
-    query = text("""
-        INSERT INTO peliculas (titulo, anio, duracion, sinopsis, id_director)
-        VALUES (:titulo, :anio, :duracion, :sinopsis, :id_director)
-        RETURNING id;
-    """)
     with engine.begin() as conn:
-        result = conn.execute(query, {
+        result = conn.execute(AGREGAR_PELICULA_SQL, {
             "titulo": titulo,
             "anio": anio,
             "duracion": duracion,
             "sinopsis": sinopsis,
             "id_director": id_director
         })
-        return result.scalar()
+        id_pelicula = result.scalar()
+    peliculas_conocidas.set(id_pelicula, True)
+    return id_pelicula
+
+CREAR_REVIEW_SQL = text("""
+    INSERT INTO reviews (id_usuario, id_pelicula, rating, titulo, comentario)
+    VALUES (:id_usuario, :id_pelicula, :rating, :titulo, :comentario)
+    RETURNING id;
+""")
+
 
 def crear_review(id_usuario, id_pelicula, rating, titulo, comentario):
-    query = text("""
-        INSERT INTO reviews (id_usuario, id_pelicula, rating, titulo, comentario)
-        VALUES (:id_usuario, :id_pelicula, :rating, :titulo, :comentario)
-        RETURNING id;
-    """)
+    """Inserta la review y actualiza movie_stats en la misma transacción."""
     with engine.begin() as conn:
-        result = conn.execute(query, {
+        result = conn.execute(CREAR_REVIEW_SQL, {
             "id_usuario": id_usuario,
             "id_pelicula": id_pelicula,
             "rating": rating,
             "titulo": titulo,
             "comentario": comentario,
         })
-        return result.scalar()
-
-def listar_reviews_por_pelicula(id_pelicula):
-    query = text("""
-        SELECT r.id, r.id_usuario, r.id_pelicula, r.rating, r.titulo, r.comentario, r.fecha,
-               u.nombre AS usuario
-        FROM reviews r
-        LEFT JOIN usuarios u ON u.id = r.id_usuario
-        WHERE r.id_pelicula = :id_pelicula
-        ORDER BY r.fecha DESC
-    """)
-    with engine.connect() as conn:
-        rows = conn.execute(query, {"id_pelicula": id_pelicula}).mappings().fetchall()
-        return [dict(row) for row in rows]
-
-def listar_reviews_por_usuario(id_usuario):
-    query = text("""
-        SELECT r.id, r.id_usuario, r.id_pelicula, r.rating, r.titulo, r.comentario, r.fecha,
-               p.titulo AS titulo_pelicula
-        FROM reviews r
-        LEFT JOIN peliculas p ON p.id = r.id_pelicula
-        WHERE r.id_usuario = :id_usuario
-        ORDER BY r.fecha DESC
-    """)
-    with engine.connect() as conn:
-        rows = conn.execute(query, {"id_usuario": id_usuario}).mappings().fetchall()
-        return [dict(row) for row in rows]
-
-def listar_peliculas():
-    query = text("""
-        SELECT p.id, p.titulo, p.anio, d.nombre AS director
-        FROM peliculas p
-        LEFT JOIN directores d ON p.id_director = d.id
-        ORDER BY p.anio DESC;
+        review_id = result.scalar()
+        if rating is not None:
+            _sumar_a_stats(conn, id_pelicula, rating)
+    lecturas.registrar_escritura(("usuario", id_usuario), ("pelicula", id_pelicula))
+    return review_id
+
+
+# --- Agregados de ratings por película (movie_stats) ---
+# histograma[i] (1..20) cuenta los ratings en [i/2, i/2 + 0.5)
+HISTOGRAMA_BUCKETS = 20
+_BUCKET_SQL = "LEAST(GREATEST(FLOOR(rating * 2)::int, 1), 20)"
+
+
+def bucket_rating(rating) -> int:
+    return min(max(int(float(rating) * 2), 1), HISTOGRAMA_BUCKETS)
+
+
+STATS_CREAR_SQL = text("""
+    INSERT INTO movie_stats (id_pelicula) VALUES (:id)
+    ON CONFLICT (id_pelicula) DO NOTHING
+""")
+STATS_SUMAR_SQL = text("""
+    UPDATE movie_stats
+    SET cantidad = cantidad + 1,
+        suma = suma + :rating,
+        histograma[:bucket] = histograma[:bucket] + 1,
+        actualizado = CURRENT_TIMESTAMP
+    WHERE id_pelicula = :id
+""")
+STATS_PELICULAS_SQL = text("""
+    SELECT id_pelicula, cantidad, promedio, histograma
+    FROM movie_stats
+    WHERE id_pelicula = ANY(:ids)
+""")
+TOP_COMUNIDAD_SQL = text("""
+    SELECT s.id_pelicula AS id, p.titulo, p.poster_path, s.cantidad, s.promedio
+    FROM movie_stats s
+    JOIN peliculas p ON p.id = s.id_pelicula
+    WHERE s.cantidad >= :minimo
+    ORDER BY s.promedio DESC, s.cantidad DESC
+    LIMIT :limite
+""")
+
+
+def _sumar_a_stats(conn, id_pelicula, rating):
+    conn.execute(STATS_CREAR_SQL, {"id": id_pelicula})
+    conn.execute(STATS_SUMAR_SQL, {"id": id_pelicula, "rating": rating, "bucket": bucket_rating(rating)})
+
+
+def _formatear_stats(fila):
+    """`fila` es (id_pelicula, cantidad, promedio, histograma) o None."""
+    if not fila:
+        return {"count": 0, "average": None, "histogram": {}}
+    _, cantidad, promedio, histograma = fila
+    return {
+        "count": cantidad,
+        "average": float(promedio) if promedio is not None else None,
+        "histogram": {f"{b / 2:.1f}": n for b, n in enumerate(histograma, start=1) if n},
+    }
+
+
+def obtener_stats_peliculas(ids):
+    """
+    Agregados de la comunidad para varias películas (una lectura por PK).
+
+    Returns:
+        dict id -> {"count", "average", "histogram"}; las películas sin
+        reviews tienen count 0
+    """
+    ids = list(ids)
+    if not ids:
+        return {}
+    with lecturas.conectar(*(("pelicula", i) for i in ids)) as conn:
+        filas = {f[0]: f for f in conn.execute(STATS_PELICULAS_SQL, {"ids": ids})}
+    return {i: _formatear_stats(filas.get(i)) for i in ids}
+
+
+def top_comunidad(limite=20, minimo_reviews=3):
+    """Películas mejor puntuadas por los usuarios (usa idx_movie_stats_promedio)."""
+    with lecturas.conectar() as conn:
+        result = conn.execute(TOP_COMUNIDAD_SQL, {"minimo": max(1, minimo_reviews), "limite": limitar_pagina(limite)})
+        return como_dicts(result)
+
+
+def reconstruir_movie_stats():
+    """Recalcula movie_stats desde reviews (backfill o reparación). Devuelve las filas escritas."""
+    query = text(f"""
+        INSERT INTO movie_stats (id_pelicula, cantidad, suma, histograma)
+        SELECT id_pelicula, COUNT(*), SUM(rating),
+               ARRAY[{", ".join(f"COUNT(*) FILTER (WHERE {_BUCKET_SQL} = {b})" for b in range(1, HISTOGRAMA_BUCKETS + 1))}]
+        FROM reviews
+        WHERE id_pelicula IS NOT NULL AND rating IS NOT NULL
+        GROUP BY id_pelicula
     """)
-    with engine.connect() as conn:
-        result = conn.execute(query)
-        return [dict(row) for row in result.mappings()]
+    with engine.begin() as conn:
+        conn.execute(text("LOCK TABLE movie_stats IN EXCLUSIVE MODE"))
+        conn.execute(text("DELETE FROM movie_stats"))
+        return conn.execute(query).rowcount
+
+# --- Paginación por cursor (keyset) ---
+# Ver paginacion.py: las listas se recorren por (fecha, id) descendente con
+# un cursor opaco.
+def _pagina(result, limite, col_fecha, col_id):
+    """Recorta la fila extra pedida y arma el cursor de la página siguiente."""
+    filas = result.fetchall()
+    items = como_dicts(result, filas[:limite])
+    siguiente = None
+    if len(filas) > limite:
+        ultimo = items[-1]
+        siguiente = codificar_cursor(ultimo[col_fecha], ultimo[col_id])
+    return items, siguiente
+
+
+REVIEWS_POR_PELICULA_SQL = _keyset("""
+    SELECT r.id, r.id_usuario, r.id_pelicula, r.rating, r.titulo, r.comentario, r.fecha,
+           u.nombre AS usuario
+    FROM reviews r
+    LEFT JOIN usuarios u ON u.id = r.id_usuario
+    WHERE r.id_pelicula = :id_pelicula {filtro}
+    ORDER BY r.fecha DESC, r.id DESC
+    LIMIT :limite
+""", "r.fecha", "r.id")
+
+REVIEWS_POR_USUARIO_SQL = _keyset("""
+    SELECT r.id, r.id_usuario, r.id_pelicula, r.rating, r.titulo, r.comentario, r.fecha,
+           p.titulo AS titulo_pelicula
+    FROM reviews r
+    LEFT JOIN peliculas p ON p.id = r.id_pelicula
+    WHERE r.id_usuario = :id_usuario {filtro}
+    ORDER BY r.fecha DESC, r.id DESC
+    LIMIT :limite
+""", "r.fecha", "r.id")
+
+LISTAR_PELICULAS_SQL = text("""
+    SELECT p.id, p.titulo, p.anio, d.nombre AS director
+    FROM peliculas p
+    LEFT JOIN directores d ON p.id_director = d.id
+    ORDER BY p.anio DESC;
+""")
+
+
+def listar_reviews_por_pelicula(id_pelicula, limite=None, cursor=None):
+    """
+    Una página de reviews de la película, de la más nueva a la más vieja.
+
+    Returns:
+        (items, next_cursor); next_cursor es None en la última página
+    """
+    limite = limitar_pagina(limite)
+    params = {"id_pelicula": id_pelicula, "limite": limite + 1, **_params_cursor(cursor)}
+    with lecturas.conectar(("pelicula", id_pelicula)) as conn:
+        result = conn.execute(REVIEWS_POR_PELICULA_SQL[bool(cursor)], params)
+        return _pagina(result, limite, "fecha", "id")
+
+def listar_reviews_por_usuario(id_usuario, limite=None, cursor=None):
+    """Una página de reviews del usuario; devuelve (items, next_cursor)."""
+    limite = limitar_pagina(limite)
+    params = {"id_usuario": id_usuario, "limite": limite + 1, **_params_cursor(cursor)}
+    with lecturas.conectar(("usuario", id_usuario)) as conn:
+        result = conn.execute(REVIEWS_POR_USUARIO_SQL[bool(cursor)], params)
+        return _pagina(result, limite, "fecha", "id")
+
+def listar_peliculas(stream=False):
+    """
+    Todas las películas del catálogo local. Con stream=True devuelve un
+    generador que las lee con un cursor del lado del servidor (para catálogos
+    importados con cientos de miles de filas).
+    """
+    if stream:
+        return iterar(LISTAR_PELICULAS_SQL)
+    with lecturas.conectar() as conn:
+        return como_dicts(conn.execute(LISTAR_PELICULAS_SQL))
+
+UPSERT_PELICULA_MINIMA_SQL = text("""
+    INSERT INTO peliculas (id, titulo, anio)
+    VALUES (:id, :titulo, :anio)
+    ON CONFLICT (id) DO NOTHING;
+""")
+
 
 def upsert_pelicula_minima(id_pelicula, titulo, anio=None):
-    query = text("""
-        INSERT INTO peliculas (id, titulo, anio)
-        VALUES (:id, :titulo, :anio)
-        ON CONFLICT (id) DO NOTHING;
-    """)
     with engine.begin() as conn:
-        conn.execute(query, {"id": id_pelicula, "titulo": titulo, "anio": anio})
+        conn.execute(UPSERT_PELICULA_MINIMA_SQL, {"id": id_pelicula, "titulo": titulo, "anio": anio})
+
+
+# --- Películas conocidas ---
+# IDs que ya tienen su fila completa en peliculas. Se completa a medida que
+# se escribe o se consulta la tabla, así el camino de escritura de reviews no
+# necesita volver a verificar películas que ya existen. Acotada (LRU) para
+# que no crezca con cada película reseñada.
+peliculas_conocidas = TTLCache(
+    "peliculas_conocidas",
+    max_items=int(os.getenv("PELICULAS_CONOCIDAS_MAX", "50000")),
+    ttl=float(os.getenv("PELICULAS_CONOCIDAS_TTL", "86400")),
+    stale_ttl=0,
+)
 
-def buscar_pelicula_por_titulo(nombre):
-    query = text("""
-        SELECT * FROM peliculas WHERE LOWER(titulo) LIKE LOWER(:nombre);
-    """)
+# Crea el placeholder si falta y dice si sigue pendiente de completar desde
+# TMDB: recién creado, o creado antes y con un relleno que nunca terminó
+# (tmdb_actualizado NULL). Las películas cargadas a mano no cuentan.
+ASEGURAR_PELICULA_SQL = text("""
+    WITH nueva AS (
+        INSERT INTO peliculas (id, titulo)
+        VALUES (:id, :titulo)
+        ON CONFLICT (id) DO NOTHING
+        RETURNING id
+    )
+    SELECT EXISTS (SELECT 1 FROM nueva)
+        OR EXISTS (SELECT 1 FROM peliculas
+                   WHERE id = :id AND titulo = :titulo AND tmdb_actualizado IS NULL)
+""")
+
+
+def asegurar_pelicula(id_pelicula: int) -> bool:
+    """
+    Garantiza que exista la fila de la película (creando un placeholder
+    "TMDB <id>" si hace falta).
+
+    Returns:
+        True si la fila es un placeholder sin completar (nuevo o de un
+        relleno anterior que falló) y hay que completar sus datos
+    """
+    if peliculas_conocidas.get(id_pelicula):
+        return False
+    with engine.begin() as conn:
+        pendiente = conn.execute(
+            ASEGURAR_PELICULA_SQL, {"id": id_pelicula, "titulo": f"TMDB {id_pelicula}"}
+        ).scalar()
+    if not pendiente:
+        peliculas_conocidas.set(id_pelicula, True)
+    return pendiente
+
+# --- Catálogo local (detalle de TMDB persistido) ---
+REPARTO_MAXIMO = 10
+
+
+GUARDAR_DIRECTOR_SQL = text("""
+    INSERT INTO directores (id, nombre)
+    VALUES (:id, :nombre)
+    ON CONFLICT (id) DO UPDATE SET nombre = EXCLUDED.nombre;
+""")
+
+GUARDAR_PELICULA_TMDB_SQL = text("""
+    INSERT INTO peliculas (id, titulo, anio, duracion, sinopsis, id_director,
+                           fecha_estreno, poster_path, backdrop_path, vote_average,
+                           proveedores, tmdb_actualizado)
+    VALUES (:id, :titulo, :anio, :duracion, :sinopsis, :id_director,
+            :fecha_estreno, :poster_path, :backdrop_path, :vote_average,
+            :proveedores, CURRENT_TIMESTAMP)
+    ON CONFLICT (id) DO UPDATE
+    SET titulo = EXCLUDED.titulo,
+        anio = EXCLUDED.anio,
+        duracion = EXCLUDED.duracion,
+        sinopsis = EXCLUDED.sinopsis,
+        id_director = EXCLUDED.id_director,
+        fecha_estreno = EXCLUDED.fecha_estreno,
+        poster_path = EXCLUDED.poster_path,
+        backdrop_path = EXCLUDED.backdrop_path,
+        vote_average = EXCLUDED.vote_average,
+        proveedores = EXCLUDED.proveedores,
+        tmdb_actualizado = EXCLUDED.tmdb_actualizado;
+""")
+
+BORRAR_GENEROS_PELICULA_SQL = text("DELETE FROM peliculas_generos WHERE id_pelicula = :id")
+
+GUARDAR_GENEROS_SQL = text("""
+    INSERT INTO generos (id, nombre)
+    VALUES (:id, :nombre)
+    ON CONFLICT (id) DO UPDATE SET nombre = EXCLUDED.nombre;
+""")
+
+GUARDAR_PELICULAS_GENEROS_SQL = text("""
+    INSERT INTO peliculas_generos (id_pelicula, id_genero)
+    VALUES (:id_pelicula, :id_genero)
+    ON CONFLICT DO NOTHING;
+""")
+
+BORRAR_REPARTO_SQL = text("DELETE FROM reparto WHERE id_pelicula = :id")
+
+GUARDAR_ACTORES_SQL = text("""
+    INSERT INTO actores (id, nombre)
+    VALUES (:id, :nombre)
+    ON CONFLICT (id) DO UPDATE SET nombre = EXCLUDED.nombre;
+""")
+
+GUARDAR_REPARTO_SQL = text("""
+    INSERT INTO reparto (id_pelicula, id_actor, rol, orden)
+    VALUES (:id_pelicula, :id_actor, :rol, :orden)
+    ON CONFLICT (id_pelicula, id_actor) DO NOTHING;
+""")
+
+
+def guardar_pelicula_tmdb(data: dict, proveedores: dict | None = None):
+    """
+    Guarda el detalle de TMDB (con credits anexado) en peliculas, directores,
+    actores, reparto, generos y peliculas_generos en una sola transacción.
+    """
+    id_pelicula = data["id"]
+    credits = data.get("credits") or {}
+    director = next((c for c in credits.get("crew", []) if c.get("job") == "Director" and c.get("id")), None)
+    cast = [c for c in credits.get("cast", []) if c.get("id") and c.get("name")][:REPARTO_MAXIMO]
+    generos = [g for g in data.get("genres", []) if g.get("id") and g.get("name")]
+    fecha = data.get("release_date") or None
+
+    with engine.begin() as conn:
+        if director:
+            conn.execute(GUARDAR_DIRECTOR_SQL, {"id": director["id"], "nombre": director["name"][:100]})
+
+        conn.execute(GUARDAR_PELICULA_TMDB_SQL, {
+            "id": id_pelicula,
+            "titulo": (data.get("title") or data.get("original_title") or f"TMDB {id_pelicula}")[:150],
+            "anio": int(fecha[:4]) if fecha else None,
+            "duracion": data.get("runtime"),
+            "sinopsis": data.get("overview"),
+            "id_director": director["id"] if director else None,
+            "fecha_estreno": fecha,
+            "poster_path": data.get("poster_path"),
+            "backdrop_path": data.get("backdrop_path"),
+            "vote_average": data.get("vote_average"),
+            "proveedores": json.dumps(proveedores) if proveedores is not None else None,
+        })
+
+        conn.execute(BORRAR_GENEROS_PELICULA_SQL, {"id": id_pelicula})
+        if generos:
+            conn.execute(GUARDAR_GENEROS_SQL, [{"id": g["id"], "nombre": g["name"][:50]} for g in generos])
+            conn.execute(GUARDAR_PELICULAS_GENEROS_SQL, [{"id_pelicula": id_pelicula, "id_genero": g["id"]} for g in generos])
+
+        conn.execute(BORRAR_REPARTO_SQL, {"id": id_pelicula})
+        if cast:
+            conn.execute(GUARDAR_ACTORES_SQL, [{"id": c["id"], "nombre": c["name"][:100]} for c in cast])
+            conn.execute(GUARDAR_REPARTO_SQL, [{
+                "id_pelicula": id_pelicula,
+                "id_actor": c["id"],
+                "rol": (c.get("character") or "")[:100] or None,
+                "orden": i,
+            } for i, c in enumerate(cast)])
+
+    peliculas_conocidas.set(id_pelicula, True)
+
+
+PELICULA_CATALOGO_SQL = text("""
+    SELECT p.id, p.titulo, p.duracion, p.sinopsis, p.fecha_estreno,
+           p.poster_path, p.backdrop_path, p.vote_average, p.proveedores,
+           d.nombre AS director,
+           EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - p.tmdb_actualizado)) AS edad_segundos,
+           ARRAY(
+               SELECT g.nombre FROM peliculas_generos pg
+               JOIN generos g ON g.id = pg.id_genero
+               WHERE pg.id_pelicula = p.id
+               ORDER BY g.nombre
+           ) AS generos,
+           ARRAY(
+               SELECT a.nombre FROM reparto r
+               JOIN actores a ON a.id = r.id_actor
+               WHERE r.id_pelicula = p.id
+               ORDER BY r.orden NULLS LAST
+           ) AS reparto
+    FROM peliculas p
+    LEFT JOIN directores d ON d.id = p.id_director
+    WHERE p.id = :id AND p.tmdb_actualizado IS NOT NULL
+""")
+
+BUSCAR_TITULO_SQL = text("""
+    SELECT * FROM peliculas WHERE LOWER(titulo) LIKE LOWER(:nombre);
+""")
+
+
+def obtener_pelicula_catalogo(id_pelicula: int):
+    """
+    Devuelve la película del catálogo local con director, géneros y reparto,
+    o None si nunca se cargó su detalle desde TMDB. Incluye `edad_segundos`
+    desde la última actualización para decidir si refrescarla.
+    """
     with engine.connect() as conn:
-        result = conn.execute(query, {"nombre": f"%{nombre}%"})
-        return [dict(row) for row in result.mappings()]
+        return como_dict(conn.execute(PELICULA_CATALOGO_SQL, {"id": id_pelicula}))
 
 
+def buscar_pelicula_por_titulo(nombre):
+    with lecturas.conectar() as conn:
+        return como_dicts(conn.execute(BUSCAR_TITULO_SQL, {"nombre": f"%{nombre}%"}))
+
+
+
+REGISTRAR_USUARIO_SQL = text("""
+    INSERT INTO usuarios (nombre, email, contrasena_hash)
+    VALUES (:nombre, :email, :contrasena_hash)
+    RETURNING id;
+""")
+
 
 def registrar_usuario(nombre, email, contrasena):
     contrasena_hash = bcrypt.generate_password_hash(contrasena).decode("utf-8")
-    query = text("""
-        INSERT INTO usuarios (nombre, email, contrasena_hash)
-        VALUES (:nombre, :email, :contrasena_hash)
-        RETURNING id;
-    """)
     with engine.begin() as conn:
-        result = conn.execute(query, {
+        result = conn.execute(REGISTRAR_USUARIO_SQL, {
             "nombre": nombre,
             "email": email,
             "contrasena_hash": contrasena_hash
         })
-        return result.scalar()
+        user_id = result.scalar()
+    invalidar_usuario(user_id)
+    lecturas.registrar_escritura("usuarios")
+    return user_id
+
+USUARIO_POR_EMAIL_SQL = text("SELECT * FROM usuarios WHERE email = :email")
+USUARIO_POR_ID_SQL = text("SELECT * FROM usuarios WHERE id = :id")
+
 
 def buscar_usuario_por_email(email):
-    query = text("SELECT * FROM usuarios WHERE email = :email")
     with engine.connect() as conn:
-        result = conn.execute(query, {"email": email}).mappings().fetchone()
-        return result
-
-def agregar_a_lista(id_usuario, id_pelicula, titulo, poster_url):
-    """Agrega una película a la lista del usuario."""
-    query = text("""
-        INSERT INTO lista_usuario (id_usuario, id_pelicula, titulo, poster_url)
-        VALUES (:id_usuario, :id_pelicula, :titulo, :poster_url)
-        ON CONFLICT (id_usuario, id_pelicula) DO NOTHING
-    """)
+        return como_dict(conn.execute(USUARIO_POR_EMAIL_SQL, {"email": email}))
+
+
+# --- Caché de usuarios por id ---
+# buscar_usuario_por_id se repite varias veces por request (admin que opera,
+# usuario afectado, autor de una review). Dentro de un request se memoriza en
+# flask.g; entre requests se usa una caché chica con TTL corto, que además
+# acota el desfase entre workers. Registrar o desactivar un usuario invalida
+# su entrada. Los ids inexistentes no se cachean.
+usuarios_cache = TTLCache(
+    "usuarios",
+    max_items=int(os.getenv("USUARIOS_CACHE_MAX", "1000")),
+    ttl=float(os.getenv("USUARIOS_CACHE_TTL", "30")),
+    stale_ttl=0,
+)
+
+
+def _usuarios_del_request():
+    """Memo de usuarios del request actual (None fuera de un request)."""
+    if not has_request_context():
+        return None
+    if "usuarios_por_id" not in g:
+        g.usuarios_por_id = {}
+    return g.usuarios_por_id
+
+
+def invalidar_usuario(user_id: int):
+    usuarios_cache.invalidar(user_id)
+    memo = _usuarios_del_request()
+    if memo is not None:
+        memo.pop(user_id, None)
+
+
 def buscar_usuario_por_id(user_id: int):
-    query = text("SELECT * FROM usuarios WHERE id = :id")
-    with engine.connect() as conn:
-        result = conn.execute(query, {"id": user_id}).mappings().fetchone()
-        return result
+    """Fila del usuario como dict (copia propia del llamador), o None si no existe."""
+    memo = _usuarios_del_request()
+    usuario = memo.get(user_id) if memo is not None else None
+    if usuario is None:
+        usuario = usuarios_cache.get(user_id)
+        usuarios_cache.contar_consulta(hit=usuario is not None)
+        if usuario is None:
+            with engine.connect() as conn:
+                usuario = como_dict(conn.execute(USUARIO_POR_ID_SQL, {"id": user_id}))
+            if usuario is None:
+                return None
+            usuarios_cache.set(user_id, usuario)
+        if memo is not None:
+            memo[user_id] = usuario
+    return dict(usuario)
+
+
+LISTAR_USUARIOS_SQL = _keyset("""
+    SELECT id, nombre, email, fecha_registro, es_admin, activo
+    FROM usuarios
+    WHERE TRUE {filtro}
+    ORDER BY fecha_registro DESC, id DESC
+    LIMIT :limite;
+""", "fecha_registro", "id")
+
+
+def listar_usuarios(limite=None, cursor=None):
+    """Una página del directorio de usuarios (más recientes primero); devuelve (items, next_cursor)."""
+    limite = limitar_pagina(limite)
+    params = {"limite": limite + 1, **_params_cursor(cursor)}
+    with lecturas.conectar("usuarios") as conn:
+        result = conn.execute(LISTAR_USUARIOS_SQL[bool(cursor)], params)
+        return _pagina(result, limite, "fecha_registro", "id")
+
+DESACTIVAR_USUARIO_SQL = text("UPDATE usuarios SET activo = FALSE WHERE id = :id")
 
-def listar_usuarios():
-    query = text(
-        """
-        SELECT id, nombre, email, fecha_registro, es_admin, activo
-        FROM usuarios
-        ORDER BY fecha_registro DESC;
-        """
-    )
-    with engine.connect() as conn:
-        rows = conn.execute(query).mappings().fetchall()
-        return [dict(row) for row in rows]
 
 def desactivar_usuario(user_id: int):
-    query = text(
-        """
-        UPDATE usuarios
-        SET activo = FALSE
-        WHERE id = :id;
-        """
-    )
     with engine.begin() as conn:
-        conn.execute(query, {"id": user_id})
+        conn.execute(DESACTIVAR_USUARIO_SQL, {"id": user_id})
+    invalidar_usuario(user_id)
+    lecturas.registrar_escritura("usuarios")
 
 # --- Lista de usuario (favoritos / mi lista) ---
+AGREGAR_A_LISTA_SQL = text("""
+    INSERT INTO lista_usuario (id_usuario, id_pelicula, titulo, poster_url)
+    VALUES (:id_usuario, :id_pelicula, :titulo, :poster_url)
+    ON CONFLICT (id_usuario, id_pelicula) DO UPDATE
+    SET titulo = EXCLUDED.titulo,
+        poster_url = EXCLUDED.poster_url,
+        fecha_agregado = CURRENT_TIMESTAMP;
+""")
+
+
 def agregar_a_lista(id_usuario: int, id_pelicula: int, titulo: str, poster_url: str | None = None):
     """Inserta o actualiza una película en la lista del usuario."""
-    query = text(
-        """
-        INSERT INTO lista_usuario (id_usuario, id_pelicula, titulo, poster_url)
-        VALUES (:id_usuario, :id_pelicula, :titulo, :poster_url)
-        ON CONFLICT (id_usuario, id_pelicula) DO UPDATE
-        SET titulo = EXCLUDED.titulo,
-            poster_url = EXCLUDED.poster_url,
-            fecha_agregado = CURRENT_TIMESTAMP;
-        """
-    )
     with engine.begin() as conn:
-        conn.execute(query, {
+        conn.execute(AGREGAR_A_LISTA_SQL, {
             "id_usuario": id_usuario,
             "id_pelicula": id_pelicula,
             "titulo": titulo,
             "poster_url": poster_url
         })
+    lecturas.registrar_escritura(("usuario", id_usuario))
 
-def eliminar_de_lista(id_usuario, id_pelicula):
-    """Elimina una película de la lista del usuario."""
-    query = text("""
-        DELETE FROM lista_usuario
-        WHERE id_usuario = :id_usuario AND id_pelicula = :id_pelicula
-    """)
-    with engine.begin() as conn:
-        conn.execute(query, {
-            "id_usuario": id_usuario,
-            "id_pelicula": id_pelicula
-        })
+ELIMINAR_DE_LISTA_SQL = text("""
+    DELETE FROM lista_usuario
+    WHERE id_usuario = :id_usuario AND id_pelicula = :id_pelicula;
+""")
+
+LISTA_USUARIO_SQL = _keyset("""
+    SELECT id_pelicula AS id, titulo, poster_url, fecha_agregado
+    FROM lista_usuario
+    WHERE id_usuario = :id_usuario {filtro}
+    ORDER BY fecha_agregado DESC, id_pelicula DESC
+    LIMIT :limite;
+""", "fecha_agregado", "id_pelicula")
 
-def obtener_lista_usuario(id_usuario):
-    """Obtiene la lista de películas de un usuario."""
-    query = text("""
-        SELECT id_pelicula, titulo, poster_url, fecha_agregado
-        FROM lista_usuario
-        WHERE id_usuario = :id_usuario
-        ORDER BY fecha_agregado DESC
-    """)
-    with engine.connect() as conn:
-        rows = conn.execute(query, {"id_usuario": id_usuario}).mappings().fetchall()
-        return [dict(row) for row in rows]
 
 def eliminar_de_lista(id_usuario: int, id_pelicula: int):
-    query = text(
-        """
-        DELETE FROM lista_usuario
-        WHERE id_usuario = :id_usuario AND id_pelicula = :id_pelicula;
-        """
-    )
     with engine.begin() as conn:
-        conn.execute(query, {"id_usuario": id_usuario, "id_pelicula": id_pelicula})
-
-def obtener_lista_usuario(id_usuario: int):
-    query = text(
-        """
-        SELECT id_pelicula AS id, titulo, poster_url, fecha_agregado
-        FROM lista_usuario
-        WHERE id_usuario = :id_usuario
-        ORDER BY fecha_agregado DESC;
-        """
-    )
-    with engine.connect() as conn:
-        rows = conn.execute(query, {"id_usuario": id_usuario}).mappings().fetchall()
-        return [dict(row) for row in rows]
+        conn.execute(ELIMINAR_DE_LISTA_SQL, {"id_usuario": id_usuario, "id_pelicula": id_pelicula})
+    lecturas.registrar_escritura(("usuario", id_usuario))
+
+def obtener_lista_usuario(id_usuario: int, limite=None, cursor=None):
+    """Una página de la lista del usuario (lo último agregado primero); devuelve (items, next_cursor)."""
+    limite = limitar_pagina(limite)
+    params = {"id_usuario": id_usuario, "limite": limite + 1, **_params_cursor(cursor)}
+    with lecturas.conectar(("usuario", id_usuario)) as conn:
+        result = conn.execute(LISTA_USUARIO_SQL[bool(cursor)], params)
+        return _pagina(result, limite, "fecha_agregado", "id")
+
+
+LISTA_CONTIENE_SQL = text("""
+    SELECT id_pelicula FROM lista_usuario
+    WHERE id_usuario = :id_usuario AND id_pelicula = ANY(:ids)
+""")
+LISTA_CANTIDAD_SQL = text("SELECT COUNT(*) FROM lista_usuario WHERE id_usuario = :id_usuario")
+
+
+def lista_contiene(id_usuario: int, ids):
+    """Subconjunto de `ids` que está en la lista del usuario (búsqueda por PK)."""
+    ids = list(ids)
+    if not ids:
+        return set()
+    with lecturas.conectar(("usuario", id_usuario)) as conn:
+        return {f[0] for f in conn.execute(LISTA_CONTIENE_SQL, {"id_usuario": id_usuario, "ids": ids})}
+
+
+def contar_lista(id_usuario: int) -> int:
+    with lecturas.conectar(("usuario", id_usuario)) as conn:
+        return conn.execute(LISTA_CANTIDAD_SQL, {"id_usuario": id_usuario}).scalar()
+
+
+LISTA_LOTE_ELIMINAR_SQL = text("""
+    DELETE FROM lista_usuario
+    WHERE id_usuario = :id_usuario AND id_pelicula = ANY(:ids)
+    RETURNING id_pelicula
+""")
+LISTA_LOTE_AGREGAR_SQL = text("""
+    INSERT INTO lista_usuario (id_usuario, id_pelicula, titulo, poster_url)
+    SELECT :id_usuario, t.id_pelicula, t.titulo, t.poster_url
+    FROM unnest(CAST(:ids AS INT[]), CAST(:titulos AS VARCHAR[]), CAST(:posters AS TEXT[]))
+         AS t(id_pelicula, titulo, poster_url)
+    ON CONFLICT (id_usuario, id_pelicula) DO NOTHING
+    RETURNING id_pelicula
+""")
+
+
+def actualizar_lista_lote(id_usuario: int, agregar, eliminar):
+    """
+    Agrega y quita varias películas de la lista del usuario en una sola
+    transacción (un INSERT multi-fila y un DELETE con ANY). Primero se
+    eliminan y después se agregan, así un id presente en ambas queda en la lista.
+    Las películas que ya estaban no se modifican.
+
+    Args:
+        agregar: lista de dicts con id_pelicula, titulo y poster_url
+        eliminar: lista de ids de película
+
+    Returns:
+        (ids agregados, ids eliminados)
+    """
+    agregados, eliminados = set(), set()
+    with engine.begin() as conn:
+        if eliminar:
+            filas = conn.execute(LISTA_LOTE_ELIMINAR_SQL, {"id_usuario": id_usuario, "ids": list(eliminar)})
+            eliminados = {f[0] for f in filas}
+        if agregar:
+            filas = conn.execute(LISTA_LOTE_AGREGAR_SQL, {
+                "id_usuario": id_usuario,
+                "ids": [item["id_pelicula"] for item in agregar],
+                "titulos": [item["titulo"] for item in agregar],
+                "posters": [item.get("poster_url") for item in agregar],
+            })
+            agregados = {f[0] for f in filas}
+    lecturas.registrar_escritura(("usuario", id_usuario))
+    return agregados, eliminados
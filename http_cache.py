@@ -0,0 +1,129 @@
+"""
+Respuestas JSON cacheables.
+Los payloads derivados de TMDB (listados, detalle, búsquedas) se serializan
+una sola vez y se guardan como bytes junto con su hash (ETag). Las rutas
+responden 304 a If-None-Match y envían Cache-Control/Vary para que el
+navegador o una CDN absorban las visitas repetidas. La variante comprimida
+(brotli/gzip) de cada payload también se calcula una sola vez: con el nivel
+por defecto la primera vez y con el máximo recién cuando el payload se
+reutiliza desde la PayloadCache, así los cuerpos de un solo uso (batch,
+búsquedas derivadas) no pagan brotli 11.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Callable, Hashable, Optional
+
+from flask import Response, request
+
+import compresion
+from cache import TTLCache
+
+MAX_AGE_LISTADOS = int(os.getenv("HTTP_MAX_AGE_LISTADOS", "60"))
+STALE_WHILE_REVALIDATE = int(os.getenv("HTTP_STALE_WHILE_REVALIDATE", "600"))
+
+
+class Payload:
+    """Cuerpo JSON ya serializado con su ETag y sus variantes comprimidas."""
+    __slots__ = ("body", "etag", "variantes", "reutilizado")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.variantes = {}  # codificación -> (bytes, comprimido al máximo)
+        self.reutilizado = False
+
+    def codificacion_para(self, codificacion: Optional[str]) -> Optional[str]:
+        """Codificación efectiva: los cuerpos chicos se envían sin comprimir."""
+        if codificacion is None or len(self.body) < compresion.MIN_BYTES:
+            return None
+        return codificacion
+
+    def etag_para(self, codificacion: Optional[str]) -> str:
+        # Cada codificación es una representación distinta con su propio ETag
+        return self.etag if codificacion is None else f"{self.etag}-{codificacion}"
+
+    def variante(self, codificacion: Optional[str]) -> bytes:
+        """
+        Cuerpo en la codificación pedida (None = sin comprimir). Se comprime
+        con el nivel por defecto y se recomprime al máximo una sola vez si el
+        payload pasa a reutilizarse.
+        """
+        codificacion = self.codificacion_para(codificacion)
+        if codificacion is None:
+            return self.body
+        comprimido, maxima = self.variantes.get(codificacion, (None, False))
+        if comprimido is None or (self.reutilizado and not maxima):
+            comprimido = compresion.comprimir(self.body, codificacion, maxima=self.reutilizado)
+            self.variantes[codificacion] = (comprimido, self.reutilizado)
+        return comprimido
+
+    @classmethod
+    def desde_datos(cls, data: Any) -> "Payload":
+        return cls(serializar(data))
+
+
+def serializar(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _mismo_origen(a: Any, b: Any) -> bool:
+    if a is b:
+        return True
+    return (isinstance(a, tuple) and isinstance(b, tuple) and len(a) == len(b)
+            and all(x is y for x, y in zip(a, b)))
+
+
+class PayloadCache:
+    """
+    Guarda el Payload armado a partir de un objeto de otra caché. Mientras
+    el objeto de origen sea el mismo (misma identidad) se reutilizan los
+    bytes; cuando la caché de origen lo reemplaza, se vuelve a serializar.
+    El origen puede ser una tupla de objetos cacheados: se compara la
+    identidad de cada elemento.
+    """
+
+    def __init__(self, nombre: str, max_items: int = 2000):
+        self._datos = TTLCache(nombre, max_items=max_items, ttl=float("inf"), stale_ttl=0)
+
+    def obtener(self, clave: Hashable, origen: Any, armar: Callable[[Any], Any]) -> Payload:
+        entrada = self._datos.get(clave)
+        if entrada is not None and _mismo_origen(entrada[0], origen):
+            self._datos.contar_consulta(hit=True)
+            entrada[1].reutilizado = True
+            return entrada[1]
+        self._datos.contar_consulta(hit=False)
+        payload = Payload.desde_datos(armar(origen))
+        self._datos.set(clave, (origen, payload))
+        return payload
+
+    def stats(self):
+        return self._datos.stats()
+
+
+def responder(payload: Payload, max_age: Optional[int] = MAX_AGE_LISTADOS, status: int = 200) -> Response:
+    """
+    Respuesta JSON con ETag, Cache-Control y Vary; 304 si el cliente ya la
+    tiene (sin comprimir nada). Si el cliente acepta compresión se envía la
+    variante comprimida. Con max_age=None se manda `no-cache`: el cliente
+    guarda la respuesta pero la revalida con el ETag en cada uso.
+    """
+    codificacion = payload.codificacion_para(compresion.elegir_codificacion())
+    etag = payload.etag_para(codificacion)
+    if status == 200 and request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(payload.variante(codificacion), status=status, mimetype="application/json")
+        if codificacion is not None:
+            resp.headers["Content-Encoding"] = codificacion
+    resp.set_etag(etag)
+    if max_age is None:
+        resp.headers["Cache-Control"] = "no-cache"
+    else:
+        resp.headers["Cache-Control"] = f"public, max-age={max_age}, stale-while-revalidate={STALE_WHILE_REVALIDATE}"
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+
+def responder_bytes(body: bytes, max_age: Optional[int] = MAX_AGE_LISTADOS, status: int = 200) -> Response:
+    return responder(Payload(body), max_age=max_age, status=status)
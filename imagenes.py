@@ -0,0 +1,182 @@
+"""
+Proxy de imágenes de TMDB con caché en disco.
+Cada póster se descarga una sola vez por tamaño y queda guardado en
+IMAGE_CACHE_DIR; el directorio tiene un tope de tamaño y, al pasarse, se
+borran los archivos usados hace más tiempo (LRU por mtime, que se renueva en
+cada acierto). Los tamaños son las variantes que ya publica TMDB (w92..w780),
+así cada card pide la que necesita sin redimensionar acá.
+"""
+import os
+import re
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from singleflight import SingleFlight
+
+IMAGE_BASE_URL = os.getenv("TMDB_IMAGE_URL", "https://image.tmdb.org/t/p").rstrip("/")
+IMAGE_CACHE_DIR = os.getenv(
+    "IMAGE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "img"),
+)
+IMAGE_CACHE_MAX_BYTES = int(float(os.getenv("IMAGE_CACHE_MAX_MB", "512")) * 1024 * 1024)
+IMAGE_TIMEOUT = float(os.getenv("IMAGE_TIMEOUT", "5"))
+
+# Variantes publicadas por TMDB que se pueden pedir al proxy
+TAMANOS = ("w92", "w154", "w185", "w300", "w342", "w500", "w780", "w1280")
+TAMANO_POSTER = "w500"
+TAMANO_BACKDROP = "w1280"
+TAMANO_LOGO = "w92"
+
+PLACEHOLDER = "/static/img/placeholder.svg"
+
+# Cache-Control para imágenes: el contenido de un path de TMDB no cambia
+MAX_AGE_IMAGEN = 365 * 24 * 3600
+# Si TMDB no respondió, el placeholder se cachea poco para reintentar pronto
+MAX_AGE_PLACEHOLDER = 60
+
+_NOMBRE_VALIDO = re.compile(r"^[A-Za-z0-9_-]+\.(jpg|jpeg|png|svg|webp)$")
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=10, max_retries=1))
+_session.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=10, max_retries=1))
+
+# Varias cards pidiendo el mismo póster a la vez generan una sola descarga
+descargas = SingleFlight("imagenes")
+
+_lock = threading.Lock()
+_bytes_en_disco: Optional[int] = None
+contadores = {"hits": 0, "descargas": 0, "errores": 0, "no_encontradas": 0, "desalojos": 0}
+
+
+class ImagenNoDisponible(Exception):
+    """No se pudo obtener la imagen de TMDB."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def url(path: Optional[str], tamano: str = TAMANO_POSTER) -> Optional[str]:
+    """URL del proxy para un path de TMDB (p. ej. '/abc.jpg'), o None si no hay imagen."""
+    if not path:
+        return None
+    return f"/img/{tamano}/{path.lstrip('/')}"
+
+
+def nombre_valido(tamano: str, nombre: str) -> bool:
+    return tamano in TAMANOS and bool(_NOMBRE_VALIDO.match(nombre))
+
+
+def _ruta_local(tamano: str, nombre: str) -> str:
+    return os.path.join(IMAGE_CACHE_DIR, tamano, nombre)
+
+
+def _calcular_uso() -> int:
+    total = 0
+    for raiz, _, archivos in os.walk(IMAGE_CACHE_DIR):
+        for archivo in archivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, archivo))
+            except OSError:
+                pass
+    return total
+
+
+def _registrar_escritura(tamano_bytes: int):
+    """Suma el archivo nuevo al uso del disco y desaloja si se pasó del tope."""
+    global _bytes_en_disco
+    with _lock:
+        if _bytes_en_disco is None:
+            _bytes_en_disco = _calcular_uso()
+        else:
+            _bytes_en_disco += tamano_bytes
+        if _bytes_en_disco > IMAGE_CACHE_MAX_BYTES:
+            _desalojar()
+
+
+def _desalojar():
+    """Borra los archivos menos usados hasta quedar en el 90% del tope (con _lock tomado)."""
+    global _bytes_en_disco
+    archivos = []
+    for raiz, _, nombres in os.walk(IMAGE_CACHE_DIR):
+        for nombre in nombres:
+            ruta = os.path.join(raiz, nombre)
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                continue
+            archivos.append((st.st_mtime, st.st_size, ruta))
+    archivos.sort()
+
+    objetivo = IMAGE_CACHE_MAX_BYTES * 0.9
+    total = sum(a[1] for a in archivos)
+    for _, tamano_bytes, ruta in archivos:
+        if total <= objetivo:
+            break
+        try:
+            os.remove(ruta)
+        except OSError:
+            continue
+        total -= tamano_bytes
+        contadores["desalojos"] += 1
+    _bytes_en_disco = total
+
+
+def _descargar(tamano: str, nombre: str) -> str:
+    destino = _ruta_local(tamano, nombre)
+    try:
+        resp = _session.get(f"{IMAGE_BASE_URL}/{tamano}/{nombre}", timeout=IMAGE_TIMEOUT)
+    except requests.RequestException as e:
+        contadores["errores"] += 1
+        raise ImagenNoDisponible(f"Error de conexión con TMDB: {e}")
+    if resp.status_code != 200:
+        if resp.status_code == 404:
+            contadores["no_encontradas"] += 1
+        else:
+            contadores["errores"] += 1
+        raise ImagenNoDisponible(f"TMDB respondió {resp.status_code} para {tamano}/{nombre}", resp.status_code)
+
+    # Se escribe en un temporal y se renombra para no servir archivos a medias
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(resp.content)
+        os.replace(temporal, destino)
+    except OSError:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    contadores["descargas"] += 1
+    _registrar_escritura(len(resp.content))
+    return destino
+
+
+def obtener(tamano: str, nombre: str) -> str:
+    """
+    Devuelve la ruta local de la imagen, descargándola de TMDB si no está.
+
+    Raises:
+        ImagenNoDisponible: si TMDB no la tiene o no respondió
+    """
+    ruta = _ruta_local(tamano, nombre)
+    try:
+        os.utime(ruta)  # renueva la antigüedad para el desalojo LRU
+        contadores["hits"] += 1
+        return ruta
+    except FileNotFoundError:
+        pass
+    return descargas.do((tamano, nombre), lambda: _descargar(tamano, nombre), timeout=IMAGE_TIMEOUT * 2)
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        **contadores,
+        "bytes_en_disco": _bytes_en_disco,
+        "max_bytes": IMAGE_CACHE_MAX_BYTES,
+        "singleflight": descargas.stats(),
+    }
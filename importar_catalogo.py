@@ -0,0 +1,335 @@
+"""
+Importador masivo del catálogo local desde archivos JSON-lines de TMDB.
+
+Lee los exports diarios de TMDB (movie_ids_MM_DD_YYYY.json.gz: id y
+título) o dumps propios con el detalle completo (genres, credits, etc.),
+comprimidos con gzip o no, línea por línea. Cada lote se carga con COPY en
+tablas de staging temporales y se fusiona con upserts en peliculas,
+directores, actores, reparto, generos y peliculas_generos, en una
+transacción por lote. La memoria usada depende del tamaño del lote, no del
+archivo.
+
+Después de cada lote se guarda un checkpoint (<archivo>.checkpoint), así
+una importación interrumpida continúa desde el último lote confirmado:
+
+    python importar_catalogo.py movie_ids_10_17_2026.json.gz
+    python importar_catalogo.py dump_detalles.jsonl.gz --lote 5000
+    python importar_catalogo.py dump.jsonl.gz --reiniciar   # ignora el checkpoint
+
+Los datos ya cargados no se pisan con valores vacíos: un export con sólo
+el título no borra la sinopsis o el director traídos antes. Las películas
+importadas quedan sin tmdb_actualizado, así que la primera vista del
+detalle completa proveedores desde TMDB como siempre. Un género que llega
+con un nombre ya cargado bajo otro id se asocia a ese id (generos.nombre es
+único) en lugar de abortar el lote.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import time
+
+import db
+
+LOTE_DEFAULT = int(os.getenv("IMPORTAR_LOTE", "20000"))
+
+STAGING_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS stg_peliculas (
+    id INT, titulo VARCHAR(150), titulo_original VARCHAR(150), anio INT, duracion INT,
+    sinopsis TEXT, id_director INT,
+    fecha_estreno DATE, poster_path TEXT, backdrop_path TEXT, vote_average REAL,
+    con_generos BOOLEAN, con_reparto BOOLEAN
+) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS stg_directores (id INT, nombre VARCHAR(100)) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS stg_generos (id INT, nombre VARCHAR(50)) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS stg_peliculas_generos (id_pelicula INT, id_genero INT) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS stg_actores (id INT, nombre VARCHAR(100)) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS stg_reparto (
+    id_pelicula INT, id_actor INT, rol VARCHAR(100), orden INT
+) ON COMMIT DELETE ROWS;
+"""
+
+STAGING_COLUMNAS = {
+    "stg_peliculas": ("id", "titulo", "titulo_original", "anio", "duracion", "sinopsis", "id_director",
+                      "fecha_estreno", "poster_path", "backdrop_path", "vote_average", "con_generos", "con_reparto"),
+    "stg_directores": ("id", "nombre"),
+    "stg_generos": ("id", "nombre"),
+    "stg_peliculas_generos": ("id_pelicula", "id_genero"),
+    "stg_actores": ("id", "nombre"),
+    "stg_reparto": ("id_pelicula", "id_actor", "rol", "orden"),
+}
+
+# Orden de fusión: primero las tablas referenciadas por claves foráneas
+MERGE_SQL = """
+INSERT INTO directores (id, nombre)
+SELECT id, nombre FROM stg_directores
+ON CONFLICT (id) DO UPDATE SET nombre = EXCLUDED.nombre;
+
+INSERT INTO peliculas (id, titulo, anio, duracion, sinopsis, id_director,
+                       fecha_estreno, poster_path, backdrop_path, vote_average)
+SELECT s.id, COALESCE(s.titulo, p.titulo, s.titulo_original, 'TMDB ' || s.id),
+       s.anio, s.duracion, s.sinopsis, s.id_director,
+       s.fecha_estreno, s.poster_path, s.backdrop_path, s.vote_average
+FROM stg_peliculas s
+LEFT JOIN peliculas p ON p.id = s.id
+ON CONFLICT (id) DO UPDATE
+SET titulo = EXCLUDED.titulo,
+    anio = COALESCE(EXCLUDED.anio, peliculas.anio),
+    duracion = COALESCE(EXCLUDED.duracion, peliculas.duracion),
+    sinopsis = COALESCE(EXCLUDED.sinopsis, peliculas.sinopsis),
+    id_director = COALESCE(EXCLUDED.id_director, peliculas.id_director),
+    fecha_estreno = COALESCE(EXCLUDED.fecha_estreno, peliculas.fecha_estreno),
+    poster_path = COALESCE(EXCLUDED.poster_path, peliculas.poster_path),
+    backdrop_path = COALESCE(EXCLUDED.backdrop_path, peliculas.backdrop_path),
+    vote_average = COALESCE(EXCLUDED.vote_average, peliculas.vote_average);
+
+-- generos.nombre es UNIQUE: un nombre que ya existe con otro id (o que se
+-- repite dentro del lote) no se inserta y las películas se asocian al id
+-- que ya lo tiene (ver GENEROS_CONFLICTOS_SQL)
+INSERT INTO generos (id, nombre)
+SELECT DISTINCT ON (s.nombre) s.id, s.nombre
+FROM stg_generos s
+WHERE NOT EXISTS (SELECT 1 FROM generos g WHERE g.nombre = s.nombre AND g.id <> s.id)
+ORDER BY s.nombre, s.id
+ON CONFLICT (id) DO UPDATE SET nombre = EXCLUDED.nombre;
+
+DELETE FROM peliculas_generos pg
+USING stg_peliculas s
+WHERE pg.id_pelicula = s.id AND s.con_generos;
+
+INSERT INTO peliculas_generos (id_pelicula, id_genero)
+SELECT spg.id_pelicula, g.id
+FROM stg_peliculas_generos spg
+JOIN stg_generos sg ON sg.id = spg.id_genero
+JOIN generos g ON g.nombre = sg.nombre
+ON CONFLICT DO NOTHING;
+
+INSERT INTO actores (id, nombre)
+SELECT id, nombre FROM stg_actores
+ON CONFLICT (id) DO UPDATE SET nombre = EXCLUDED.nombre;
+
+DELETE FROM reparto r
+USING stg_peliculas s
+WHERE r.id_pelicula = s.id AND s.con_reparto;
+
+INSERT INTO reparto (id_pelicula, id_actor, rol, orden)
+SELECT id_pelicula, id_actor, rol, orden FROM stg_reparto
+ON CONFLICT (id_pelicula, id_actor) DO NOTHING;
+"""
+
+# Géneros del lote cuyo nombre ya está en generos con otro id
+GENEROS_CONFLICTOS_SQL = """
+SELECT s.id, s.nombre, g.id
+FROM stg_generos s
+JOIN generos g ON g.nombre = s.nombre AND g.id <> s.id
+ORDER BY s.id
+"""
+
+
+class Lote:
+    """Filas de un lote, deduplicadas por clave, listas para COPY."""
+
+    def __init__(self):
+        self.peliculas = {}
+        self.directores = {}
+        self.generos = {}
+        self.actores = {}
+        self.peliculas_generos = set()
+        self.reparto = {}
+        self.lineas = 0
+
+    def __len__(self):
+        return len(self.peliculas)
+
+    def agregar(self, data):
+        """Incorpora un registro de TMDB (export de ids o detalle completo)."""
+        id_pelicula = int(data["id"])
+        # Los exports de ids sólo traen original_title: no reemplaza un título localizado ya cargado
+        titulo = (data.get("title") or "")[:150] or None
+        titulo_original = (data.get("original_title") or "")[:150] or None
+        fecha = data.get("release_date") or None
+        credits = data.get("credits")
+        generos = data.get("genres")
+
+        director = None
+        if credits:
+            director = next((c for c in credits.get("crew", [])
+                             if c.get("job") == "Director" and c.get("id") and c.get("name")), None)
+            if director:
+                self.directores[director["id"]] = director["name"][:100]
+
+        if generos is not None:
+            for g in generos:
+                if g.get("id") and g.get("name"):
+                    self.generos[g["id"]] = g["name"][:50]
+                    self.peliculas_generos.add((id_pelicula, g["id"]))
+
+        if credits is not None:
+            cast = [c for c in credits.get("cast", []) if c.get("id") and c.get("name")][:db.REPARTO_MAXIMO]
+            for orden, c in enumerate(cast):
+                self.actores[c["id"]] = c["name"][:100]
+                self.reparto[(id_pelicula, c["id"])] = ((c.get("character") or "")[:100] or None, orden)
+
+        self.peliculas[id_pelicula] = (
+            id_pelicula, titulo, titulo_original, int(fecha[:4]) if fecha else None, data.get("runtime") or None,
+            data.get("overview") or None, director["id"] if director else None, fecha,
+            data.get("poster_path"), data.get("backdrop_path"), data.get("vote_average"),
+            generos is not None, credits is not None,
+        )
+
+    def filas(self):
+        return {
+            "stg_peliculas": self.peliculas.values(),
+            "stg_directores": self.directores.items(),
+            "stg_generos": self.generos.items(),
+            "stg_peliculas_generos": self.peliculas_generos,
+            "stg_actores": self.actores.items(),
+            "stg_reparto": ((p, a, rol, orden) for (p, a), (rol, orden) in self.reparto.items()),
+        }
+
+
+def _copiar(cursor, tabla, filas):
+    """Carga filas en una tabla de staging con COPY ... FROM STDIN (CSV)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for fila in filas:
+        writer.writerow(["" if v is None else v for v in fila])
+    buffer.seek(0)
+    columnas = ", ".join(STAGING_COLUMNAS[tabla])
+    cursor.copy_expert(f"COPY {tabla} ({columnas}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def crear_staging(conexion):
+    """Crea las tablas temporales de staging en la sesión de `conexion`."""
+    cursor = conexion.cursor()
+    cursor.execute(STAGING_SQL)
+    conexion.commit()
+    cursor.close()
+
+
+def cargar_lote(conexion, lote):
+    """COPY a staging y fusión con upserts, todo en una transacción."""
+    cursor = conexion.cursor()
+    try:
+        for tabla, filas in lote.filas().items():
+            _copiar(cursor, tabla, filas)
+        cursor.execute(GENEROS_CONFLICTOS_SQL)
+        for id_genero, nombre, id_existente in cursor.fetchall():
+            print(f"Género {id_genero} ({nombre}): el nombre ya existe con el id {id_existente}, se usa ese")
+        cursor.execute(MERGE_SQL)
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# --- Checkpoint ---
+def _ruta_checkpoint(archivo):
+    return f"{archivo}.checkpoint"
+
+
+def leer_checkpoint(archivo):
+    try:
+        with open(_ruta_checkpoint(archivo), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"lineas": 0, "peliculas": 0, "invalidas": 0, "completo": False}
+
+
+def guardar_checkpoint(archivo, estado):
+    ruta = _ruta_checkpoint(archivo)
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(estado, f)
+    os.replace(temporal, ruta)
+
+
+def _abrir(archivo):
+    if archivo.endswith(".gz"):
+        return gzip.open(archivo, "rt", encoding="utf-8")
+    return open(archivo, encoding="utf-8")
+
+
+def importar_archivo(conexion, archivo, tamano_lote=LOTE_DEFAULT, reiniciar=False):
+    estado = {"lineas": 0, "peliculas": 0, "invalidas": 0, "completo": False} if reiniciar else leer_checkpoint(archivo)
+    if estado.get("completo"):
+        print(f"{archivo}: ya importado ({estado['peliculas']} películas). Usar --reiniciar para repetir.")
+        return estado
+    if estado["lineas"]:
+        print(f"{archivo}: retomando desde la línea {estado['lineas']}")
+
+    inicio = time.monotonic()
+    peliculas_inicio = estado["peliculas"]
+    lote = Lote()
+
+    def confirmar():
+        cargar_lote(conexion, lote)
+        estado["lineas"] += lote.lineas
+        estado["peliculas"] += len(lote)
+        guardar_checkpoint(archivo, estado)
+        transcurrido = time.monotonic() - inicio
+        ritmo = (estado["peliculas"] - peliculas_inicio) / transcurrido if transcurrido else 0
+        print(f"{archivo}: {estado['lineas']} líneas, {estado['peliculas']} películas, "
+              f"{estado['invalidas']} inválidas, {ritmo:,.0f} películas/s")
+
+    with _abrir(archivo) as f:
+        for numero, linea in enumerate(f):
+            if numero < estado["lineas"]:
+                continue
+            lote.lineas += 1
+            linea = linea.strip()
+            if linea:
+                try:
+                    lote.agregar(json.loads(linea))
+                except (ValueError, KeyError, TypeError) as e:
+                    estado["invalidas"] += 1
+                    if estado["invalidas"] <= 10:
+                        print(f"{archivo}:{numero + 1}: línea inválida ({e})")
+            if len(lote) >= tamano_lote:
+                confirmar()
+                lote = Lote()
+        if lote.lineas:
+            confirmar()
+
+    estado["completo"] = True
+    guardar_checkpoint(archivo, estado)
+    transcurrido = time.monotonic() - inicio
+    print(f"{archivo}: completo en {transcurrido:.1f}s")
+    return estado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa el catálogo desde exports JSON-lines de TMDB usando COPY")
+    parser.add_argument("archivos", nargs="+", help="Archivos .json/.jsonl, opcionalmente .gz")
+    parser.add_argument("--lote", type=int, default=LOTE_DEFAULT, help="Películas por transacción")
+    parser.add_argument("--reiniciar", action="store_true", help="Ignorar checkpoints y empezar de cero")
+    args = parser.parse_args()
+
+    conexion = db.engine.raw_connection()
+    try:
+        crear_staging(conexion)
+
+        total = 0
+        for archivo in args.archivos:
+            total += importar_archivo(conexion, archivo, args.lote, args.reiniciar)["peliculas"]
+
+        # Estadísticas del planificador al día después de una carga grande
+        conexion.autocommit = True
+        cursor = conexion.cursor()
+        cursor.execute("ANALYZE peliculas, directores, actores, reparto, generos, peliculas_generos")
+        cursor.close()
+        print(f"Importación terminada: {total} películas")
+    except KeyboardInterrupt:
+        print("\nInterrumpido: se retoma desde el último lote confirmado al volver a ejecutar")
+        sys.exit(130)
+    finally:
+        conexion.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Versionado del esquema con alembic.
+Las migraciones viven en migrations/versions y se aplican con
+`flask --app app migrar` (o `alembic upgrade head`). Al iniciar, la app sólo
+compara la revisión guardada en alembic_version con la última disponible;
+no ejecuta DDL, así el arranque no toma locks sobre las tablas.
+"""
+import os
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+load_dotenv()
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+# Con ESQUEMA_ESTRICTO=1 la app no arranca si faltan migraciones
+ESQUEMA_ESTRICTO = os.getenv("ESQUEMA_ESTRICTO", "0") == "1"
+
+
+class EsquemaDesactualizado(RuntimeError):
+    """La base no tiene aplicadas todas las migraciones."""
+
+
+def database_url(variable: str = "DATABASE_URL") -> Optional[str]:
+    url = os.getenv(variable)
+    if url and url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql+psycopg2://", 1)
+    return url
+
+
+def config() -> Config:
+    cfg = Config(ALEMBIC_INI)
+    cfg.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    return cfg
+
+
+def version_esperada() -> Optional[str]:
+    """Última revisión disponible en migrations/versions."""
+    return ScriptDirectory.from_config(config()).get_current_head()
+
+
+def version_actual(conn) -> Optional[str]:
+    """Revisión aplicada en la base (None si nunca se migró)."""
+    if conn.execute(text("SELECT to_regclass('alembic_version')")).scalar() is None:
+        return None
+    return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def verificar(engine) -> bool:
+    """
+    Chequeo de arranque: True si la base está en la última revisión.
+    Si no lo está avisa por consola (o lanza EsquemaDesactualizado con
+    ESQUEMA_ESTRICTO=1).
+    """
+    esperada = version_esperada()
+    with engine.connect() as conn:
+        actual = version_actual(conn)
+    if actual == esperada:
+        return True
+    mensaje = (f"Esquema de base de datos desactualizado (actual: {actual}, esperada: {esperada}). "
+               "Ejecutar: flask --app app migrar")
+    if ESQUEMA_ESTRICTO:
+        raise EsquemaDesactualizado(mensaje)
+    print(mensaje)
+    return False
+
+
+def aplicar(revision: str = "head"):
+    """Aplica las migraciones pendientes hasta `revision`."""
+    command.upgrade(config(), revision)
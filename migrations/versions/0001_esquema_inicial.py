@@ -0,0 +1,182 @@
+"""Esquema inicial: tablas de la app, catálogo local y auditoría.
+
+Es idempotente (IF NOT EXISTS) para que las bases creadas antes de usar
+migraciones, cuando db.py y audit_log.py ejecutaban este DDL al importarse,
+puedan marcarse en esta revisión con un `alembic upgrade head` normal.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+ESQUEMA_APP = """
+CREATE TABLE IF NOT EXISTS usuarios (
+  id SERIAL PRIMARY KEY,
+  nombre VARCHAR(100) NOT NULL,
+  email VARCHAR(150) UNIQUE NOT NULL,
+  contrasena_hash TEXT NOT NULL,
+  fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  es_admin BOOLEAN NOT NULL DEFAULT FALSE,
+  activo BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS directores (
+  id SERIAL PRIMARY KEY,
+  nombre VARCHAR(100) NOT NULL,
+  nacionalidad VARCHAR(100)
+);
+
+CREATE TABLE IF NOT EXISTS peliculas (
+  id SERIAL PRIMARY KEY,
+  titulo VARCHAR(150) NOT NULL,
+  anio INT,
+  duracion INT,
+  sinopsis TEXT,
+  id_director INT REFERENCES directores(id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS actores (
+  id SERIAL PRIMARY KEY,
+  nombre VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reparto (
+  id_pelicula INT REFERENCES peliculas(id) ON DELETE CASCADE,
+  id_actor INT REFERENCES actores(id) ON DELETE CASCADE,
+  rol VARCHAR(100),
+  PRIMARY KEY (id_pelicula, id_actor)
+);
+
+CREATE TABLE IF NOT EXISTS generos (
+  id SERIAL PRIMARY KEY,
+  nombre VARCHAR(50) UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS peliculas_generos (
+  id_pelicula INT REFERENCES peliculas(id) ON DELETE CASCADE,
+  id_genero INT REFERENCES generos(id) ON DELETE CASCADE,
+  PRIMARY KEY (id_pelicula, id_genero)
+);
+
+CREATE TABLE IF NOT EXISTS reviews (
+  id SERIAL PRIMARY KEY,
+  id_usuario INT REFERENCES usuarios(id) ON DELETE CASCADE,
+  id_pelicula INT REFERENCES peliculas(id) ON DELETE CASCADE,
+  rating NUMERIC(3,1),
+  titulo VARCHAR(150),
+  comentario TEXT,
+  fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ensure titulo exists if table already created without it
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS titulo VARCHAR(150);
+
+CREATE TABLE IF NOT EXISTS lista_usuario (
+    id_usuario INT REFERENCES usuarios(id) ON DELETE CASCADE,
+    id_pelicula INT NOT NULL,
+    titulo VARCHAR(150) NOT NULL,
+    poster_url TEXT,
+    fecha_agregado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_usuario, id_pelicula)
+);
+
+-- asegurar columnas para esquemas antiguos
+ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS es_admin BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS activo BOOLEAN NOT NULL DEFAULT TRUE;
+
+-- catálogo local alimentado desde TMDB (ids de TMDB como claves)
+ALTER TABLE peliculas ADD COLUMN IF NOT EXISTS fecha_estreno DATE;
+ALTER TABLE peliculas ADD COLUMN IF NOT EXISTS poster_path TEXT;
+ALTER TABLE peliculas ADD COLUMN IF NOT EXISTS backdrop_path TEXT;
+ALTER TABLE peliculas ADD COLUMN IF NOT EXISTS vote_average REAL;
+ALTER TABLE peliculas ADD COLUMN IF NOT EXISTS proveedores JSONB;
+ALTER TABLE peliculas ADD COLUMN IF NOT EXISTS tmdb_actualizado TIMESTAMP;
+ALTER TABLE reparto ADD COLUMN IF NOT EXISTS orden INT;
+"""
+
+ESQUEMA_AUDITORIA = """
+-- Tabla principal de auditoría
+CREATE TABLE IF NOT EXISTS audit_log (
+    id SERIAL PRIMARY KEY,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    event_type VARCHAR(50) NOT NULL,
+    severity VARCHAR(20) NOT NULL,
+    user_id INT REFERENCES usuarios(id) ON DELETE SET NULL,
+    user_email VARCHAR(150),
+    ip_address VARCHAR(45),
+    action_description TEXT NOT NULL,
+    entity_type VARCHAR(50),
+    entity_id INT,
+    old_value JSONB,
+    new_value JSONB,
+    result VARCHAR(20) NOT NULL,
+    error_message TEXT,
+    metadata JSONB
+);
+
+-- Índices para mejorar el rendimiento de consultas
+CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_log(timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_user_id ON audit_log(user_id);
+CREATE INDEX IF NOT EXISTS idx_audit_event_type ON audit_log(event_type);
+CREATE INDEX IF NOT EXISTS idx_audit_severity ON audit_log(severity);
+CREATE INDEX IF NOT EXISTS idx_audit_result ON audit_log(result);
+
+-- Tabla de alertas críticas
+CREATE TABLE IF NOT EXISTS critical_alerts (
+    id SERIAL PRIMARY KEY,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    alert_type VARCHAR(50) NOT NULL,
+    severity VARCHAR(20) NOT NULL,
+    description TEXT NOT NULL,
+    affected_user_id INT REFERENCES usuarios(id) ON DELETE SET NULL,
+    ip_address VARCHAR(45),
+    details JSONB,
+    notified BOOLEAN DEFAULT FALSE,
+    notification_channel VARCHAR(50),
+    resolved BOOLEAN DEFAULT FALSE,
+    resolved_at TIMESTAMP,
+    resolved_by INT REFERENCES usuarios(id) ON DELETE SET NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON critical_alerts(timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_alerts_notified ON critical_alerts(notified);
+CREATE INDEX IF NOT EXISTS idx_alerts_resolved ON critical_alerts(resolved);
+
+-- Tabla de configuraciones críticas (para auditar cambios)
+CREATE TABLE IF NOT EXISTS critical_config (
+    id SERIAL PRIMARY KEY,
+    config_key VARCHAR(100) UNIQUE NOT NULL,
+    config_value TEXT,
+    last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    modified_by INT REFERENCES usuarios(id) ON DELETE SET NULL
+);
+"""
+
+
+def upgrade():
+    op.execute(ESQUEMA_APP)
+    op.execute(ESQUEMA_AUDITORIA)
+
+
+def downgrade():
+    op.execute("""
+        DROP TABLE IF EXISTS critical_config;
+        DROP TABLE IF EXISTS critical_alerts;
+        DROP TABLE IF EXISTS audit_log;
+        DROP TABLE IF EXISTS lista_usuario;
+        DROP TABLE IF EXISTS reviews;
+        DROP TABLE IF EXISTS peliculas_generos;
+        DROP TABLE IF EXISTS generos;
+        DROP TABLE IF EXISTS reparto;
+        DROP TABLE IF EXISTS actores;
+        DROP TABLE IF EXISTS peliculas;
+        DROP TABLE IF EXISTS directores;
+        DROP TABLE IF EXISTS usuarios;
+    """)
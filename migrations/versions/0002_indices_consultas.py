@@ -0,0 +1,41 @@
+"""Índices para las consultas frecuentes de db.py.
+
+- reviews por película y por usuario, ordenadas por fecha
+- lista del usuario ordenada por fecha_agregado
+- búsqueda de títulos con LIKE '%x%' (trigramas, extensión pg_trgm)
+
+Se crean con CONCURRENTLY para no bloquear escrituras durante el deploy.
+test_query_plans.py verifica que los planes los usen.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+INDICES = {
+    "idx_reviews_pelicula_fecha": "reviews (id_pelicula, fecha DESC)",
+    "idx_reviews_usuario_fecha": "reviews (id_usuario, fecha DESC)",
+    "idx_lista_usuario_fecha": "lista_usuario (id_usuario, fecha_agregado DESC)",
+    "idx_peliculas_titulo_trgm": "peliculas USING gin (lower(titulo) gin_trgm_ops)",
+}
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CREATE INDEX CONCURRENTLY no puede correr dentro de una transacción
+    with op.get_context().autocommit_block():
+        for nombre, definicion in INDICES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {definicion}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for nombre in INDICES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}")
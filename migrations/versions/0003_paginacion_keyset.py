@@ -0,0 +1,98 @@
+"""Índices para la paginación por cursor (keyset).
+
+Las listas paginadas se ordenan por (fecha, id) descendente; los índices de
+0002 se reemplazan por versiones que incluyen el id como desempate, así
+cada página es un recorrido de índice sin Sort. Las fechas pasan a NOT NULL
+porque forman parte del cursor.
+
+Para no bloquear las tablas durante el deploy, NOT NULL se agrega en pasos:
+un CHECK NOT VALID (frena NULLs nuevos sin recorrer la tabla), backfill en
+lotes chicos con commit propio, VALIDATE CONSTRAINT (no bloquea escrituras)
+y recién entonces SET NOT NULL, que usa el CHECK validado en lugar de
+recorrer la tabla bajo ACCESS EXCLUSIVE.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+from sqlalchemy import text
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+INDICES = {
+    "idx_reviews_pelicula_fecha_id": "reviews (id_pelicula, fecha DESC, id DESC)",
+    "idx_reviews_usuario_fecha_id": "reviews (id_usuario, fecha DESC, id DESC)",
+    "idx_lista_usuario_fecha_id": "lista_usuario (id_usuario, fecha_agregado DESC, id_pelicula DESC)",
+    "idx_usuarios_registro_id": "usuarios (fecha_registro DESC, id DESC)",
+}
+
+REEMPLAZADOS = {
+    "idx_reviews_pelicula_fecha": "reviews (id_pelicula, fecha DESC)",
+    "idx_reviews_usuario_fecha": "reviews (id_usuario, fecha DESC)",
+    "idx_lista_usuario_fecha": "lista_usuario (id_usuario, fecha_agregado DESC)",
+}
+
+FECHAS = {
+    "reviews": "fecha",
+    "lista_usuario": "fecha_agregado",
+    "usuarios": "fecha_registro",
+}
+
+
+LOTE_BACKFILL = 5000
+# Los ALTER que toman locks fuertes esperan a lo sumo esto; si hay una
+# transacción larga el deploy falla en lugar de encolar todo el tráfico
+LOCK_TIMEOUT = "5s"
+
+
+def _backfill(tabla, columna):
+    """Completa las fechas NULL de a LOTE_BACKFILL filas, una transacción por lote."""
+    update = (f"UPDATE {tabla} SET {columna} = CURRENT_TIMESTAMP WHERE ctid IN "
+              f"(SELECT ctid FROM {tabla} WHERE {columna} IS NULL LIMIT {LOTE_BACKFILL})")
+    if context.is_offline_mode():
+        op.execute(update)
+        return
+    conn = op.get_bind()
+    while conn.execute(text(update)).rowcount:
+        pass
+
+
+def _set_not_null(tabla, columna):
+    check = f"{tabla}_{columna}_not_null"
+    op.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+    op.execute(f"ALTER TABLE {tabla} DROP CONSTRAINT IF EXISTS {check}")
+    op.execute(f"ALTER TABLE {tabla} ADD CONSTRAINT {check} CHECK ({columna} IS NOT NULL) NOT VALID")
+    op.execute("RESET lock_timeout")
+    _backfill(tabla, columna)
+    op.execute(f"ALTER TABLE {tabla} VALIDATE CONSTRAINT {check}")
+    op.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+    op.execute(f"ALTER TABLE {tabla} ALTER COLUMN {columna} SET NOT NULL")
+    op.execute(f"ALTER TABLE {tabla} DROP CONSTRAINT {check}")
+    op.execute("RESET lock_timeout")
+
+
+def upgrade():
+    # Cada sentencia en su propia transacción: los locks se sueltan enseguida
+    with op.get_context().autocommit_block():
+        for tabla, columna in FECHAS.items():
+            _set_not_null(tabla, columna)
+    with op.get_context().autocommit_block():
+        for nombre, definicion in INDICES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {definicion}")
+        for nombre in REEMPLAZADOS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for nombre, definicion in REEMPLAZADOS.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {definicion}")
+        for nombre in INDICES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}")
+    for tabla, columna in FECHAS.items():
+        op.execute(f"ALTER TABLE {tabla} ALTER COLUMN {columna} DROP NOT NULL")
@@ -0,0 +1,51 @@
+"""Agregados de ratings por película (movie_stats).
+
+Una fila por película con cantidad, suma, promedio e histograma de ratings
+en intervalos de 0.5 (histograma[i] cuenta ratings en [i/2, i/2 + 0.5)).
+db.crear_review la actualiza en la misma transacción que inserta la review;
+acá se carga a partir de las reviews existentes.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS movie_stats (
+            id_pelicula INT PRIMARY KEY REFERENCES peliculas(id) ON DELETE CASCADE,
+            cantidad INT NOT NULL DEFAULT 0,
+            suma NUMERIC(12,1) NOT NULL DEFAULT 0,
+            promedio NUMERIC(4,2) GENERATED ALWAYS AS (ROUND(suma / NULLIF(cantidad, 0), 2)) STORED,
+            histograma INT[] NOT NULL DEFAULT array_fill(0, ARRAY[20]),
+            actualizado TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_movie_stats_promedio
+            ON movie_stats (promedio DESC, cantidad DESC) WHERE cantidad > 0;
+    """)
+    op.execute(RECONSTRUIR_SQL)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS movie_stats")
+
+
+# Mismo cálculo que db.reconstruir_movie_stats: un solo recorrido de reviews
+_BUCKET = "LEAST(GREATEST(FLOOR(rating * 2)::int, 1), 20)"
+RECONSTRUIR_SQL = f"""
+    DELETE FROM movie_stats;
+    INSERT INTO movie_stats (id_pelicula, cantidad, suma, histograma)
+    SELECT id_pelicula, COUNT(*), SUM(rating),
+           ARRAY[{", ".join(f"COUNT(*) FILTER (WHERE {_BUCKET} = {b})" for b in range(1, 21))}]
+    FROM reviews
+    WHERE id_pelicula IS NOT NULL AND rating IS NOT NULL
+    GROUP BY id_pelicula;
+"""
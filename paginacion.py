@@ -0,0 +1,61 @@
+"""
+Paginación por cursor (keyset).
+Las listas se recorren por (fecha, id) descendente: cada página continúa
+desde la última fila de la anterior, así el costo no depende de cuántas
+páginas haya antes. El cursor es opaco para el cliente (base64 de JSON).
+"""
+import base64
+import json
+import os
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+load_dotenv()
+
+PAGINA_DEFAULT = int(os.getenv("DB_PAGINA_DEFAULT", "20"))
+PAGINA_MAX = int(os.getenv("DB_PAGINA_MAX", "100"))
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no es uno generado por codificar_cursor."""
+
+
+def codificar_cursor(fecha: datetime, id_fila: int) -> str:
+    crudo = json.dumps([fecha.isoformat(), id_fila], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str):
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fecha, id_fila = json.loads(crudo)
+        return datetime.fromisoformat(fecha), int(id_fila)
+    except (ValueError, TypeError) as e:
+        raise CursorInvalido("Cursor inválido") from e
+
+
+def limitar_pagina(limite) -> int:
+    """Tamaño de página pedido, acotado a 1..PAGINA_MAX."""
+    if not limite:
+        return PAGINA_DEFAULT
+    return max(1, min(int(limite), PAGINA_MAX))
+
+
+def keyset(sql, col_fecha, col_id):
+    """
+    Precompila las dos variantes de una consulta paginada: la primera página
+    y la continuación desde un cursor (reemplazando `{filtro}` en `sql`).
+    Se elige con `variantes[bool(cursor)]`.
+    """
+    return (text(sql.replace("{filtro}", "")),
+            text(sql.replace("{filtro}", f"AND ({col_fecha}, {col_id}) < (:cursor_fecha, :cursor_id)")))
+
+
+def params_cursor(cursor):
+    """Parámetros para continuar después de `cursor` (vacío en la primera página)."""
+    if not cursor:
+        return {}
+    fecha, id_fila = decodificar_cursor(cursor)
+    return {"cursor_fecha": fecha, "cursor_id": id_fila}
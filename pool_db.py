@@ -0,0 +1,154 @@
+"""
+Pool de conexiones a Postgres configurable e instrumentado.
+Con `gunicorn -k eventlet -w 1` cientos de greenlets comparten unas pocas
+conexiones; PoolInstrumentado mide cuánto espera cada checkout (histograma),
+cuántas conexiones están en uso u ociosas, cuántos checkouts agotaron el
+timeout y cuántas veces se abrió una conexión de overflow. Las métricas se
+exponen en /api/internal/stats.
+
+Con DB_POOL_AUTOSIZE=1 el tamaño se calcula al iniciar a partir de
+max_connections del servidor, repartido entre los workers de gunicorn.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import NullPool, QueuePool
+
+load_dotenv()
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+POOL_AUTOSIZE = os.getenv("DB_POOL_AUTOSIZE", "0") == "1"
+# Conexiones que el autosize deja libres para migraciones, psql, importador, etc.
+POOL_RESERVA = int(os.getenv("DB_POOL_RESERVA", "5"))
+# Procesos que comparten el servidor (gunicorn lee la misma variable)
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# Límites superiores (ms) de los buckets del histograma de espera
+BUCKETS_ESPERA_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolInstrumentado(QueuePool):
+    """QueuePool que registra tiempos de espera, timeouts y overflow."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metricas_lock = threading.Lock()
+        self.histograma = [0] * (len(BUCKETS_ESPERA_MS) + 1)
+        self.checkouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.esperando = 0
+        self.esperando_pico = 0
+        self.timeouts = 0
+        self.overflows = 0
+        self.overflow_pico = 0
+
+    def _do_get(self):
+        inicio = time.monotonic()
+        with self._metricas_lock:
+            self.esperando += 1
+            self.esperando_pico = max(self.esperando_pico, self.esperando)
+        try:
+            registro = super()._do_get()
+        except exc.TimeoutError:
+            with self._metricas_lock:
+                self.timeouts += 1
+            print(f"⚠️ Pool de base agotado tras {self._timeout:g}s: {self.status()}")
+            raise
+        finally:
+            with self._metricas_lock:
+                self.esperando -= 1
+        self._registrar_espera(time.monotonic() - inicio)
+        return registro
+
+    def _inc_overflow(self):
+        creada = super()._inc_overflow()
+        if creada and self._overflow > 0:
+            with self._metricas_lock:
+                self.overflows += 1
+                self.overflow_pico = max(self.overflow_pico, self._overflow)
+        return creada
+
+    def _registrar_espera(self, segundos: float):
+        ms = segundos * 1000
+        i = 0
+        while i < len(BUCKETS_ESPERA_MS) and ms > BUCKETS_ESPERA_MS[i]:
+            i += 1
+        with self._metricas_lock:
+            self.histograma[i] += 1
+            self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_maxima = max(self.espera_maxima, segundos)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._metricas_lock:
+            etiquetas = [f"<={b}ms" for b in BUCKETS_ESPERA_MS] + [f">{BUCKETS_ESPERA_MS[-1]}ms"]
+            return {
+                "tamano": self.size(),
+                "max_overflow": self._max_overflow,
+                "timeout": self._timeout,
+                "en_uso": self.checkedout(),
+                "ociosas": self.checkedin(),
+                "overflow_actual": max(self.overflow(), 0),
+                "overflow_pico": self.overflow_pico,
+                "overflows": self.overflows,
+                "esperando": self.esperando,
+                "esperando_pico": self.esperando_pico,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "espera_media_ms": round(self.espera_total / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "espera_maxima_ms": round(self.espera_maxima * 1000, 2),
+                "espera_histograma": dict(zip(etiquetas, self.histograma)),
+            }
+
+
+def autodimensionar(url: str) -> Dict[str, int]:
+    """
+    Calcula pool_size/max_overflow según max_connections del servidor.
+
+    Descuenta las conexiones reservadas a superusuarios y DB_POOL_RESERVA, y
+    reparte el resto entre WEB_CONCURRENCY workers: dos tercios quedan fijos
+    en el pool y el resto como overflow.
+    """
+    sonda = create_engine(url, poolclass=NullPool)
+    try:
+        with sonda.connect() as conn:
+            maximo = int(conn.execute(text("SHOW max_connections")).scalar())
+            reservadas = int(conn.execute(text("SHOW superuser_reserved_connections")).scalar())
+    finally:
+        sonda.dispose()
+    por_worker = max((maximo - reservadas - POOL_RESERVA) // max(WORKERS, 1), 2)
+    tamano = max(por_worker * 2 // 3, 1)
+    print(f"Pool de base autodimensionado: max_connections={maximo}, "
+          f"{WORKERS} worker(s) -> pool_size={tamano}, max_overflow={por_worker - tamano}")
+    return {"pool_size": tamano, "max_overflow": por_worker - tamano}
+
+
+def opciones_pool(url: str) -> Dict[str, Any]:
+    """Argumentos de create_engine para el pool, desde el entorno."""
+    opciones = {
+        "poolclass": PoolInstrumentado,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_pre_ping": True,
+        "pool_recycle": POOL_RECYCLE,
+    }
+    if POOL_AUTOSIZE and url:
+        try:
+            opciones.update(autodimensionar(url))
+        except Exception as e:
+            print(f"⚠️ No se pudo autodimensionar el pool, se usa DB_POOL_SIZE/DB_MAX_OVERFLOW: {e}")
+    return opciones
+
+
+def stats(engine) -> Dict[str, Any]:
+    pool = engine.pool
+    return pool.stats() if isinstance(pool, PoolInstrumentado) else {"estado": pool.status()}
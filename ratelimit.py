@@ -0,0 +1,92 @@
+"""
+Limitador de salida tipo token bucket con clases de prioridad.
+El tráfico interactivo (páginas que está cargando un usuario) siempre puede
+usar todo el bucket; el tráfico de fondo (calentador, precargas,
+enriquecimiento) sólo consume si queda una reserva libre y no hay
+requests interactivos esperando.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+INTERACTIVA = "interactiva"
+FONDO = "fondo"
+
+
+class TokenBucket:
+    """Token bucket con reserva para la prioridad interactiva."""
+
+    def __init__(self, tasa: float, capacidad: float, reserva_interactiva: float = 0.25):
+        """
+        Args:
+            tasa: Tokens por segundo
+            capacidad: Tamaño máximo del bucket (ráfaga permitida)
+            reserva_interactiva: Fracción del bucket que el tráfico de fondo no puede usar
+        """
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.reserva = capacidad * reserva_interactiva
+        self._tokens = capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+        self._esperando_interactivos = 0
+        self.concedidos = {INTERACTIVA: 0, FONDO: 0}
+        self.rechazados = {INTERACTIVA: 0, FONDO: 0}
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def adquirir(self, prioridad: str = INTERACTIVA, timeout: Optional[float] = None) -> bool:
+        """
+        Toma un token, esperando si hace falta.
+
+        Returns:
+            False si no se consiguió antes de `timeout` segundos
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        interactiva = prioridad == INTERACTIVA
+        if interactiva:
+            with self._lock:
+                self._esperando_interactivos += 1
+        try:
+            while True:
+                with self._lock:
+                    self._recargar()
+                    if interactiva:
+                        minimo = 1
+                    elif self._esperando_interactivos:
+                        minimo = self.capacidad + 1  # ceder mientras haya interactivos esperando
+                    else:
+                        minimo = 1 + self.reserva
+                    if self._tokens >= minimo:
+                        self._tokens -= 1
+                        self.concedidos[prioridad] += 1
+                        return True
+                    espera = max((min(minimo, self.capacidad) - self._tokens) / self.tasa, 0.01)
+
+                if limite is not None:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        with self._lock:
+                            self.rechazados[prioridad] += 1
+                        return False
+                    espera = min(espera, restante)
+                time.sleep(espera)
+        finally:
+            if interactiva:
+                with self._lock:
+                    self._esperando_interactivos -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._recargar()
+            return {
+                "tasa": self.tasa,
+                "capacidad": self.capacidad,
+                "tokens": round(self._tokens, 2),
+                "esperando_interactivos": self._esperando_interactivos,
+                "concedidos": dict(self.concedidos),
+                "rechazados": dict(self.rechazados),
+            }
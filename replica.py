@@ -0,0 +1,154 @@
+"""
+Enrutamiento de lecturas a una réplica de Postgres (DATABASE_REPLICA_URL).
+Las funciones de sólo lectura piden la conexión con `conectar(*claves)`:
+van a la réplica salvo que
+
+- no haya réplica configurada,
+- la réplica esté caída o atrasada más de DB_REPLICA_LAG_MAX segundos,
+- alguna de las claves (p. ej. ("usuario", 7) o ("pelicula", 550)) haya
+  recibido una escritura hace menos de DB_LECTURA_PROPIA_SEGUNDOS
+  (read-your-writes: quien acaba de escribir ve su cambio).
+
+Las escrituras recientes se recuerdan por proceso; con un solo worker
+(render.yaml) alcanza para que el autor vea su propio cambio.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable
+
+from dotenv import load_dotenv
+from sqlalchemy import exc, text
+
+load_dotenv()
+
+LECTURA_PROPIA_SEGUNDOS = float(os.getenv("DB_LECTURA_PROPIA_SEGUNDOS", "10"))
+REPLICA_LAG_MAX = float(os.getenv("DB_REPLICA_LAG_MAX", "5"))
+# Cada cuánto se vuelve a medir el atraso (o a probar una réplica caída)
+REPLICA_CHEQUEO = float(os.getenv("DB_REPLICA_CHEQUEO", "5"))
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", "2"))
+# Por encima de esta cantidad de claves recordadas se descartan las vencidas
+MAX_ESCRITURAS = 10000
+
+LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM (now() - pg_last_xact_replay_timestamp())), 0)
+    END
+""")
+
+
+class Enrutador:
+    """Elige entre el engine primario y el de la réplica para cada lectura."""
+
+    def __init__(self, primario, replica=None):
+        self.primario = primario
+        self.replica = replica
+        self._lock = threading.Lock()
+        self._chequeo_lock = threading.Lock()
+        self._escrituras: Dict[Hashable, float] = {}
+        self._proximo_chequeo = 0.0
+        self._disponible = replica is not None
+        self.lag = None
+        self.lecturas_replica = 0
+        self.lecturas_primario = 0
+        self.lecturas_propias = 0
+        self.fallbacks = 0
+
+    def registrar_escritura(self, *claves: Hashable):
+        """Manda al primario las lecturas de `claves` durante la ventana read-your-writes."""
+        if self.replica is None:
+            return
+        vence = time.monotonic() + LECTURA_PROPIA_SEGUNDOS
+        with self._lock:
+            if len(self._escrituras) > MAX_ESCRITURAS:
+                ahora = time.monotonic()
+                self._escrituras = {c: v for c, v in self._escrituras.items() if v > ahora}
+            for clave in claves:
+                self._escrituras[clave] = vence
+
+    def _escritura_reciente(self, claves) -> bool:
+        if not claves:
+            return False
+        ahora = time.monotonic()
+        with self._lock:
+            return any(self._escrituras.get(c, 0) > ahora for c in claves)
+
+    def _marcar_caida(self, error):
+        print(f"⚠️ Réplica no disponible, se lee del primario: {error}")
+        with self._lock:
+            self._disponible = False
+            self._proximo_chequeo = time.monotonic() + REPLICA_CHEQUEO
+
+    def _medir_lag(self):
+        """Mide el atraso de la réplica; un solo greenlet a la vez, el resto usa el último valor."""
+        if time.monotonic() < self._proximo_chequeo or not self._chequeo_lock.acquire(blocking=False):
+            return
+        try:
+            with self.replica.connect() as conn:
+                lag = float(conn.execute(LAG_SQL).scalar())
+            with self._lock:
+                if lag > REPLICA_LAG_MAX and (self.lag is None or self.lag <= REPLICA_LAG_MAX):
+                    print(f"⚠️ Réplica atrasada {lag:.1f}s, se lee del primario")
+                self.lag = lag
+                self._disponible = lag <= REPLICA_LAG_MAX
+                self._proximo_chequeo = time.monotonic() + REPLICA_CHEQUEO
+        except exc.SQLAlchemyError as e:
+            self._marcar_caida(e)
+        finally:
+            self._chequeo_lock.release()
+
+    def motor(self, *claves: Hashable):
+        """Engine que corresponde a una lectura de `claves`."""
+        if self.replica is None:
+            return self.primario
+        if self._escritura_reciente(claves):
+            with self._lock:
+                self.lecturas_propias += 1
+            return self.primario
+        self._medir_lag()
+        if not self._disponible:
+            with self._lock:
+                self.fallbacks += 1
+            return self.primario
+        return self.replica
+
+    @contextmanager
+    def conectar(self, *claves: Hashable):
+        """
+        Conexión de sólo lectura: réplica si corresponde, si no el primario.
+        Si la réplica no acepta la conexión se usa el primario.
+        """
+        motor = self.motor(*claves)
+        conn = None
+        if motor is self.replica:
+            try:
+                conn = self.replica.connect()
+            except exc.OperationalError as e:
+                self._marcar_caida(e)
+                with self._lock:
+                    self.fallbacks += 1
+        if conn is None:
+            conn = self.primario.connect()
+            with self._lock:
+                self.lecturas_primario += 1
+        else:
+            with self._lock:
+                self.lecturas_replica += 1
+        with conn:
+            yield conn
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "configurada": self.replica is not None,
+                "disponible": self._disponible,
+                "lag_segundos": None if self.lag is None else round(self.lag, 3),
+                "lecturas_replica": self.lecturas_replica,
+                "lecturas_primario": self.lecturas_primario,
+                "lecturas_propias": self.lecturas_propias,
+                "fallbacks": self.fallbacks,
+                "escrituras_recordadas": len(self._escrituras),
+            }
@@ -0,0 +1,70 @@
+"""
+Single-flight: agrupa llamadas concurrentes idénticas.
+Si varios greenlets piden la misma clave mientras hay una llamada en curso,
+esperan esa llamada y comparten su resultado (o su error) en lugar de
+repetirla. Evita estampidas contra TMDB y contra la base.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import eventlet
+from eventlet.event import Event
+
+
+class SingleFlight:
+    """Grupo de llamadas deduplicadas por clave."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self._en_vuelo: Dict[Hashable, Event] = {}
+        self._lock = threading.Lock()
+        self.llamadas = 0
+        self.coalescidas = 0
+
+    def do(self, clave: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Ejecuta `fn()` una sola vez por clave en vuelo.
+
+        Args:
+            clave: Identificador de la llamada
+            fn: Función a ejecutar si no hay otra en curso
+            timeout: Tiempo máximo esperando una llamada ajena
+
+        Raises:
+            TimeoutError: si se agotó `timeout` esperando la llamada en curso
+        """
+        with self._lock:
+            evento = self._en_vuelo.get(clave)
+            if evento is None:
+                evento = Event()
+                self._en_vuelo[clave] = evento
+                lider = True
+                self.llamadas += 1
+            else:
+                lider = False
+                self.coalescidas += 1
+
+        if not lider:
+            if timeout is None:
+                return evento.wait()
+            with eventlet.Timeout(max(timeout, 0), TimeoutError(f"Timeout esperando {self.nombre} {clave}")):
+                return evento.wait()
+
+        try:
+            resultado = fn()
+        except Exception as e:
+            with self._lock:
+                self._en_vuelo.pop(clave, None)
+            evento.send_exception(e)
+            raise
+        with self._lock:
+            self._en_vuelo.pop(clave, None)
+        evento.send(resultado)
+        return resultado
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "en_vuelo": len(self._en_vuelo),
+            "llamadas": self.llamadas,
+            "coalescidas": self.coalescidas,
+        }
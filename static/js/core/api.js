@@ -14,3 +14,27 @@ export async function fetchJSON(url, options = {}) {
     clearTimeout(id);
   }
 }
+
+// Agrega limit/cursor a la URL de una lista paginada por cursor
+export function urlConCursor(url, cursor, limit) {
+  const u = new URL(url, location.origin);
+  if (limit) u.searchParams.set('limit', limit);
+  if (cursor) u.searchParams.set('cursor', cursor);
+  return u.toString();
+}
+
+// Ids (como string) de `ids` que están en la lista del usuario; Set vacío si falla
+export async function idsEnLista(userId, ids) {
+  const unicos = [...new Set((ids || []).map(String))];
+  if (!userId || unicos.length === 0) return new Set();
+  const bloques = [];
+  for (let i = 0; i < unicos.length; i += 100) bloques.push(unicos.slice(i, i + 100));
+  const presentes = new Set();
+  await Promise.all(bloques.map(async (bloque) => {
+    try {
+      const { ok, data } = await fetchJSON(`${API_BASE}/mi-lista/${userId}/contiene?ids=${bloque.join(',')}`);
+      if (ok && data && data.status === 'success') (data.data || []).forEach(id => presentes.add(String(id)));
+    } catch {}
+  }));
+  return presentes;
+}
@@ -81,12 +81,35 @@ export function crearBotonLista(data, { variant = 'icon' } = {}) {
   return boton;
 }
 
+export const POSTER_PLACEHOLDER = '/static/img/placeholder.svg';
+
+// Ancho que ocupa una card según las columnas de .poster-grid
+const POSTER_CARD_SIZES = '(min-width: 992px) 16vw, (min-width: 768px) 20vw, (min-width: 576px) 33vw, 50vw';
+const POSTER_ANCHOS = [185, 342, 500, 780];
+
+// Asigna el póster pidiendo al proxy /img/ sólo el tamaño que la card necesita
+export function aplicarPoster(img, url, { sizes = POSTER_CARD_SIZES } = {}) {
+  img.onerror = () => {
+    img.onerror = null;
+    img.removeAttribute('srcset');
+    img.src = POSTER_PLACEHOLDER;
+  };
+  const match = url && url.match(/^\/img\/w\d+\/(.+)$/);
+  if (match) {
+    img.srcset = POSTER_ANCHOS.map((w) => `/img/w${w}/${match[1]} ${w}w`).join(', ');
+    img.sizes = sizes;
+  }
+  img.src = url || POSTER_PLACEHOLDER;
+}
+
 export function crearPosterCard(data, { withButton = false } = {}) {
   const card = document.createElement('div');
   card.classList.add('poster-card');
 
   const img = document.createElement('img');
-  img.src = data.imageUrl || '/static/img/placeholder.png';
+  img.loading = 'lazy';
+  img.decoding = 'async';
+  aplicarPoster(img, data.imageUrl);
   img.classList.add('poster');
   img.alt = data.title || 'Imagen de la película';
   card.appendChild(img);
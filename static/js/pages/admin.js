@@ -1,4 +1,4 @@
-import { API_BASE } from "../core/api.js";
+import { API_BASE, urlConCursor } from "../core/api.js";
 
 const ADMIN_API = `${API_BASE}/admin`;
 const AUDIT_API = `${API_BASE}/audit`;
@@ -59,13 +59,38 @@ async function validateAdminAccess() {
     }
 }
 
-async function loadUsers() {
+function renderUserRow(u) {
+    const tr = document.createElement("tr");
+    tr.innerHTML = `
+        <td>${u.id}</td>
+        <td>${u.nombre}</td>
+        <td>${u.email}</td>
+        <td>${u.es_admin ? "Sí" : "No"}</td>
+        <td>${u.activo ? "Sí" : "No"}</td>
+        <td>${u.fecha_registro || ""}</td>
+        <td>
+            ${u.activo && !u.es_admin
+                ? `<button class="btn btn-sm btn-outline-danger" data-user-id="${u.id}">Desactivar</button>`
+                : "-"}
+        </td>
+    `;
+    const btn = tr.querySelector("button[data-user-id]");
+    if (btn) {
+        btn.addEventListener("click", () => desactivarUsuario(u.id));
+    }
+    return tr;
+}
+
+// Carga una página de usuarios; con cursor se agregan a las filas ya mostradas
+async function loadUsers(cursor = null) {
     const usuario = getCurrentUser();
     const tbody = document.getElementById("usersTableBody");
-    tbody.innerHTML = "<tr><td colspan='7' class='text-center py-3'>Cargando...</td></tr>";
+    if (!cursor) {
+        tbody.innerHTML = "<tr><td colspan='7' class='text-center py-3'>Cargando...</td></tr>";
+    }
 
     try {
-        const url = `${ADMIN_API}/usuarios?admin_id=${encodeURIComponent(usuario.id)}`;
+        const url = urlConCursor(`${ADMIN_API}/usuarios?admin_id=${encodeURIComponent(usuario.id)}`, cursor);
         const res = await fetch(url);
         const data = await res.json();
         if (data.status !== "success") {
@@ -73,33 +98,26 @@ async function loadUsers() {
             return;
         }
 
-        if (!data.data.length) {
+        if (!cursor && !data.data.length) {
             tbody.innerHTML = "<tr><td colspan='7' class='text-center py-3'>No hay usuarios.</td></tr>";
             return;
         }
 
-        tbody.innerHTML = "";
-        data.data.forEach((u) => {
+        if (!cursor) tbody.innerHTML = "";
+        tbody.querySelector("tr.fila-ver-mas")?.remove();
+        data.data.forEach((u) => tbody.appendChild(renderUserRow(u)));
+
+        if (data.next_cursor) {
             const tr = document.createElement("tr");
-            tr.innerHTML = `
-                <td>${u.id}</td>
-                <td>${u.nombre}</td>
-                <td>${u.email}</td>
-                <td>${u.es_admin ? "Sí" : "No"}</td>
-                <td>${u.activo ? "Sí" : "No"}</td>
-                <td>${u.fecha_registro || ""}</td>
-                <td>
-                    ${u.activo && !u.es_admin
-                        ? `<button class="btn btn-sm btn-outline-danger" data-user-id="${u.id}">Desactivar</button>`
-                        : "-"}
-                </td>
-            `;
-            const btn = tr.querySelector("button[data-user-id]");
-            if (btn) {
-                btn.addEventListener("click", () => desactivarUsuario(u.id));
-            }
+            tr.className = "fila-ver-mas";
+            tr.innerHTML = "<td colspan='7' class='text-center py-2'><button class='btn btn-sm btn-outline-secondary'>Cargar más</button></td>";
+            const btn = tr.querySelector("button");
+            btn.addEventListener("click", () => {
+                btn.disabled = true;
+                loadUsers(data.next_cursor);
+            });
             tbody.appendChild(tr);
-        });
+        }
     } catch (error) {
         tbody.innerHTML = "<tr><td colspan='7' class='text-center text-danger py-3'>Error de conexión.</td></tr>";
     }
@@ -170,7 +188,7 @@ function init() {
 
     const btnReloadUsers = document.getElementById("btnReloadUsers");
     if (btnReloadUsers) {
-        btnReloadUsers.addEventListener("click", loadUsers);
+        btnReloadUsers.addEventListener("click", () => loadUsers());
     }
 
     const btnReloadLogs = document.getElementById("btnReloadLogs");
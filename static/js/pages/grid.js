@@ -1,7 +1,17 @@
-import { API_BASE, fetchJSON } from "../core/api.js";
+import { API_BASE, fetchJSON, idsEnLista, urlConCursor } from "../core/api.js";
 import { crearPosterCard, crearBotonLista } from "../core/ui.js";
 
-let userListIds = null;
+const BATCH_MAX_IDS = 50;
+const FAVORITAS_POR_PAGINA = 24;
+
+function usuarioActual() {
+    try {
+        const usuario = JSON.parse(localStorage.getItem('usuario') || 'null');
+        return usuario && usuario.id ? usuario : null;
+    } catch {
+        return null;
+    }
+}
 
 function setEstadoInicialBoton(boton, esta) {
     if (!boton) return;
@@ -12,7 +22,7 @@ function setEstadoInicialBoton(boton, esta) {
     }
 }
 
-function crearCard(data) {
+function crearCard(data, enLista) {
     const col = document.createElement("div");
 
     const link = document.createElement("a");
@@ -21,7 +31,7 @@ function crearCard(data) {
 
     const card = crearPosterCard(data);
     const boton = crearBotonLista(data);
-    if (userListIds && userListIds.has(String(data.id))) setEstadoInicialBoton(boton, true);
+    if (enLista && enLista.has(String(data.id))) setEstadoInicialBoton(boton, true);
     card.appendChild(boton);
 
     link.appendChild(card);
@@ -30,76 +40,68 @@ function crearCard(data) {
     return col;
 }
 
-async function cargarPeliculasFavoritas(idsPeliculas) {    
-    try {
-        const peliculasContainer = document.getElementById('peliculas');
-        if (!peliculasContainer) {
-            console.error('No se encontró el contenedor de películas');
-            return;
-        }
-        
-        peliculasContainer.innerHTML = '<div class="col-12 text-center py-3"><div class="spinner-border text-light" role="status"><span class="visually-hidden">Cargando...</span></div></div>';
-        
-        if (!Array.isArray(idsPeliculas) || idsPeliculas.length === 0) {
-            mostrarMensajeListaVacia();
-            return;
-        }
-        
-        const promesas = idsPeliculas.map(async (id) => {
-            try {
-                const resp = await fetchJSON(`${API_BASE}/peliculas/${id}`);
-                
-                if (resp && resp.ok && resp.data) {
-                    return resp.data.data || resp.data;
-                } else {
-                    console.error(`Error en la respuesta para ID ${id}`);
-                    return null;
-                }
-            } catch (error) {
-                console.error(`Error al cargar película ${id}:`, error);
-                return null;
+// Detalle de las películas pedidas, en el mismo orden que `ids`
+async function obtenerDetalles(ids) {
+    // Un solo request por bloque de ids en lugar de uno por película
+    const bloques = [];
+    for (let i = 0; i < ids.length; i += BATCH_MAX_IDS) {
+        bloques.push(ids.slice(i, i + BATCH_MAX_IDS));
+    }
+
+    const respuestas = await Promise.all(bloques.map(async (bloque) => {
+        try {
+            const resp = await fetchJSON(`${API_BASE}/peliculas/batch?ids=${bloque.join(',')}`);
+            if (resp && resp.ok && resp.data) {
+                const errores = resp.data.errors || {};
+                Object.keys(errores).forEach(id => console.error(`Error al cargar película ${id}:`, errores[id]));
+                return resp.data.data || [];
             }
-        });
-        
-        const resultados = await Promise.all(promesas);
-        const peliculas = resultados.filter(p => p !== null);
-        
-        peliculasContainer.innerHTML = '';
-        
-        if (peliculas.length === 0) {
-            mostrarMensajeListaVacia();
-            return;
+            console.error('Error en la respuesta del lote', bloque);
+            return [];
+        } catch (error) {
+            console.error('Error al cargar películas:', error);
+            return [];
         }
-        
-        peliculas.sort((a, b) => {
-            const titleA = (a && a.title) || '';
-            const titleB = (b && b.title) || '';
-            return String(titleA).localeCompare(String(titleB));
-        });
-        
-        peliculas.forEach(pelicula => {
-            if (pelicula && pelicula.id) {
-                const col = crearCard(pelicula);
-                if (col) {
-                    peliculasContainer.appendChild(col);
-                }
-            }
-        });
-        
-    } catch (error) {
-        console.error('Error al cargar películas favoritas:', error);
-        const peliculasContainer = document.getElementById('peliculas');
-        if (peliculasContainer) {
-            peliculasContainer.innerHTML = `
-                <div class="col-12 text-center py-5">
-                    <div class="alert alert-danger">
-                        <i class="bi bi-exclamation-triangle me-2"></i>
-                        Error al cargar las películas favoritas. Intenta recargar la página.
-                    </div>
-                </div>
-            `;
+    }));
+    const porId = new Map(respuestas.flat().filter(p => p && p.id).map(p => [String(p.id), p]));
+    return ids.map(id => porId.get(String(id))).filter(p => p);
+}
+
+// Agrega una página de "mi lista" a la grilla y devuelve el cursor siguiente (o null).
+// La primera página (sin cursor) reemplaza el spinner o muestra el aviso de lista vacía.
+async function cargarPaginaFavoritas(usuario, cursor) {
+    const url = urlConCursor(`${API_BASE}/mi-lista/${usuario.id}/`, cursor, FAVORITAS_POR_PAGINA);
+    const { ok, data } = await fetchJSON(url);
+    if (!ok || !data || data.status !== 'success') throw new Error("Error al obtener la lista");
+
+    const ids = (data.data || []).map(it => String(it.id));
+    const lista = document.getElementById('peliculas');
+    if (!cursor) {
+        lista.innerHTML = '';
+        if (ids.length === 0) {
+            mostrarMensajeListaVacia();
+            return null;
         }
     }
+    const enLista = new Set(ids);
+    const peliculas = await obtenerDetalles(ids);
+    peliculas.forEach(pelicula => lista.appendChild(crearCard(pelicula, enLista)));
+    return data.next_cursor || null;
+}
+
+async function cargarPeliculasFavoritas(usuario) {
+    const peliculasContainer = document.getElementById('peliculas');
+    if (!peliculasContainer) {
+        console.error('No se encontró el contenedor de películas');
+        return;
+    }
+    peliculasContainer.innerHTML = '<div class="col-12 text-center py-3"><div class="spinner-border text-light" role="status"><span class="visually-hidden">Cargando...</span></div></div>';
+
+    // Primera página ahora; las siguientes se cargan al hacer scroll
+    const siguiente = await cargarPaginaFavoritas(usuario, null);
+    if (siguiente) {
+        activarScrollInfinito(cursor => cargarPaginaFavoritas(usuario, cursor), siguiente);
+    }
 }
 
 async function cargarPeliculas() {
@@ -118,23 +120,12 @@ async function cargarPeliculas() {
     
     if (tipo === 'favoritas') {
         try {
-            const usuario = JSON.parse(localStorage.getItem('usuario') || 'null');
-            if (!usuario || !usuario.id) {
+            const usuario = usuarioActual();
+            if (!usuario) {
                 window.location.href = '/?redirect=' + encodeURIComponent('/peliculas/favoritas');
                 return;
             }
-            
-            const respList = await fetchJSON(`${API_BASE}/mi-lista/${usuario.id}/`);
-            if (respList.ok && respList.data && Array.isArray(respList.data.data)) {
-                userListIds = new Set(respList.data.data.map(it => String(it.id)));
-                if (userListIds.size > 0) {
-                    await cargarPeliculasFavoritas(Array.from(userListIds));
-                } else {
-                    mostrarMensajeListaVacia();
-                }
-            } else {
-                mostrarMensajeListaVacia();
-            }
+            await cargarPeliculasFavoritas(usuario);
         } catch (e) {
             console.error('Error al cargar favoritos:', e);
             mostrarMensajeError('Error al cargar tus películas favoritas');
@@ -143,24 +134,62 @@ async function cargarPeliculas() {
     }
     
     try {
-        const { ok, data } = await fetchJSON(`${API_BASE}/peliculas/${tipo}`);
-        if (!ok) throw new Error("Error al obtener películas");
-        const resultados = (data && data.data) || [];
-
         const lista = document.getElementById("peliculas");
         if (!lista) return;
-        
+
         lista.innerHTML = "";
-        resultados.forEach(pelicula => {
-            const col = crearCard(pelicula);
-            lista.appendChild(col);
-        });
+        const siguiente = await cargarPagina(tipo, 1);
+        if (siguiente) activarScrollInfinito(pagina => cargarPagina(tipo, pagina), siguiente);
     } catch (error) {
         console.error('Error al cargar películas:', error);
         mostrarMensajeError('Error al cargar las películas');
     }
 }
 
+// Agrega una página de la categoría a la grilla y devuelve la siguiente (o null)
+async function cargarPagina(tipo, pagina) {
+    const { ok, data } = await fetchJSON(`${API_BASE}/peliculas/${tipo}?page=${pagina}`);
+    if (!ok) throw new Error("Error al obtener películas");
+    const resultados = (data && data.data) || [];
+    // Sólo se consulta la pertenencia a "mi lista" de las películas de esta página
+    const usuario = usuarioActual();
+    const enLista = usuario ? await idsEnLista(usuario.id, resultados.map(p => p.id)) : null;
+
+    const lista = document.getElementById("peliculas");
+    resultados.forEach(pelicula => {
+        const col = crearCard(pelicula, enLista);
+        lista.appendChild(col);
+    });
+    return (data && data.next_page) || null;
+}
+
+// Llama a cargarSiguiente(siguiente) al acercarse al final hasta que devuelva null
+function activarScrollInfinito(cargarSiguiente, primeraSiguiente) {
+    const lista = document.getElementById("peliculas");
+    const centinela = document.createElement("div");
+    centinela.id = "peliculas-centinela";
+    lista.after(centinela);
+
+    let siguiente = primeraSiguiente;
+    let cargando = false;
+    const observer = new IntersectionObserver(async (entries) => {
+        if (!entries.some(e => e.isIntersecting) || cargando || !siguiente) return;
+        cargando = true;
+        try {
+            siguiente = await cargarSiguiente(siguiente);
+        } catch (error) {
+            console.error('Error al cargar más películas:', error);
+        } finally {
+            cargando = false;
+        }
+        if (!siguiente) {
+            observer.disconnect();
+            centinela.remove();
+        }
+    }, { rootMargin: '600px' });
+    observer.observe(centinela);
+}
+
 function mostrarMensajeListaVacia() {
     const peliculasContainer = document.getElementById('peliculas');
     if (peliculasContainer) {
@@ -1,8 +1,6 @@
-import { API_BASE, fetchJSON } from "../core/api.js";
+import { API_BASE, fetchJSON, idsEnLista } from "../core/api.js";
 import { crearPosterCard, crearBotonLista } from "../core/ui.js";
 
-let userListIds = null;
-
 function setEstadoInicialBoton(boton, estado) {
     if (!boton) return;
     if (estado) {
@@ -12,28 +10,30 @@ function setEstadoInicialBoton(boton, estado) {
     }
 }
 
-function crearCard(data) {
+function crearCard(data, enLista) {
     const link = document.createElement("a");
     link.href = `/peliculas/${data.id}`;
     link.classList.add("text-decoration-none", "text-reset");
 
     const card = crearPosterCard(data);
     const boton = crearBotonLista(data);
-    if (userListIds && userListIds.has(String(data.id))) setEstadoInicialBoton(boton, true);
+    if (enLista && enLista.has(String(data.id))) setEstadoInicialBoton(boton, true);
     card.appendChild(boton);
 
     link.appendChild(card);
     return link;
 }
 
-async function cargarCategoria(tipo, destinoId) {
+async function cargarCategoria(tipo, destinoId, usuario) {
     try {
         const { ok, data } = await fetchJSON(`${API_BASE}/peliculas/${tipo}`);
         if (!ok) throw new Error("Error al obtener películas");
         const datos = (data && data.data) || [];
+        // Sólo se consulta la pertenencia de las películas mostradas
+        const enLista = usuario ? await idsEnLista(usuario.id, datos.map(p => p.id)) : null;
         const cont = document.getElementById(destinoId);
         cont.innerHTML = "";
-        datos.forEach(p => cont.appendChild(crearCard(p)));
+        datos.forEach(p => cont.appendChild(crearCard(p, enLista)));
     } catch (e) {
         console.error("Error cargando", tipo, e);
     }
@@ -53,19 +53,13 @@ function setupArrows() {
 }
 
 document.addEventListener("DOMContentLoaded", () => {
-    (async () => {
-        try {
-            const usuario = JSON.parse(localStorage.getItem('usuario') || 'null');
-            if (usuario && usuario.id) {
-                const { ok, data } = await fetchJSON(`${API_BASE}/mi-lista/${usuario.id}/`);
-                if (ok && data && Array.isArray(data.data)) {
-                    userListIds = new Set(data.data.map(it => String(it.id)));
-                }
-            }
-        } catch {}
-        cargarCategoria('popular', 'carousel-popular');
-        cargarCategoria('top_rated', 'carousel-top');
-        cargarCategoria('now_playing', 'carousel-now');
-        setupArrows();
-    })();
+    let usuario = null;
+    try {
+        usuario = JSON.parse(localStorage.getItem('usuario') || 'null');
+    } catch {}
+    if (!usuario || !usuario.id) usuario = null;
+    cargarCategoria('popular', 'carousel-popular', usuario);
+    cargarCategoria('top_rated', 'carousel-top', usuario);
+    cargarCategoria('now_playing', 'carousel-now', usuario);
+    setupArrows();
 });
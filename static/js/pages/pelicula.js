@@ -1,6 +1,6 @@
-import { API_BASE, fetchJSON } from "../core/api.js";
+import { API_BASE, fetchJSON, idsEnLista, urlConCursor } from "../core/api.js";
 import { formatDateDMY } from "../core/utils.js";
-import { initRatingWidget, crearBotonLista } from "../core/ui.js";
+import { initRatingWidget, crearBotonLista, aplicarPoster } from "../core/ui.js";
 
 const movieId = window.MOVIE_ID;
 
@@ -19,7 +19,11 @@ async function cargarPelicula() {
         document.getElementById("duracion").textContent = p.runtime;
         document.getElementById("generos").textContent = p.genres.join(", ");
         document.getElementById("puntuacion").textContent = p.vote_average;
-        document.getElementById("imagen").src = p.imageUrl;
+        const comunidad = p.community || { count: 0 };
+        document.getElementById("puntuacionComunidad").textContent = comunidad.count
+            ? `${Number(comunidad.average).toFixed(1)} (${comunidad.count} ${comunidad.count === 1 ? 'reseña' : 'reseñas'})`
+            : 'Sin reseñas aún';
+        aplicarPoster(document.getElementById("imagen"), p.imageUrl, { sizes: "(min-width: 768px) 380px, 100vw" });
         if (p.backdropUrl) {
             const hero = document.querySelector('.movie-hero');
             if (hero) {
@@ -61,16 +65,13 @@ async function cargarPelicula() {
             try {
                 const usuario = JSON.parse(localStorage.getItem('usuario') || 'null');
                 if (usuario && usuario.id) {
-                    const { ok, data } = await fetchJSON(`${API_BASE}/mi-lista/${usuario.id}/`);
-                    if (ok && data && Array.isArray(data.data)) {
-                        const yaEsta = data.data.some(item => String(item.id) === String(p.id));
-                        if (yaEsta) {
-                            // replicar lógica de estado "added"
-                            btn.dataset.added = 'true';
-                            btn.textContent = 'Quitar de mi lista';
-                            btn.classList.remove('btn-outline-success');
-                            btn.classList.add('btn-danger');
-                        }
+                    const enLista = await idsEnLista(usuario.id, [p.id]);
+                    if (enLista.has(String(p.id))) {
+                        // replicar lógica de estado "added"
+                        btn.dataset.added = 'true';
+                        btn.textContent = 'Quitar de mi lista';
+                        btn.classList.remove('btn-outline-success');
+                        btn.classList.add('btn-danger');
                     }
                 }
             } catch {}
@@ -80,16 +81,28 @@ async function cargarPelicula() {
     }
 }
 
-async function cargarReviews() {
+// Carga una página de reseñas; con cursor se agregan a las ya mostradas
+async function cargarReviews(cursor = null) {
     try {
-        const { ok, data } = await fetchJSON(`${API_BASE}/reviews/${movieId}`);
+        const { ok, data } = await fetchJSON(urlConCursor(`${API_BASE}/reviews/${movieId}`, cursor));
         if (!ok || !data) return;
         const list = document.getElementById('reviewsList');
-        list.innerHTML = '';
+        if (!cursor) list.innerHTML = '';
+        list.querySelector('.btn-ver-mas')?.remove();
         (data.data || []).forEach(r => {
             const item = renderReviewItem(r);
             list.appendChild(item);
         });
+        if (data.next_cursor) {
+            const mas = document.createElement('button');
+            mas.className = 'btn btn-outline-secondary btn-sm btn-ver-mas';
+            mas.textContent = 'Ver más reseñas';
+            mas.addEventListener('click', () => {
+                mas.disabled = true;
+                cargarReviews(data.next_cursor);
+            });
+            list.appendChild(mas);
+        }
     } catch (e) {
         console.error('reviews error', e);
     }
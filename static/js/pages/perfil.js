@@ -1,3 +1,57 @@
+import { API_BASE, fetchJSON, urlConCursor } from "../core/api.js";
+
+function renderReview(rev) {
+    const item = document.createElement("div");
+    item.className = "review-item mb-2";
+    const tituloPel = rev.titulo_pelicula || `Pelicula #${rev.id_pelicula}`;
+    const rating = (rev.rating != null ? Number(rev.rating).toFixed(1) : "-");
+    const fechaTxt = rev.fecha ? new Date(rev.fecha).toLocaleDateString() : "";
+    const titulo = (rev.titulo && rev.titulo.trim()) ? `<div class='small fw-semibold mt-1'>${rev.titulo.trim()}</div>` : "";
+    const comentario = (rev.comentario && rev.comentario.trim()) ? `<div class='mt-1'>${rev.comentario.trim().replace(/</g,'&lt;')}</div>` : "";
+    item.innerHTML = `
+        <div class="d-flex align-items-start gap-2">
+            <div class="review-rating">${rating} ★</div>
+            <div>
+                <div class="fw-semibold">${tituloPel}</div>
+                <div class="small muted">${fechaTxt}</div>
+                ${titulo}
+                ${comentario}
+            </div>
+        </div>`;
+    return item;
+}
+
+// Carga una página de reseñas; con cursor se agregan a las ya mostradas
+async function cargarReviews(contenedor, userId, cursor = null) {
+    try {
+        const { ok, data } = await fetchJSON(urlConCursor(`${API_BASE}/users/${userId}/reviews`, cursor));
+        if (!ok || !data || data.status !== "success") {
+            if (!cursor) contenedor.innerHTML = "<div class='text-muted small'>No se pudieron cargar tus reseñas.</div>";
+            return;
+        }
+        const items = data.data || [];
+        if (!cursor && items.length === 0) {
+            contenedor.innerHTML = "<div class='text-muted small'>No has escrito ninguna reseña aún.</div>";
+            return;
+        }
+        if (!cursor) contenedor.innerHTML = "";
+        contenedor.querySelector(".btn-ver-mas")?.remove();
+        items.forEach((rev) => contenedor.appendChild(renderReview(rev)));
+        if (data.next_cursor) {
+            const mas = document.createElement("button");
+            mas.className = "btn btn-outline-secondary btn-sm btn-ver-mas";
+            mas.textContent = "Ver más reseñas";
+            mas.addEventListener("click", () => {
+                mas.disabled = true;
+                cargarReviews(contenedor, userId, data.next_cursor);
+            });
+            contenedor.appendChild(mas);
+        }
+    } catch {
+        if (!cursor) contenedor.innerHTML = "<div class='text-muted small'>No se pudieron cargar tus reseñas.</div>";
+    }
+}
+
 document.addEventListener("DOMContentLoaded", () => {
     const usuario = JSON.parse(localStorage.getItem("usuario") || "null");
     if (!usuario) {
@@ -6,11 +60,6 @@ document.addEventListener("DOMContentLoaded", () => {
         return;
     }
 
-    // Resolver base de API según entorno
-    const API_BASE = document.querySelector('meta[name="api-base"]')?.content
-        || (typeof window !== 'undefined' && window.API_BASE)
-        || `${location.origin}/api`;
-
     // Datos básicos del usuario
     const nombreEl = document.getElementById("nombreUsuario");
     const bioEl = document.getElementById("bioUsuario");
@@ -22,58 +71,17 @@ document.addEventListener("DOMContentLoaded", () => {
     if (bioEl) bioEl.textContent = "";
     if (fechaEl) fechaEl.textContent = "";
 
-    // Reseñas del usuario
+    // Reseñas del usuario (por páginas)
     if (listaReviews && usuario.id) {
         listaReviews.innerHTML = "<div class='text-muted small'>Cargando reseñas...</div>";
-        fetch(`${API_BASE}/users/${usuario.id}/reviews`)
-            .then((r) => r.json())
-            .then((data) => {
-                if (!data || data.status !== "success") {
-                    listaReviews.innerHTML = "<div class='text-muted small'>No se pudieron cargar tus reseñas.</div>";
-                    return;
-                }
-                const items = data.data || [];
-                if (items.length === 0) {
-                    listaReviews.innerHTML = "<div class='text-muted small'>No has escrito ninguna reseña aún.</div>";
-                    return;
-                }
-                listaReviews.innerHTML = "";
-                items.forEach((rev) => {
-                    const item = document.createElement("div");
-                    item.className = "review-item mb-2";
-                    const tituloPel = rev.titulo_pelicula || `Pelicula #${rev.id_pelicula}`;
-                    const rating = (rev.rating != null ? Number(rev.rating).toFixed(1) : "-");
-                    const fechaTxt = rev.fecha ? new Date(rev.fecha).toLocaleDateString() : "";
-                    const titulo = (rev.titulo && rev.titulo.trim()) ? `<div class='small fw-semibold mt-1'>${rev.titulo.trim()}</div>` : "";
-                    const comentario = (rev.comentario && rev.comentario.trim()) ? `<div class='mt-1'>${rev.comentario.trim().replace(/</g,'&lt;')}</div>` : "";
-                    item.innerHTML = `
-                        <div class="d-flex align-items-start gap-2">
-                            <div class="review-rating">${rating} ★</div>
-                            <div>
-                                <div class="fw-semibold">${tituloPel}</div>
-                                <div class="small muted">${fechaTxt}</div>
-                                ${titulo}
-                                ${comentario}
-                            </div>
-                        </div>`;
-                    listaReviews.appendChild(item);
-                });
-            })
-            .catch(() => {
-                listaReviews.innerHTML = "<div class='text-muted small'>No se pudieron cargar tus reseñas.</div>";
-            });
+        cargarReviews(listaReviews, usuario.id);
     }
 
     // Contar favoritas desde backend
     if (favoritasEl && usuario.id) {
-        fetch(`${API_BASE}/mi-lista/${usuario.id}/`)
-            .then((r) => r.json())
-            .then((data) => {
-                if (data && data.status === "success") {
-                    favoritasEl.textContent = (data.total != null ? data.total : (data.data || []).length);
-                } else {
-                    favoritasEl.textContent = "0";
-                }
+        fetchJSON(`${API_BASE}/mi-lista/${usuario.id}/cantidad`)
+            .then(({ ok, data }) => {
+                favoritasEl.textContent = ok && data && data.data ? data.data.total : "0";
             })
             .catch(() => {
                 favoritasEl.textContent = "0";
@@ -0,0 +1,209 @@
+"""
+Tests de cache.TTLCache y singleflight.SingleFlight (sin base ni red).
+
+    pytest test_cache.py -v
+"""
+import types
+
+import eventlet
+import pytest
+
+import cache
+from cache import TTLCache
+from singleflight import SingleFlight
+
+
+class Reloj:
+    """Reemplazo de time.monotonic que sólo avanza a mano."""
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+    def avanzar(self, segundos):
+        self.ahora += segundos
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    r = Reloj()
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(monotonic=r))
+    return r
+
+
+def _cargador(*valores):
+    """Función de carga que devuelve `valores` en orden (o lanza si el valor es una excepción)."""
+    pendientes = list(valores)
+    llamadas = []
+
+    def cargar():
+        llamadas.append(1)
+        valor = pendientes.pop(0)
+        if isinstance(valor, Exception):
+            raise valor
+        return valor
+
+    cargar.llamadas = llamadas
+    return cargar
+
+
+# --- TTLCache ---
+
+def test_hit_dentro_del_ttl(reloj):
+    c = TTLCache("t", ttl=10, stale_ttl=0)
+    cargar = _cargador("a")
+    assert c.get_or_load("k", cargar) == "a"
+    reloj.avanzar(9)
+    assert c.get_or_load("k", cargar) == "a"
+    assert len(cargar.llamadas) == 1
+    assert (c.hits, c.misses) == (1, 1)
+
+
+def test_get_no_devuelve_vencidas(reloj):
+    c = TTLCache("t", ttl=10, stale_ttl=100)
+    c.set("k", "a")
+    reloj.avanzar(10)
+    assert c.get("k") is None
+    assert c.get("k", "x") == "x"
+
+
+def test_stale_se_sirve_y_refresca_en_fondo(reloj):
+    c = TTLCache("t", ttl=10, stale_ttl=100)
+    cargar = _cargador("viejo", "nuevo")
+    c.get_or_load("k", cargar)
+    reloj.avanzar(50)
+
+    assert c.get_or_load("k", cargar) == "viejo"
+    assert c.stale_hits == 1
+    eventlet.sleep(0)  # deja correr el refresco
+    assert c.get("k") == "nuevo"
+    assert len(cargar.llamadas) == 2
+
+
+def test_refresco_en_fondo_se_lanza_una_sola_vez(reloj):
+    c = TTLCache("t", ttl=10, stale_ttl=100)
+    cargar = _cargador("viejo", "nuevo")
+    c.get_or_load("k", cargar)
+    reloj.avanzar(50)
+    c.get_or_load("k", cargar)
+    c.get_or_load("k", cargar)
+    eventlet.sleep(0)
+    assert len(cargar.llamadas) == 2
+
+
+def test_refresco_fallido_conserva_el_valor_viejo(reloj):
+    c = TTLCache("t", ttl=10, stale_ttl=100)
+    cargar = _cargador("viejo", RuntimeError("caído"), "nuevo")
+    c.get_or_load("k", cargar)
+    reloj.avanzar(50)
+
+    assert c.get_or_load("k", cargar) == "viejo"
+    eventlet.sleep(0)
+    assert c.errores_refresco == 1
+    # Sigue en la ventana stale con el valor viejo y se puede volver a intentar
+    assert c.get_or_load("k", cargar) == "viejo"
+    eventlet.sleep(0)
+    assert c.get("k") == "nuevo"
+
+
+def test_error_de_carga_sirve_entrada_muy_vieja(reloj):
+    c = TTLCache("t", ttl=10, stale_ttl=5)
+    cargar = _cargador("viejo", RuntimeError("caído"))
+    c.get_or_load("k", cargar)
+    reloj.avanzar(60)
+    assert c.get_or_load("k", cargar) == "viejo"
+    assert c.errores_servidos == 1
+
+
+def test_error_de_carga_sin_entrada_se_propaga(reloj):
+    c = TTLCache("t", ttl=10)
+    with pytest.raises(RuntimeError):
+        c.get_or_load("k", _cargador(RuntimeError("caído")))
+    assert c.get("k") is None
+
+
+def test_desalojo_lru(reloj):
+    c = TTLCache("t", max_items=2, ttl=10)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # "a" pasa a ser la más reciente
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert (c.get("a"), c.get("c")) == (1, 3)
+    assert c.desalojos == 1
+
+
+def test_invalidar_y_limpiar(reloj):
+    c = TTLCache("t", ttl=10)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.invalidar("a")
+    assert c.get("a") is None and c.get("b") == 2
+    c.limpiar()
+    assert c.stats()["items"] == 0
+
+
+def test_contar_consulta(reloj):
+    c = TTLCache("t", ttl=10)
+    c.contar_consulta(hit=True)
+    c.contar_consulta(hit=False, cantidad=3)
+    assert c.stats()["hits"] == 1
+    assert c.stats()["misses"] == 3
+    assert c.stats()["hit_ratio"] == 0.25
+
+
+# --- SingleFlight ---
+
+def test_singleflight_llamadas_concurrentes_comparten_resultado():
+    grupo = SingleFlight("t")
+    llamadas = []
+
+    def lenta():
+        llamadas.append(1)
+        eventlet.sleep(0.01)
+        return object()
+
+    pool = eventlet.GreenPool()
+    resultados = list(pool.imap(lambda _: grupo.do("k", lenta), range(5)))
+    assert len(llamadas) == 1
+    assert all(r is resultados[0] for r in resultados)
+    assert grupo.stats() == {"en_vuelo": 0, "llamadas": 1, "coalescidas": 4}
+
+
+def test_singleflight_claves_distintas_no_se_agrupan():
+    grupo = SingleFlight("t")
+    pool = eventlet.GreenPool()
+    assert sorted(pool.imap(lambda k: grupo.do(k, lambda: k), ["a", "b"])) == ["a", "b"]
+    assert grupo.llamadas == 2
+
+
+def test_singleflight_error_compartido():
+    grupo = SingleFlight("t")
+
+    def falla():
+        eventlet.sleep(0.01)
+        raise ValueError("upstream")
+
+    def llamar(_):
+        try:
+            grupo.do("k", falla)
+        except ValueError as e:
+            return str(e)
+
+    pool = eventlet.GreenPool()
+    assert list(pool.imap(llamar, range(3))) == ["upstream"] * 3
+    assert grupo.llamadas == 1
+    # Después del error la clave queda libre para un nuevo intento
+    assert grupo.do("k", lambda: "ok") == "ok"
+
+
+def test_singleflight_timeout_del_seguidor():
+    grupo = SingleFlight("t")
+    lider = eventlet.spawn(grupo.do, "k", lambda: eventlet.sleep(0.2) or "listo")
+    eventlet.sleep(0)
+    with pytest.raises(TimeoutError):
+        grupo.do("k", lambda: "no se llama", timeout=0.01)
+    # El líder no se ve afectado por el timeout del seguidor
+    assert lider.wait() == "listo"
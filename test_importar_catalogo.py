@@ -0,0 +1,107 @@
+"""
+Tests de importar_catalogo contra la base de prueba (ver conftest.py):
+géneros con nombre repetido y retomar desde el checkpoint.
+
+    TEST_DATABASE_URL=postgresql+psycopg2://localhost/peliculas_test pytest test_importar_catalogo.py -v
+
+Sin TEST_DATABASE_URL los tests se saltean.
+"""
+import json
+
+import pytest
+from sqlalchemy import text
+
+from conftest import base_de_prueba
+
+db = base_de_prueba()
+import importar_catalogo  # noqa: E402  (importa db)
+
+PELICULA_BASE = 920_000_000
+GENERO_BASE = 990_000
+
+
+def _limpiar():
+    with db.engine.begin() as conn:
+        conn.execute(text("DELETE FROM peliculas WHERE id BETWEEN :a AND :b"),
+                     {"a": PELICULA_BASE, "b": PELICULA_BASE + 999})
+        conn.execute(text("DELETE FROM generos WHERE id BETWEEN :a AND :b"),
+                     {"a": GENERO_BASE, "b": GENERO_BASE + 999})
+
+
+@pytest.fixture
+def conexion():
+    _limpiar()
+    conexion = db.engine.raw_connection()
+    importar_catalogo.crear_staging(conexion)
+    yield conexion
+    conexion.close()
+    _limpiar()
+
+
+def _escribir(ruta, registros):
+    ruta.write_text("".join(json.dumps(r) + "\n" for r in registros), encoding="utf-8")
+    return str(ruta)
+
+
+def _generos_de(id_pelicula):
+    with db.engine.connect() as conn:
+        return {f[0] for f in conn.execute(
+            text("SELECT id_genero FROM peliculas_generos WHERE id_pelicula = :id"), {"id": id_pelicula})}
+
+
+def test_generos_con_nombre_repetido_usan_el_id_existente(conexion, tmp_path):
+    with db.engine.begin() as conn:
+        conn.execute(text("INSERT INTO generos (id, nombre) VALUES (:id, 'Género test A')"), {"id": GENERO_BASE + 1})
+
+    archivo = _escribir(tmp_path / "dump.jsonl", [
+        # Mismo nombre que un género ya cargado, con otro id
+        {"id": PELICULA_BASE + 1, "title": "Una", "genres": [
+            {"id": GENERO_BASE + 2, "name": "Género test A"},
+            {"id": GENERO_BASE + 3, "name": "Género test B"},
+        ]},
+        # Mismo nombre que otro género del mismo lote
+        {"id": PELICULA_BASE + 2, "title": "Otra", "genres": [{"id": GENERO_BASE + 4, "name": "Género test B"}]},
+    ])
+    estado = importar_catalogo.importar_archivo(conexion, archivo, tamano_lote=10)
+
+    assert estado["completo"] and estado["peliculas"] == 2
+    with db.engine.connect() as conn:
+        generos = dict(conn.execute(text("SELECT nombre, id FROM generos WHERE id BETWEEN :a AND :b"),
+                                    {"a": GENERO_BASE, "b": GENERO_BASE + 999}).fetchall())
+    assert generos == {"Género test A": GENERO_BASE + 1, "Género test B": GENERO_BASE + 3}
+    assert _generos_de(PELICULA_BASE + 1) == {GENERO_BASE + 1, GENERO_BASE + 3}
+    assert _generos_de(PELICULA_BASE + 2) == {GENERO_BASE + 3}
+
+
+def test_retoma_desde_el_ultimo_lote_confirmado(conexion, tmp_path, monkeypatch):
+    archivo = _escribir(tmp_path / "ids.jsonl", [
+        {"id": PELICULA_BASE + i, "original_title": f"Película {i}"} for i in range(5)
+    ])
+    cargar_lote = importar_catalogo.cargar_lote
+    cargados = []
+
+    def falla_en_el_segundo(conexion, lote):
+        if len(cargados) == 1:
+            raise KeyboardInterrupt
+        cargar_lote(conexion, lote)
+        cargados.append(sorted(lote.peliculas))
+
+    monkeypatch.setattr(importar_catalogo, "cargar_lote", falla_en_el_segundo)
+    with pytest.raises(KeyboardInterrupt):
+        importar_catalogo.importar_archivo(conexion, archivo, tamano_lote=2)
+    assert importar_catalogo.leer_checkpoint(archivo) == {
+        "lineas": 2, "peliculas": 2, "invalidas": 0, "completo": False}
+
+    cargados.append("retoma")
+    estado = importar_catalogo.importar_archivo(conexion, archivo, tamano_lote=2)
+    assert estado == {"lineas": 5, "peliculas": 5, "invalidas": 0, "completo": True}
+    # Las dos primeras no se vuelven a cargar
+    assert cargados == [
+        [PELICULA_BASE, PELICULA_BASE + 1],
+        "retoma",
+        [PELICULA_BASE + 2, PELICULA_BASE + 3],
+        [PELICULA_BASE + 4],
+    ]
+    with db.engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM peliculas WHERE id BETWEEN :a AND :b"),
+                            {"a": PELICULA_BASE, "b": PELICULA_BASE + 999}).scalar() == 5
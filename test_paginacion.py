@@ -0,0 +1,84 @@
+"""
+Tests del cursor de paginación keyset (paginacion.py), sin base ni red.
+
+    pytest test_paginacion.py -v
+"""
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+import paginacion
+from paginacion import CursorInvalido, codificar_cursor, decodificar_cursor, limitar_pagina
+
+
+def _b64(crudo: bytes) -> str:
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+
+@pytest.mark.parametrize("fecha", [
+    datetime(2026, 10, 18, 8, 5, 42),
+    datetime(2026, 1, 1, 0, 0, 0, 123456),
+])
+def test_ida_y_vuelta(fecha):
+    cursor = codificar_cursor(fecha, 42)
+    assert "=" not in cursor
+    assert decodificar_cursor(cursor) == (fecha, 42)
+
+
+def test_cursor_es_url_safe():
+    cursor = codificar_cursor(datetime(2026, 10, 18, 23, 59, 59, 999999), 2**31 - 1)
+    assert all(c.isalnum() or c in "-_" for c in cursor)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "no es base64!",
+    "%%%",
+    _b64(b"\xff\xfe"),                         # no es UTF-8
+    _b64(b"{roto"),                            # JSON inválido
+    _b64(json.dumps([1, 2]).encode()),         # la fecha no es texto
+    _b64(json.dumps(["ayer", 2]).encode()),    # fecha no ISO
+    _b64(json.dumps(["2026-01-01T00:00:00", "x"]).encode()),
+    _b64(json.dumps(["2026-01-01T00:00:00"]).encode()),
+    _b64(json.dumps(["2026-01-01T00:00:00", 1, 2]).encode()),
+    _b64(json.dumps({"fecha": "2026-01-01", "id": 1}).encode()),
+    _b64(json.dumps(None).encode()),
+])
+def test_cursor_invalido(cursor):
+    with pytest.raises(CursorInvalido):
+        decodificar_cursor(cursor)
+
+
+def test_cursor_invalido_es_value_error():
+    assert issubclass(CursorInvalido, ValueError)
+
+
+def test_params_cursor():
+    assert paginacion.params_cursor(None) == {}
+    fecha = datetime(2026, 10, 18, 8, 0)
+    assert paginacion.params_cursor(codificar_cursor(fecha, 7)) == {"cursor_fecha": fecha, "cursor_id": 7}
+    with pytest.raises(CursorInvalido):
+        paginacion.params_cursor("basura")
+
+
+def test_keyset_variantes():
+    primera, siguiente = paginacion.keyset(
+        "SELECT * FROM t WHERE a = :a {filtro} ORDER BY f DESC, id DESC", "f", "id"
+    )
+    assert "{filtro}" not in str(primera) and ":cursor_fecha" not in str(primera)
+    assert "AND (f, id) < (:cursor_fecha, :cursor_id)" in str(siguiente)
+
+
+@pytest.mark.parametrize("pedido, esperado", [
+    (None, paginacion.PAGINA_DEFAULT),
+    (0, paginacion.PAGINA_DEFAULT),
+    (-5, 1),
+    (1, 1),
+    (paginacion.PAGINA_MAX, paginacion.PAGINA_MAX),
+    (paginacion.PAGINA_MAX + 1, paginacion.PAGINA_MAX),
+    (10**9, paginacion.PAGINA_MAX),
+])
+def test_limitar_pagina(pedido, esperado):
+    assert limitar_pagina(pedido) == esperado
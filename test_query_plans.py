@@ -0,0 +1,167 @@
+"""
+Regresión de planes de consulta para las consultas frecuentes de db.py.
+
+Carga datos de prueba en una base dedicada (TEST_DATABASE_URL, nunca la de
+DATABASE_URL), le aplica las migraciones, ejecuta cada función de db.py
+capturando el SQL que envía y corre EXPLAIN sobre ese mismo SQL. Falla si
+el plan recorre la tabla principal con un Seq Scan o necesita un Sort.
+
+    createdb peliculas_test
+    TEST_DATABASE_URL=postgresql+psycopg2://localhost/peliculas_test pytest test_query_plans.py -v
+
+Sin TEST_DATABASE_URL, o si apunta a la misma base que DATABASE_URL, los
+tests se saltean.
+"""
+import json
+
+import pytest
+from sqlalchemy import event, text
+
+from conftest import base_de_prueba
+
+db = base_de_prueba()
+
+# Rango de ids y emails reservados para los datos de prueba
+PELICULA_BASE = 900_000_000
+EMAIL_PATRON = "plan_test_%@example.com"
+N_USUARIOS = 5_000
+# Sólo los primeros usuarios reciben reviews y lista (el resto puebla el directorio)
+N_USUARIOS_ACTIVOS = 200
+N_PELICULAS = 2_000
+N_REVIEWS = 50_000
+N_LISTA_POR_USUARIO = 100
+
+SEED_SQL = f"""
+INSERT INTO usuarios (nombre, email, contrasena_hash)
+SELECT 'plan ' || i, 'plan_test_' || i || '@example.com', 'x'
+FROM generate_series(1, {N_USUARIOS}) AS i;
+
+INSERT INTO peliculas (id, titulo, anio)
+SELECT {PELICULA_BASE} + i, 'Película de prueba ' || md5(i::text), 1950 + i % 75
+FROM generate_series(1, {N_PELICULAS}) AS i;
+
+INSERT INTO reviews (id_usuario, id_pelicula, rating, titulo, comentario, fecha)
+SELECT u.ids[1 + i % {N_USUARIOS_ACTIVOS}], {PELICULA_BASE} + 1 + i % {N_PELICULAS},
+       (i % 10) + 0.5, 'review ' || i, 'comentario', NOW() - (i || ' minutes')::interval
+FROM generate_series(1, {N_REVIEWS}) AS i,
+     (SELECT (array_agg(id ORDER BY id))[1:{N_USUARIOS_ACTIVOS}] AS ids
+      FROM usuarios WHERE email LIKE '{EMAIL_PATRON}') AS u;
+
+INSERT INTO lista_usuario (id_usuario, id_pelicula, titulo, fecha_agregado)
+SELECT u.id, {PELICULA_BASE} + j, 'Película ' || j, NOW() - (j || ' hours')::interval
+FROM (SELECT id FROM usuarios WHERE email LIKE '{EMAIL_PATRON}' ORDER BY id LIMIT {N_USUARIOS_ACTIVOS}) AS u,
+     generate_series(1, {N_LISTA_POR_USUARIO}) AS j;
+"""
+
+LIMPIEZA_SQL = f"""
+DELETE FROM usuarios WHERE email LIKE '{EMAIL_PATRON}';
+DELETE FROM peliculas WHERE id > {PELICULA_BASE};
+"""
+
+
+@pytest.fixture(scope="module")
+def datos():
+    with db.engine.begin() as conn:
+        conn.execute(text(LIMPIEZA_SQL))
+        conn.execute(text(SEED_SQL))
+        usuario = conn.execute(
+            text("SELECT id FROM usuarios WHERE email LIKE :p ORDER BY id LIMIT 1"), {"p": EMAIL_PATRON}
+        ).scalar()
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE usuarios, peliculas, reviews, lista_usuario"))
+    yield {"usuario": usuario, "pelicula": PELICULA_BASE + 1}
+    with db.engine.begin() as conn:
+        conn.execute(text(LIMPIEZA_SQL))
+
+
+def _capturar_sql(funcion, *args):
+    """Ejecuta `funcion` y devuelve el último (sql, parámetros) enviado al driver."""
+    capturados = []
+
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        capturados.append((statement, parameters))
+
+    motores = [m for m in (db.engine, db.engine_replica) if m is not None]
+    for motor in motores:
+        event.listen(motor, "before_cursor_execute", antes)
+    try:
+        funcion(*args)
+    finally:
+        for motor in motores:
+            event.remove(motor, "before_cursor_execute", antes)
+    assert capturados, f"{funcion.__name__} no ejecutó ninguna consulta"
+    return capturados[-1]
+
+
+def _plan(statement, parameters):
+    with db.engine.connect() as conn:
+        fila = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    plan = fila if isinstance(fila, list) else json.loads(fila)
+    return plan[0]["Plan"]
+
+
+def _nodos(plan):
+    yield plan
+    for hijo in plan.get("Plans", []):
+        yield from _nodos(hijo)
+
+
+def _verificar(plan, tabla):
+    nodos = list(_nodos(plan))
+    seq = [n for n in nodos if n["Node Type"] == "Seq Scan" and n.get("Relation Name") == tabla]
+    sorts = [n for n in nodos if n["Node Type"] in ("Sort", "Incremental Sort")]
+    descripcion = json.dumps(plan, indent=1)
+    assert not seq, f"Seq Scan sobre {tabla}:\n{descripcion}"
+    assert not sorts, f"Sort en el plan:\n{descripcion}"
+
+
+def test_reviews_por_pelicula(datos):
+    plan = _plan(*_capturar_sql(db.listar_reviews_por_pelicula, datos["pelicula"]))
+    _verificar(plan, "reviews")
+
+
+def test_reviews_por_pelicula_pagina_siguiente(datos):
+    _, cursor = db.listar_reviews_por_pelicula(datos["pelicula"], 5)
+    assert cursor is not None
+    plan = _plan(*_capturar_sql(db.listar_reviews_por_pelicula, datos["pelicula"], 5, cursor))
+    _verificar(plan, "reviews")
+
+
+def test_reviews_por_usuario(datos):
+    plan = _plan(*_capturar_sql(db.listar_reviews_por_usuario, datos["usuario"]))
+    _verificar(plan, "reviews")
+
+
+def test_lista_usuario(datos):
+    plan = _plan(*_capturar_sql(db.obtener_lista_usuario, datos["usuario"]))
+    _verificar(plan, "lista_usuario")
+
+
+def test_lista_usuario_pagina_siguiente(datos):
+    _, cursor = db.obtener_lista_usuario(datos["usuario"], 10)
+    assert cursor is not None
+    plan = _plan(*_capturar_sql(db.obtener_lista_usuario, datos["usuario"], 10, cursor))
+    _verificar(plan, "lista_usuario")
+
+
+def test_lista_contiene(datos):
+    ids = [PELICULA_BASE + j for j in range(1, 40, 3)]
+    plan = _plan(*_capturar_sql(db.lista_contiene, datos["usuario"], ids))
+    _verificar(plan, "lista_usuario")
+
+
+def test_listar_usuarios(datos):
+    plan = _plan(*_capturar_sql(db.listar_usuarios))
+    _verificar(plan, "usuarios")
+
+
+def test_listar_usuarios_pagina_siguiente(datos):
+    _, cursor = db.listar_usuarios(5)
+    assert cursor is not None
+    plan = _plan(*_capturar_sql(db.listar_usuarios, 5, cursor))
+    _verificar(plan, "usuarios")
+
+
+def test_buscar_pelicula_por_titulo(datos):
+    plan = _plan(*_capturar_sql(db.buscar_pelicula_por_titulo, "prueba 1a2"))
+    _verificar(plan, "peliculas")
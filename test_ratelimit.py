@@ -0,0 +1,170 @@
+"""
+Tests de ratelimit.TokenBucket y circuit_breaker.CircuitBreaker con un reloj
+falso (sin red ni esperas reales).
+
+    pytest test_ratelimit.py -v
+"""
+import types
+
+import eventlet
+import pytest
+
+import circuit_breaker
+import ratelimit
+from circuit_breaker import ABIERTO, CERRADO, SEMIABIERTO, CircuitBreaker
+from ratelimit import FONDO, INTERACTIVA, TokenBucket
+
+
+class Reloj:
+    """
+    monotonic/sleep falsos: dormir avanza el reloj (de a `paso` segundos como
+    máximo, para intercalar greenlets) y cede a otros greenlets.
+    """
+
+    def __init__(self):
+        self.ahora = 1000.0
+        self.paso = float("inf")
+
+    def monotonic(self):
+        return self.ahora
+
+    def sleep(self, segundos):
+        self.ahora += min(segundos, self.paso)
+        eventlet.sleep(0)
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    r = Reloj()
+    falso = types.SimpleNamespace(monotonic=r.monotonic, sleep=r.sleep)
+    monkeypatch.setattr(ratelimit, "time", falso)
+    monkeypatch.setattr(circuit_breaker, "time", falso)
+    return r
+
+
+# --- TokenBucket ---
+
+def test_rafaga_hasta_la_capacidad(reloj):
+    bucket = TokenBucket(tasa=1, capacidad=4)
+    assert all(bucket.adquirir(INTERACTIVA, timeout=0) for _ in range(4))
+    assert not bucket.adquirir(INTERACTIVA, timeout=0)
+    assert bucket.rechazados[INTERACTIVA] == 1
+
+
+def test_recarga_con_el_tiempo(reloj):
+    bucket = TokenBucket(tasa=2, capacidad=4)
+    for _ in range(4):
+        bucket.adquirir(INTERACTIVA)
+    reloj.ahora += 1  # 2 tokens
+    assert bucket.adquirir(INTERACTIVA, timeout=0)
+    assert bucket.adquirir(INTERACTIVA, timeout=0)
+    assert not bucket.adquirir(INTERACTIVA, timeout=0)
+
+
+def test_fondo_respeta_la_reserva_interactiva(reloj):
+    bucket = TokenBucket(tasa=1, capacidad=4, reserva_interactiva=0.25)  # reserva de 1 token
+    concedidos = 0
+    while bucket.adquirir(FONDO, timeout=0):
+        concedidos += 1
+    assert concedidos == 3
+    assert bucket.rechazados[FONDO] == 1
+    # El último token queda para el tráfico interactivo
+    assert bucket.adquirir(INTERACTIVA, timeout=0)
+
+
+def test_fondo_espera_y_cede_a_interactivos(reloj):
+    reloj.paso = 0.1
+    bucket = TokenBucket(tasa=1, capacidad=4)
+    for _ in range(4):
+        bucket.adquirir(INTERACTIVA)
+    orden = []
+
+    def pedir(prioridad):
+        assert bucket.adquirir(prioridad, timeout=30)
+        orden.append(prioridad)
+
+    fondo = eventlet.spawn(pedir, FONDO)
+    eventlet.sleep(0)  # el de fondo ya está esperando
+    interactivo = eventlet.spawn(pedir, INTERACTIVA)
+    fondo.wait()
+    interactivo.wait()
+    assert orden == [INTERACTIVA, FONDO]
+
+
+def test_timeout_de_espera(reloj):
+    bucket = TokenBucket(tasa=0.1, capacidad=1)
+    bucket.adquirir(INTERACTIVA)
+    inicio = reloj.ahora
+    assert not bucket.adquirir(INTERACTIVA, timeout=2)
+    assert reloj.ahora - inicio == pytest.approx(2)
+
+
+# --- CircuitBreaker ---
+
+def _abrir(cb):
+    for _ in range(cb.umbral_fallos):
+        assert cb.permitir()
+        cb.fallo()
+
+
+def test_se_abre_tras_fallos_seguidos(reloj):
+    cb = CircuitBreaker("t", umbral_fallos=3, enfriamiento=30)
+    cb.permitir()
+    cb.fallo()
+    cb.permitir()
+    cb.exito()  # un éxito reinicia la cuenta
+    _abrir(cb)
+    assert cb.estado == ABIERTO
+    assert not cb.permitir()
+    assert cb.rechazadas == 1
+    assert cb.reintentar_en() == pytest.approx(30)
+
+
+def test_semiabierto_deja_una_sola_prueba(reloj):
+    cb = CircuitBreaker("t", umbral_fallos=2, enfriamiento=30)
+    _abrir(cb)
+    reloj.ahora += 30
+    assert cb.permitir()
+    assert cb.estado == SEMIABIERTO
+    assert not cb.permitir()
+
+
+def test_prueba_exitosa_cierra(reloj):
+    cb = CircuitBreaker("t", umbral_fallos=2, enfriamiento=30)
+    _abrir(cb)
+    reloj.ahora += 30
+    assert cb.permitir()
+    cb.exito()
+    assert cb.estado == CERRADO
+    assert cb.permitir() and cb.permitir()
+
+
+def test_prueba_fallida_reabre(reloj):
+    cb = CircuitBreaker("t", umbral_fallos=2, enfriamiento=30)
+    _abrir(cb)
+    reloj.ahora += 30
+    assert cb.permitir()
+    cb.fallo()
+    assert cb.estado == ABIERTO
+    assert cb.aperturas == 2
+    assert not cb.permitir()
+    reloj.ahora += 30
+    assert cb.permitir()
+
+
+def test_liberar_no_cuenta_como_fallo(reloj):
+    cb = CircuitBreaker("t", umbral_fallos=2, enfriamiento=30)
+    for _ in range(5):
+        assert cb.permitir()
+        cb.liberar()
+    assert cb.estado == CERRADO
+    assert cb.stats()["fallos_seguidos"] == 0
+
+    _abrir(cb)
+    reloj.ahora += 30
+    assert cb.permitir()
+    cb.liberar()  # la prueba no salió: el permiso vuelve y el estado no cambia
+    assert cb.estado == SEMIABIERTO
+    assert cb.permitir()
+    cb.exito()
+    assert cb.estado == CERRADO
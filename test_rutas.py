@@ -0,0 +1,140 @@
+"""
+Tests de rutas de la API contra la base de prueba (ver conftest.py).
+
+    TEST_DATABASE_URL=postgresql+psycopg2://localhost/peliculas_test pytest test_rutas.py -v
+
+Sin TEST_DATABASE_URL los tests se saltean.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from conftest import base_de_prueba
+
+db = base_de_prueba()
+import app as aplicacion  # noqa: E402  (db tiene que apuntar antes a la base de prueba)
+
+EMAIL_PATRON = "rutas_test_%@example.com"
+PELICULA_BASE = 910_000_000
+
+
+@pytest.fixture
+def cliente():
+    aplicacion.app.config["TESTING"] = True
+    return aplicacion.app.test_client()
+
+
+@pytest.fixture
+def usuario():
+    with db.engine.begin() as conn:
+        conn.execute(text("DELETE FROM usuarios WHERE email LIKE :p"), {"p": EMAIL_PATRON})
+        id_usuario = conn.execute(text("""
+            INSERT INTO usuarios (nombre, email, contrasena_hash)
+            VALUES ('rutas', 'rutas_test_1@example.com', 'x') RETURNING id
+        """)).scalar()
+    yield id_usuario
+    with db.engine.begin() as conn:
+        conn.execute(text("DELETE FROM usuarios WHERE email LIKE :p"), {"p": EMAIL_PATRON})
+    db.invalidar_usuario(id_usuario)
+
+
+def _cargar_lista(id_usuario, cantidad):
+    ahora = datetime(2026, 10, 18, 12, 0)
+    with db.engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO lista_usuario (id_usuario, id_pelicula, titulo, fecha_agregado)
+            VALUES (:u, :p, :t, :f)
+        """), [{"u": id_usuario, "p": PELICULA_BASE + i, "t": f"Película {i}",
+                # Cada tres películas comparten fecha: el desempate es por id
+                "f": ahora - timedelta(minutes=i // 3)} for i in range(cantidad)])
+
+
+def _b64(valor) -> str:
+    return base64.urlsafe_b64encode(json.dumps(valor).encode()).decode().rstrip("=")
+
+
+# --- Paginación por cursor ---
+
+@pytest.mark.parametrize("ruta", [
+    "/api/reviews/550",
+    "/api/users/1/reviews",
+    "/api/mi-lista/1/",
+])
+@pytest.mark.parametrize("cursor", ["basura", "%%%", _b64(["ayer", 1]), _b64({"id": 1})])
+def test_cursor_invalido_responde_400(cliente, ruta, cursor):
+    resp = cliente.get(ruta, query_string={"cursor": cursor})
+    assert resp.status_code == 400
+    assert resp.get_json() == {"status": "error", "message": "Cursor inválido"}
+
+
+def test_limite_acotado_y_recorrido_por_cursor(cliente, usuario):
+    total = db.PAGINA_MAX + 5
+    _cargar_lista(usuario, total)
+
+    primera = cliente.get(f"/api/mi-lista/{usuario}/", query_string={"limit": 10**6}).get_json()
+    assert primera["status"] == "success"
+    assert primera["total"] == db.PAGINA_MAX
+    assert primera["next_cursor"]
+
+    segunda = cliente.get(f"/api/mi-lista/{usuario}/",
+                          query_string={"limit": 10**6, "cursor": primera["next_cursor"]}).get_json()
+    assert segunda["total"] == 5
+    assert segunda["next_cursor"] is None
+
+    ids = [p["id"] for p in primera["data"] + segunda["data"]]
+    assert sorted(ids) == list(range(PELICULA_BASE, PELICULA_BASE + total))
+
+
+def test_paginas_chicas_no_repiten_ni_saltean(cliente, usuario):
+    _cargar_lista(usuario, 10)
+    vistos, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        pagina = cliente.get(f"/api/mi-lista/{usuario}/", query_string=params).get_json()
+        vistos += [p["id"] for p in pagina["data"]]
+        cursor = pagina["next_cursor"]
+        if cursor is None:
+            break
+    # Más nuevas primero y, con la misma fecha, id descendente
+    esperado = sorted(range(10), key=lambda i: (i // 3, -i))
+    assert vistos == [PELICULA_BASE + i for i in esperado]
+
+
+# --- Lista en lote ---
+
+def test_lote_con_items_validos_e_invalidos(cliente, usuario):
+    agregar = [
+        {"id": PELICULA_BASE + 1, "titulo": "Válida"},
+        {"id": PELICULA_BASE + 2, "titulo": "Otra válida", "poster_url": None},
+        {"id": True, "titulo": "Bool"},
+        {"id": 3.5, "titulo": "Decimal"},
+        {"id": "550", "titulo": "String"},
+        {"id": 2**31, "titulo": "Fuera de rango"},
+        {"id": 0, "titulo": "Cero"},
+        {"id": -1, "titulo": "Negativo"},
+        {"id": PELICULA_BASE + 3, "titulo": ""},
+        "no es un objeto",
+    ]
+    eliminar = [PELICULA_BASE + 1, 2**40, False, "x"]
+
+    resp = cliente.post("/api/mi-lista/lote/", json={"user_id": usuario, "agregar": agregar, "eliminar": eliminar})
+    assert resp.status_code == 200
+    cuerpo = resp.get_json()
+    assert cuerpo["agregadas"] == 2
+
+    por_resultado = {}
+    for r in cuerpo["data"]["agregar"]:
+        por_resultado.setdefault(r["resultado"], []).append(r["id"])
+    assert sorted(por_resultado["agregada"]) == [PELICULA_BASE + 1, PELICULA_BASE + 2]
+    assert len(por_resultado["invalida"]) == 8
+
+    assert cuerpo["data"]["eliminar"][-1] == {"id": PELICULA_BASE + 1, "resultado": "no_estaba"}
+    assert sum(r["resultado"] == "invalida" for r in cuerpo["data"]["eliminar"]) == 3
+
+    # Se elimina antes de agregar: la que está en ambas listas queda guardada
+    assert db.lista_contiene(usuario, [PELICULA_BASE + i for i in range(1, 4)]) == {PELICULA_BASE + 1,
+                                                                                    PELICULA_BASE + 2}
+
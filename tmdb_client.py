@@ -0,0 +1,204 @@
+"""
+Cliente HTTP para la API de TMDB.
+Mantiene un pool de conexiones persistente (keep-alive), aplica timeouts de
+conexión/lectura en cada llamada, reintenta con backoff exponencial y jitter
+ante 429/5xx, y respeta un presupuesto total de tiempo por request entrante.
+Todo el tráfico pasa por un token bucket con prioridades y un circuit breaker.
+"""
+import os
+import random
+import time
+from typing import Optional, Dict, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from flask import g, has_request_context
+
+from crypto_utils import decrypt_token
+from singleflight import SingleFlight
+from ratelimit import TokenBucket, INTERACTIVA
+from circuit_breaker import CircuitBreaker
+
+load_dotenv()
+
+# --- Configuración ---
+ENCRYPTED_API_KEY = os.getenv('TMDB_API_KEY') or ''
+API_KEY = decrypt_token(ENCRYPTED_API_KEY) if ENCRYPTED_API_KEY.startswith('gAAAA') else ENCRYPTED_API_KEY
+TMDB_URL = os.getenv('TMDB_URL', 'https://api.themoviedb.org/3').rstrip('/')
+
+CONNECT_TIMEOUT = float(os.getenv('TMDB_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.getenv('TMDB_READ_TIMEOUT', '5'))
+MAX_RETRIES = int(os.getenv('TMDB_MAX_RETRIES', '2'))
+BACKOFF_BASE = float(os.getenv('TMDB_BACKOFF_BASE', '0.25'))
+BACKOFF_MAX = float(os.getenv('TMDB_BACKOFF_MAX', '2'))
+# Tiempo total que un request entrante puede gastar esperando a TMDB
+REQUEST_BUDGET = float(os.getenv('TMDB_REQUEST_BUDGET', '8'))
+POOL_MAXSIZE = int(os.getenv('TMDB_POOL_MAXSIZE', '20'))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Límite de salida hacia TMDB (por API key, compartido por todo el proceso)
+RATE_LIMIT = float(os.getenv('TMDB_RATE_LIMIT', '35'))
+RATE_BURST = float(os.getenv('TMDB_RATE_BURST', '40'))
+CIRCUIT_FALLOS = int(os.getenv('TMDB_CIRCUIT_FALLOS', '5'))
+CIRCUIT_ENFRIAMIENTO = float(os.getenv('TMDB_CIRCUIT_ENFRIAMIENTO', '30'))
+
+
+class TMDBError(Exception):
+    """Error al consultar TMDB (HTTP, conexión o presupuesto agotado)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TMDBNoDisponible(TMDBError):
+    """TMDB no se consultó: circuito abierto o límite de salida agotado."""
+
+    def __init__(self, message: str, reintentar_en: Optional[float] = None):
+        super().__init__(message, 503)
+        self.reintentar_en = reintentar_en
+
+
+def _crear_sesion() -> requests.Session:
+    """Crea la sesión compartida con un pool de conexiones keep-alive."""
+    session = requests.Session()
+    # Los reintentos los manejamos nosotros para poder respetar el presupuesto
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept': 'application/json'})
+    return session
+
+
+_session = _crear_sesion()
+
+# Llamadas idénticas concurrentes comparten un único request a TMDB
+vuelos = SingleFlight("tmdb")
+limitador = TokenBucket(RATE_LIMIT, RATE_BURST)
+circuito = CircuitBreaker("tmdb", umbral_fallos=CIRCUIT_FALLOS, enfriamiento=CIRCUIT_ENFRIAMIENTO)
+# GETs realmente enviados a TMDB (reintentos incluidos)
+_enviadas = 0
+
+
+def nuevo_deadline(budget: Optional[float] = None) -> float:
+    """Devuelve un deadline absoluto (time.monotonic) a partir de ahora."""
+    return time.monotonic() + (REQUEST_BUDGET if budget is None else budget)
+
+
+def deadline_actual() -> float:
+    """
+    Deadline del request entrante actual. Se fija en la primera llamada a
+    TMDB del request y lo comparten todas las siguientes. Fuera de un
+    request (tareas de fondo) cada llamada obtiene un presupuesto nuevo.
+    """
+    if has_request_context():
+        if 'tmdb_deadline' not in g:
+            g.tmdb_deadline = nuevo_deadline()
+        return g.tmdb_deadline
+    return nuevo_deadline()
+
+
+def _espera_backoff(intento: int, retry_after: Optional[str]) -> float:
+    """Backoff exponencial con jitter completo; respeta Retry-After si viene."""
+    espera = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** intento)))
+    if retry_after:
+        try:
+            espera = max(espera, float(retry_after))
+        except ValueError:
+            pass
+    return espera
+
+
+def get(
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    deadline: Optional[float] = None,
+    prioridad: str = INTERACTIVA
+) -> Dict[str, Any]:
+    """
+    Hace un GET a TMDB y devuelve el JSON decodificado.
+
+    Args:
+        path: Ruta relativa a TMDB_URL (ej: "movie/popular")
+        params: Parámetros de query (la api_key se agrega sola)
+        deadline: Deadline absoluto (time.monotonic); por defecto el del request actual
+        prioridad: INTERACTIVA para páginas de usuarios, FONDO para calentador y precargas
+
+    Raises:
+        TMDBNoDisponible: si el circuito está abierto o no hay cupo de salida a tiempo
+        TMDBError: si TMDB responde con error, no responde o se agota el presupuesto
+    """
+    if deadline is None:
+        deadline = deadline_actual()
+
+    clave = (path, tuple(sorted((params or {}).items())))
+    try:
+        return vuelos.do(clave, lambda: _get(path, params, deadline, prioridad), timeout=deadline - time.monotonic())
+    except TimeoutError:
+        raise TMDBError(f"Presupuesto de tiempo agotado esperando {path}", 504)
+
+
+def _get(path: str, params: Optional[Dict[str, Any]], deadline: float, prioridad: str) -> Dict[str, Any]:
+    url = f"{TMDB_URL}/{path.lstrip('/')}"
+    query = {"api_key": API_KEY, **(params or {})}
+    intento = 0
+
+    while True:
+        restante = deadline - time.monotonic()
+        if restante <= 0:
+            raise TMDBError(f"Presupuesto de tiempo agotado consultando {path}", 504)
+
+        if not circuito.permitir():
+            raise TMDBNoDisponible(f"TMDB no disponible (circuito abierto) para {path}", circuito.reintentar_en())
+        if not limitador.adquirir(prioridad, timeout=restante):
+            # No se usó el permiso del circuito: no cuenta como fallo de TMDB
+            circuito.liberar()
+            raise TMDBNoDisponible(f"Límite de requests a TMDB alcanzado para {path}", 1)
+
+        restante = deadline - time.monotonic()
+        timeout = (min(CONNECT_TIMEOUT, restante), min(READ_TIMEOUT, restante))
+        retry_after = None
+        global _enviadas
+        _enviadas += 1
+        try:
+            resp = _session.get(url, params=query, timeout=timeout)
+        except requests.RequestException as e:
+            circuito.fallo()
+            error = TMDBError(f"Error de conexión con TMDB ({path}): {e}", 502)
+        else:
+            if resp.status_code in RETRY_STATUS:
+                circuito.fallo()
+                retry_after = resp.headers.get('Retry-After')
+                error = TMDBError(f"TMDB respondió {resp.status_code} para {path}", resp.status_code)
+            elif resp.status_code >= 400:
+                # 4xx (ej: 404) es un problema del pedido, no de la salud de TMDB
+                circuito.exito()
+                raise TMDBError(f"TMDB respondió {resp.status_code} para {path}", resp.status_code)
+            else:
+                circuito.exito()
+                return resp.json()
+
+        if intento >= MAX_RETRIES:
+            raise error
+
+        espera = _espera_backoff(intento, retry_after)
+        if time.monotonic() + espera >= deadline:
+            raise error
+        time.sleep(espera)
+        intento += 1
+
+
+def peticiones_enviadas() -> int:
+    """Total de GETs enviados a TMDB por este proceso (cada reintento cuenta)."""
+    return _enviadas
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "peticiones": _enviadas,
+        "circuito": circuito.stats(),
+        "limitador": limitador.stats(),
+        "singleflight": vuelos.stats(),
+    }
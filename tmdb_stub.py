@@ -0,0 +1,245 @@
+"""
+Servidor sustituto de TMDB para benchmarks y pruebas sin conexión.
+
+Modos (--modo):
+  replay  - responde con fixtures grabadas en fixtures/tmdb/ (por defecto).
+            Si no hay fixture genera una respuesta sintética determinista;
+            con --sin-sintetico responde 404.
+  record  - reenvía cada request al TMDB real y guarda la respuesta como fixture
+
+Permite inyectar latencia, errores 5xx y 429 para medir cómo se comporta
+app.py. Para usarlo, apuntar la app al sustituto:
+
+    python tmdb_stub.py --modo replay --puerto 5001 --latencia 80 --tasa-429 0.02
+    TMDB_URL=http://localhost:5001/3 python app.py
+
+La inyección de fallas también se puede cambiar en caliente con
+POST /__stub/config (JSON con las mismas claves que STUB_CONFIG).
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from flask import Flask, jsonify, request, Response
+
+TMDB_REAL_URL = os.getenv("TMDB_REAL_URL", "https://api.themoviedb.org/3")
+FIXTURES_DIR = os.getenv("TMDB_FIXTURES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "tmdb"))
+
+# Parámetros que no forman parte de la identidad de una respuesta
+PARAMS_IGNORADOS = {"api_key", "append_to_response"}
+# Sub-recursos que TMDB puede anexar al detalle de una película
+PARTES_ANEXABLES = ("credits", "watch/providers")
+
+STUB_CONFIG = {
+    "modo": "replay",
+    "sintetico": True,      # en replay, generar respuesta si no hay fixture
+    "latencia_ms": 0.0,     # latencia media agregada a cada respuesta
+    "jitter_ms": 0.0,       # variación uniforme +/- sobre la latencia
+    "tasa_errores": 0.0,    # probabilidad de responder 500
+    "tasa_429": 0.0,        # probabilidad de responder 429
+    "retry_after": 1,       # valor de Retry-After en los 429
+}
+_config_lock = threading.Lock()
+contadores = {"requests": 0, "replay": 0, "sinteticas": 0, "grabadas": 0, "errores": 0, "429": 0, "no_encontradas": 0}
+
+app = Flask(__name__)
+
+
+# --- Fixtures ---
+def _clave_fixture(ruta, params):
+    """Nombre de archivo estable para una ruta + parámetros (sin api_key)."""
+    relevantes = sorted((k, v) for k, v in params.items() if k not in PARAMS_IGNORADOS)
+    base = ruta.strip("/").replace("/", "__")
+    if not relevantes:
+        return f"{base}.json"
+    firma = hashlib.sha1(json.dumps(relevantes).encode("utf-8")).hexdigest()[:12]
+    return f"{base}__{firma}.json"
+
+
+def _leer_fixture(ruta, params):
+    path = os.path.join(FIXTURES_DIR, _clave_fixture(ruta, params))
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _guardar_fixture(ruta, params, data):
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    path = os.path.join(FIXTURES_DIR, _clave_fixture(ruta, params))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    contadores["grabadas"] += 1
+
+
+# --- Respuestas sintéticas deterministas ---
+def _pelicula_sintetica(movie_id):
+    rnd = random.Random(movie_id)
+    return {
+        "id": movie_id,
+        "title": f"Película {movie_id}",
+        "original_title": f"Movie {movie_id}",
+        "overview": "Sinopsis generada por el sustituto de TMDB. " * rnd.randint(2, 6),
+        "poster_path": f"/poster{movie_id}.jpg",
+        "backdrop_path": f"/backdrop{movie_id}.jpg",
+        "release_date": f"{rnd.randint(1960, 2025)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+        "vote_average": round(rnd.uniform(3, 9), 1),
+        "runtime": rnd.randint(80, 180),
+        "genres": [{"id": g, "name": f"Género {g}"} for g in rnd.sample(range(1, 20), 2)],
+    }
+
+
+def _credits_sinteticos(movie_id):
+    rnd = random.Random(movie_id * 7)
+    return {
+        "id": movie_id,
+        "cast": [{"id": rnd.randint(1, 10**6), "name": f"Actor {movie_id}-{i}", "character": f"Personaje {i}", "order": i}
+                 for i in range(8)],
+        "crew": [{"id": rnd.randint(1, 10**6), "name": f"Director {movie_id}", "job": "Director"}],
+    }
+
+
+def _providers_sinteticos(movie_id):
+    return {
+        "id": movie_id,
+        "results": {"AR": {"flatrate": [{"provider_name": f"Plataforma {movie_id % 5}", "logo_path": f"/logo{movie_id % 5}.jpg"}]}},
+    }
+
+
+def _listado_sintetico(semilla, pagina):
+    rnd = random.Random(f"{semilla}-{pagina}")
+    return {
+        "page": pagina,
+        "total_pages": 10,
+        "total_results": 200,
+        "results": [_pelicula_sintetica(rnd.randint(1, 10**6)) for _ in range(20)],
+    }
+
+
+def _respuesta_sintetica(ruta, params):
+    partes = ruta.strip("/").split("/")
+    pagina = int(params.get("page", 1))
+    if partes[:2] == ["search", "movie"]:
+        return _listado_sintetico(params.get("query", ""), pagina)
+    if len(partes) >= 2 and partes[0] == "movie":
+        if not partes[1].isdigit():
+            return _listado_sintetico(partes[1], pagina)
+        movie_id = int(partes[1])
+        resto = "/".join(partes[2:])
+        if resto == "credits":
+            return _credits_sinteticos(movie_id)
+        if resto == "watch/providers":
+            return _providers_sinteticos(movie_id)
+        if not resto:
+            return _pelicula_sintetica(movie_id)
+    return None
+
+
+def _resolver(ruta, params):
+    """Busca la respuesta grabada (o sintética) para una ruta."""
+    data = _leer_fixture(ruta, params)
+    if data is not None:
+        contadores["replay"] += 1
+        return data
+    if STUB_CONFIG["sintetico"]:
+        data = _respuesta_sintetica(ruta, params)
+        if data is not None:
+            contadores["sinteticas"] += 1
+        return data
+    return None
+
+
+def _anexar(ruta, params, data):
+    """Emula append_to_response para el detalle de película."""
+    pedidas = [p for p in params.get("append_to_response", "").split(",") if p in PARTES_ANEXABLES]
+    for parte in pedidas:
+        sub = _resolver(f"{ruta.strip('/')}/{parte}", params)
+        if sub is not None:
+            data[parte] = sub
+    return data
+
+
+# --- Rutas ---
+@app.route("/__stub/config", methods=["GET", "POST"])
+def stub_config():
+    if request.method == "POST":
+        cambios = request.get_json(silent=True) or {}
+        with _config_lock:
+            for clave, valor in cambios.items():
+                if clave in STUB_CONFIG:
+                    STUB_CONFIG[clave] = valor
+    return jsonify({"config": STUB_CONFIG, "contadores": contadores})
+
+
+@app.route("/3/<path:ruta>", methods=["GET"])
+def tmdb(ruta):
+    contadores["requests"] += 1
+    params = request.args.to_dict()
+
+    latencia = STUB_CONFIG["latencia_ms"] + random.uniform(-1, 1) * STUB_CONFIG["jitter_ms"]
+    if latencia > 0:
+        time.sleep(latencia / 1000)
+
+    sorteo = random.random()
+    if sorteo < STUB_CONFIG["tasa_429"]:
+        contadores["429"] += 1
+        resp = jsonify({"status_code": 25, "status_message": "Your request count is over the allowed limit."})
+        resp.headers["Retry-After"] = str(STUB_CONFIG["retry_after"])
+        return resp, 429
+    if sorteo < STUB_CONFIG["tasa_429"] + STUB_CONFIG["tasa_errores"]:
+        contadores["errores"] += 1
+        return jsonify({"status_code": 11, "status_message": "Internal error (inyectado)."}), 500
+
+    if STUB_CONFIG["modo"] == "record":
+        real = requests.get(f"{TMDB_REAL_URL}/{ruta}", params=params, timeout=10)
+        if real.status_code == 200:
+            # Se guarda sin anexos: en replay se arman con _anexar
+            data = real.json()
+            anexos = {p: data.pop(p) for p in PARTES_ANEXABLES if p in data}
+            _guardar_fixture(ruta, params, data)
+            for parte, sub in anexos.items():
+                _guardar_fixture(f"{ruta.strip('/')}/{parte}", params, sub)
+            data.update(anexos)
+            return jsonify(data)
+        return Response(real.content, status=real.status_code, mimetype="application/json")
+
+    data = _resolver(ruta, params)
+    if data is None:
+        contadores["no_encontradas"] += 1
+        return jsonify({"status_code": 34, "status_message": "The resource you requested could not be found."}), 404
+    return jsonify(_anexar(ruta, params, dict(data)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sustituto de TMDB con record/replay e inyección de fallas")
+    parser.add_argument("--modo", choices=["replay", "record"], default="replay")
+    parser.add_argument("--puerto", type=int, default=5001)
+    parser.add_argument("--sin-sintetico", action="store_true", help="En replay, 404 si no hay fixture")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latencia media en ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variación de latencia en ms")
+    parser.add_argument("--tasa-errores", type=float, default=0.0, help="Probabilidad de 500 (0..1)")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Probabilidad de 429 (0..1)")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla para que las fallas sean repetibles")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    STUB_CONFIG.update({
+        "modo": args.modo,
+        "sintetico": not args.sin_sintetico,
+        "latencia_ms": args.latencia,
+        "jitter_ms": args.jitter,
+        "tasa_errores": args.tasa_errores,
+        "tasa_429": args.tasa_429,
+    })
+    print(f"Sustituto de TMDB en http://localhost:{args.puerto}/3 (modo {args.modo}, fixtures en {FIXTURES_DIR})")
+    app.run(host="0.0.0.0", port=args.puerto, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
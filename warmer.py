@@ -0,0 +1,144 @@
+"""
+Calentador de cachés.
+Refresca periódicamente los listados de la home (popular, top_rated,
+now_playing) y pre-resuelve el detalle de las primeras películas de cada
+uno, para que ningún visitante encuentre la caché fría.
+Con CACHE_WARMER=1 corre en segundo plano dentro del servidor (arranca con
+el primer request). `flask calentar-cache` es un proceso aparte que termina
+enseguida: ahí sólo se actualiza el catálogo en Postgres.
+"""
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import eventlet
+
+import catalogo
+import tmdb_client
+
+HABILITADO = os.getenv("CACHE_WARMER", "0") == "1"
+WARMER_INTERVALO = float(os.getenv("CACHE_WARMER_INTERVALO", "600"))
+WARMER_TOP_N = int(os.getenv("CACHE_WARMER_TOP_N", "20"))
+# Máximo de requests a TMDB por corrida; 0 = los que necesita el conjunto a calentar
+WARMER_PRESUPUESTO = int(os.getenv("CACHE_WARMER_PRESUPUESTO", "0"))
+# Requests que puede costar un detalle sin reintentos: el principal y una por parte no anexada
+COSTO_DETALLE = 1 + len(catalogo.PARTES_DETALLE)
+
+ultima_corrida: Dict[str, Any] = {}
+_hilo = None
+
+
+def calentar(top_n: Optional[int] = None, presupuesto: Optional[int] = None,
+             en_memoria: bool = True) -> Dict[str, Any]:
+    """
+    Ejecuta una corrida del calentador.
+
+    Los requests se cuentan con tmdb_client.peticiones_enviadas(), así que
+    entran los reintentos y las partes del detalle pedidas aparte (y también
+    lo que otros greenlets pidan a TMDB mientras dura la corrida). Un
+    detalle sólo se empieza si queda presupuesto para su peor caso.
+
+    Args:
+        top_n: Cantidad de películas por listado cuyo detalle se pre-resuelve
+        presupuesto: Máximo de requests a TMDB en esta corrida; por defecto
+            WARMER_PRESUPUESTO o, si es 0, el necesario para los listados y
+            el peor caso de cada detalle
+        en_memoria: False para sólo actualizar el catálogo en Postgres (CLI)
+
+    Returns:
+        Resumen de la corrida
+    """
+    top_n = WARMER_TOP_N if top_n is None else top_n
+    if presupuesto is None:
+        presupuesto = WARMER_PRESUPUESTO or None
+    inicio = time.monotonic()
+    base = tmdb_client.peticiones_enviadas()
+
+    def usados():
+        return tmdb_client.peticiones_enviadas() - base
+
+    errores = 0
+    listados = {}
+
+    for categoria in catalogo.CATEGORIAS:
+        if presupuesto is not None and usados() >= presupuesto:
+            break
+        try:
+            listados[categoria] = catalogo.refrescar_categoria(categoria, en_memoria=en_memoria)["data"]
+        except Exception as e:
+            errores += 1
+            print(f"Error calentando categoría {categoria}:", e)
+            # Si no se pudo refrescar, al menos usar lo que haya en caché
+            cacheado = catalogo.categorias_cache.get((catalogo.CATEGORIAS[categoria], catalogo.IDIOMA, 1))
+            listados[categoria] = cacheado["data"] if cacheado else []
+
+    ids = []
+    for peliculas in listados.values():
+        ids.extend(p["id"] for p in peliculas[:top_n] if p.get("id"))
+    ids = list(dict.fromkeys(ids))
+    if presupuesto is None:
+        presupuesto = usados() + len(ids) * COSTO_DETALLE
+
+    detalles = 0
+    sincronizados = 0
+    intentados = 0
+    for movie_id in ids:
+        if usados() + COSTO_DETALLE > presupuesto:
+            break
+        intentados += 1
+        try:
+            if catalogo.precalentar_detalle(movie_id, en_memoria=en_memoria):
+                sincronizados += 1
+            detalles += 1
+        except Exception as e:
+            errores += 1
+            print(f"Error calentando película {movie_id}:", e)
+
+    resumen = {
+        "fecha": datetime.now().isoformat(),
+        "en_memoria": en_memoria,
+        "categorias": len(listados),
+        "detalles": detalles,
+        "detalles_pendientes": len(ids) - intentados,
+        "sincronizados_tmdb": sincronizados,
+        "requests_tmdb": usados(),
+        "presupuesto": presupuesto,
+        "errores": errores,
+        "duracion_segundos": round(time.monotonic() - inicio, 3),
+    }
+    if en_memoria:
+        ultima_corrida.clear()
+        ultima_corrida.update(resumen)
+    return resumen
+
+
+def _bucle():
+    while True:
+        try:
+            resumen = calentar()
+            print("Caché calentada:", resumen)
+        except Exception as e:
+            print("Error en el calentador de caché:", e)
+        eventlet.sleep(WARMER_INTERVALO)
+
+
+def iniciar():
+    """
+    Arranca el calentador en segundo plano (una sola vez por proceso y sólo
+    con CACHE_WARMER=1). Se llama al servir, no al importar la app, para que
+    los comandos `flask ...` no lo disparen.
+    """
+    global _hilo
+    if HABILITADO and _hilo is None:
+        _hilo = eventlet.spawn(_bucle)
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "activo": _hilo is not None,
+        "intervalo": WARMER_INTERVALO,
+        "top_n": WARMER_TOP_N,
+        "presupuesto": WARMER_PRESUPUESTO or "automatico",
+        "ultima_corrida": dict(ultima_corrida),
+    }